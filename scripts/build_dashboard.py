@@ -1,13 +1,14 @@
 """
 Build a static HTML training dashboard from the database.
 Run: python scripts/build_dashboard.py
+     python scripts/build_dashboard.py --mirror   # from the local mirror, offline
 Output: docs/index.html
 """
 from __future__ import annotations
 
-import json
+import os
 import sys
-from datetime import date, datetime, timedelta
+from datetime import date, datetime
 from decimal import Decimal
 from pathlib import Path
 
@@ -16,20 +17,42 @@ from dotenv import load_dotenv
 load_dotenv()
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from traininglogs.db.db import get_connection
+from traininglogs.cli.dashboard import write_if_changed
+from traininglogs.cli.dashboard_shards import inline_json, prune, write_shard
+from traininglogs.db.db import read_database_url
+from traininglogs.db.gather import ReadPool
+from traininglogs.analytics.downsample import (
+    DEFAULT_MAX_POINTS,
+    downsample,
+    lift_value,
+    top_set_per_session,
+)
 from traininglogs.analytics.queries import (
     personal_records,
     overview_stats,
     exercise_list,
-    exercise_sets_trend,
-    goal_vs_actual,
+    exercise_sets_trend_by_name,
+    goal_vs_actual_by_name,
     weekly_tonnage_by_phase,
     session_list,
+    training_load,
 )
 
+try:
+    from traininglogs.analytics.engine import WorkingSets
+except ImportError:  # NumPy is optional: without it, every section is its own query.
+    WorkingSets = None
+
 OUTPUT = Path(__file__).parent.parent / "docs" / "index.html"
 PROGRAMS_DIR = Path(__file__).parent.parent / "inputs" / "programs"
 
+# The rolling-load chart's span, up to the latest session. Read in SQL: daily_load has a row per
+# calendar day of the whole history.
+ROLLING_LOAD_WEEKS = 26
+
+# Points per lift chart, however long the history (see analytics/downsample.py).
+MAX_CHART_POINTS = int(os.environ.get("DASHBOARD_MAX_POINTS", DEFAULT_MAX_POINTS))
+
 GITHUB_REPO = "apoorvasharma007/traininglogs"
 GITHUB_BRANCH = "main"
 
@@ -128,23 +151,77 @@ def build_timeline(sessions: list[dict]) -> dict:
     return result
 
 
-def build(conn) -> None:
-    overview = overview_stats(conn)
-    load_data = weekly_tonnage_by_phase(conn)
-
-    lifts = exercise_list(conn, min_sets=12)
-    sets_by_ex: dict[str, list[dict]] = {
-        row["exercise"]: exercise_sets_trend(conn, row["exercise"]) for row in lifts
-    }
-    goal_by_ex: dict[str, list[dict]] = {
-        row["exercise"]: goal_vs_actual(conn, row["exercise"]) for row in lifts
+def lift_series(sets: list[dict], goals: list[dict]) -> tuple[list[dict], list[dict], dict]:
+    """One lift's chart data, cut to MAX_CHART_POINTS: its top set per day -- all the chart
+    draws -- and the goal for each day that survives. Set count and average RPE are taken
+    first, over every set, for the side stats."""
+    rpes = [float(r["rpe"]) for r in sets if r["rpe"]]
+    stats = {
+        "set_count": len(sets),
+        "avg_rpe": sum(rpes) / len(rpes) if rpes else None,
     }
+    top = downsample(
+        sets, MAX_CHART_POINTS, mode="top_set", when=lambda r: r["date"], value=lift_value(sets)
+    )
+    days = {str(r["date"]) for r in top}
+    goal = top_set_per_session(
+        (g for g in goals if str(g["date"]) in days),
+        when=lambda g: g["date"], value=lambda g: g["goal_weight_kg"],
+    )
+    return top, goal, stats
+
+
+def build(conn=None, dsn: str | None = None) -> None:
+    """With `dsn`, the queries that don't depend on each other run at once, each on its own
+    pooled connection (db/gather.py), so the build takes about as long as the slowest; with
+    `conn`, one after another on it."""
+    with (ReadPool(dsn) if dsn else ReadPool(conn=conn)) as pool:
+        # One snapshot query and in-memory group-bys with NumPy; one query per section without,
+        # and one for each of the lifts' sets and goals.
+        if WorkingSets is not None:
+            first = pool.gather({
+                "snapshot": (WorkingSets.load,),
+                "rolling_load": (training_load, None, None, ROLLING_LOAD_WEEKS),
+            })
+            snapshot = first["snapshot"]
+            overview = snapshot.overview()
+            load_data = snapshot.weekly_tonnage_by_phase()
+            lifts = snapshot.exercise_list(min_sets=12)
+            sets_by_ex: dict[str, list[dict]] = {
+                row["exercise"]: snapshot.exercise_sets_trend(row["exercise"]) for row in lifts
+            }
+            goal_by_ex: dict[str, list[dict]] = {
+                row["exercise"]: snapshot.goal_vs_actual(row["exercise"]) for row in lifts
+            }
+            prs_all = snapshot.personal_records()
+            sessions = snapshot.session_list()
+        else:
+            first = pool.gather({
+                "overview": (overview_stats,),
+                "load_data": (weekly_tonnage_by_phase,),
+                "lifts": (exercise_list, 12),
+                "prs_all": (personal_records,),
+                "sessions": (session_list,),
+                "rolling_load": (training_load, None, None, ROLLING_LOAD_WEEKS),
+            })
+            overview, load_data = first["overview"], first["load_data"]
+            lifts, prs_all, sessions = first["lifts"], first["prs_all"], first["sessions"]
+            names = [row["exercise"] for row in lifts]
+            second = pool.gather({
+                "sets": (exercise_sets_trend_by_name, names),
+                "goals": (goal_vs_actual_by_name, names),
+            })
+            sets_by_ex = {name: second["sets"].get(name, []) for name in names}
+            goal_by_ex = {name: second["goals"].get(name, []) for name in names}
+
+    lift_stats: dict[str, dict] = {}
+    for name in sets_by_ex:
+        sets_by_ex[name], goal_by_ex[name], lift_stats[name] = lift_series(
+            sets_by_ex[name], goal_by_ex[name]
+        )
 
-    prs_all = personal_records(conn)
     prs = sorted([r for r in prs_all if r["exercise"] in HIGHLIGHT_EXERCISES],
                  key=lambda r: r["exercise"])
-
-    sessions = session_list(conn)
     timeline = build_timeline(sessions)
 
     last = sessions[0] if sessions else None
@@ -159,6 +236,8 @@ def build(conn) -> None:
             "github_url": github_url(last["source_file"]) if last.get("source_file") else None,
         }
 
+    rolling_load = first["rolling_load"]
+
     programs_list = parse_programs()
     current_plan_alias = "—"
     if last and last.get("source_file"):
@@ -173,9 +252,18 @@ def build(conn) -> None:
     data = {
         "overview":           overview,
         "weekly_load":        load_data,
+        "rolling_load":       rolling_load,
         "exercise_list":      lifts,
-        "sets_by_ex":         sets_by_ex,
-        "goal_by_ex":         goal_by_ex,
+        # Each lift's sets and goals are a file of their own, fetched when the lift is
+        # selected (traininglogs/cli/dashboard_shards.py).
+        "lift_shards": {
+            name: write_shard(
+                OUTPUT.parent, name, {"sets": sets_by_ex[name], "goals": goal_by_ex[name]},
+                default=serial,
+            )
+            for name in sets_by_ex
+        },
+        "lift_stats":         lift_stats,
         "prs":                prs,
         "pr_count":           len(prs),
         "timeline":           timeline,
@@ -184,12 +272,20 @@ def build(conn) -> None:
         "current_plan_alias": current_plan_alias,
     }
 
-    OUTPUT.write_text(render(data))
-    print(f"Dashboard written to {OUTPUT}")
+    if write_if_changed(OUTPUT, render(data)):
+        print(f"Dashboard written to {OUTPUT}")
+    else:
+        print("Dashboard unchanged")
+    # Only once the page no longer names them.
+    prune(OUTPUT.parent, set(data["lift_shards"].values()))
 
 
 def render(data: dict) -> str:
-    j = lambda d: json.dumps(d, default=serial)
+    # The data the page needs before anything is selected; the lifts' own is in shards.
+    core_keys = (
+        "weekly_load", "rolling_load", "exercise_list", "lift_shards", "lift_stats", "prs",
+    )
+    core = inline_json({key: data[key] for key in core_keys}, default=serial)
     o = data["overview"] or {}
     total_sessions = o.get("total_sessions") or 0
     current_phase = o.get("current_phase")
@@ -741,12 +837,28 @@ tbody tr:hover td {{ background: var(--bg-2); }}
     </div>
   </section>
 
+  <section>
+    <div class="section-head">
+      <h2>Rolling Load</h2>
+      <div class="section-dek">Acute : chronic</div>
+    </div>
+    <p class="section-note">Tonnage over the last 7 days against the weekly average of the last 28, by calendar day, whatever the program says. The red line is their ratio (ACWR): well above 1 is a spike on what you are used to.</p>
+    <div class="fig">
+      <canvas id="rollingLoadChart"></canvas>
+      <div class="fig-caption">
+        <span>7-day (black) · 28-day weekly average (grey) · ACWR (red, right)</span>
+        <span>Last 26 weeks</span>
+      </div>
+    </div>
+  </section>
+
   <section>
     <div class="section-head">
       <h2>Strength Progression</h2>
       <div class="section-dek">Top weight per day</div>
     </div>
     <p class="section-note">Top working weight per day. Red line shows the goal weight logged for that session.</p>
+    <p class="section-note" id="fileNote" hidden>Opened from disk, the browser will not load the chart data. Serve docs/ instead: <code>python -m http.server -d docs</code>, then open http://localhost:8000.</p>
     <div class="lift-control">
       <label for="exerciseSelect">Exercise</label>
       <select id="exerciseSelect"></select>
@@ -796,12 +908,15 @@ tbody tr:hover td {{ background: var(--bg-2); }}
 
 </main>
 
+<script id="dashboard-core" type="application/json">{core}</script>
 <script>
-const WEEKLY_LOAD      = {j(data['weekly_load'])};
-const EXERCISE_LIST    = {j(data['exercise_list'])};
-const SETS_BY_EXERCISE = {j(data['sets_by_ex'])};
-const GOAL_BY_EXERCISE = {j(data['goal_by_ex'])};
-const PRS              = {j(data['prs'])};
+const CORE = JSON.parse(document.getElementById("dashboard-core").textContent);
+const WEEKLY_LOAD   = CORE.weekly_load;
+const ROLLING_LOAD  = CORE.rolling_load;
+const EXERCISE_LIST = CORE.exercise_list;
+const LIFT_SHARDS   = CORE.lift_shards;
+const LIFT_STATS    = CORE.lift_stats;
+const PRS           = CORE.prs;
 
 const C = {{
   ink: "#111827",
@@ -858,6 +973,38 @@ document.querySelectorAll(".year-tab").forEach(btn => {{
   }});
 }})();
 
+(function renderRollingLoad() {{
+  if (!ROLLING_LOAD.length) return;
+  const labels = ROLLING_LOAD.map(r => r.date);
+  const line = (data, color, axis, width) => ({{
+    data, borderColor: color, backgroundColor: "transparent", borderWidth: width,
+    pointRadius: 0, tension: 0, yAxisID: axis, spanGaps: false,
+  }});
+  new Chart(document.getElementById("rollingLoadChart"), {{
+    type: "line",
+    data: {{ labels, datasets: [
+      {{ label: "7-day", ...line(ROLLING_LOAD.map(r => r.acute_tonnage_kg), C.ink, "y", 1.5) }},
+      {{ label: "28-day avg", ...line(ROLLING_LOAD.map(r => r.chronic_tonnage_kg), C.muted, "y", 1.5) }},
+      {{ label: "ACWR", ...line(ROLLING_LOAD.map(r => r.acwr), C.red, "ratio", 1) }},
+    ] }},
+    options: {{
+      interaction: {{ mode: "index", intersect: false }},
+      plugins: {{ legend: {{ display: false }}, tooltip: {{ callbacks: {{
+        label: ctx => ctx.dataset.yAxisID === "ratio"
+          ? `ACWR ${{ctx.parsed.y == null ? "—" : ctx.parsed.y.toFixed(2)}}`
+          : `${{ctx.dataset.label}}: ${{fmtInt(ctx.parsed.y)}} kg`
+      }} }} }},
+      scales: {{
+        x: {{ grid: {{ display: false }}, ticks: {{ font: {{ size: 9 }}, maxRotation: 0, autoSkip: true, maxTicksLimit: 8 }} }},
+        y: {{ beginAtZero: true, grid: {{ color: C.border }},
+              ticks: {{ callback: v => (v/1000).toFixed(0) + "k", font: {{ size: 9 }} }} }},
+        ratio: {{ position: "right", beginAtZero: true, grid: {{ display: false }},
+                  ticks: {{ font: {{ size: 9 }} }} }}
+      }}
+    }}
+  }});
+}})();
+
 (function renderLift() {{
   const sel = document.getElementById("exerciseSelect");
   EXERCISE_LIST.forEach(ex => {{
@@ -866,8 +1013,35 @@ document.querySelectorAll(".year-tab").forEach(btn => {{
     sel.appendChild(opt);
   }});
   let chart;
-  function draw(exName) {{
-    const rows = (SETS_BY_EXERCISE[exName] || []).map(r => ({{ ...r, weight_kg: r.weight_kg == null ? null : Number(r.weight_kg) }}));
+
+  // Each lift's data is fetched the first time it is selected, and kept.
+  const loaded = {{}};
+  function load(exName) {{
+    if (!loaded[exName]) {{
+      loaded[exName] = fetch(LIFT_SHARDS[exName]).then(r => {{
+        if (!r.ok) throw new Error(`${{LIFT_SHARDS[exName]}}: ${{r.status}}`);
+        return r.json();
+      }});
+      // A failed fetch is tried again on the next selection.
+      loaded[exName].catch(() => delete loaded[exName]);
+    }}
+    return loaded[exName];
+  }}
+
+  function show(exName) {{
+    if (!LIFT_SHARDS[exName]) return;
+    // Drawn only if still selected when it arrives: a slow fetch must not replace a newer chart.
+    load(exName).then(shard => {{ if (sel.value === exName) draw(exName, shard); }}, failed);
+  }}
+
+  // Browsers refuse fetch() of a file:// page's own files, so say how to see the charts.
+  function failed(err) {{
+    console.error(err);
+    if (location.protocol === "file:") document.getElementById("fileNote").hidden = false;
+  }}
+
+  function draw(exName, shard) {{
+    const rows = (shard.sets || []).map(r => ({{ ...r, weight_kg: r.weight_kg == null ? null : Number(r.weight_kg) }}));
 
     // Detect bodyweight exercise (all sets have null weight_kg)
     const isBW = rows.every(r => r.weight_kg == null);
@@ -886,23 +1060,22 @@ document.querySelectorAll(".year-tab").forEach(btn => {{
     const pointColors = top.map(r => r.is_deload_week ? C.red : C.ink);
 
     // Goal weight: one per session date, null where not set
-    const goalRows = (GOAL_BY_EXERCISE[exName] || []);
+    const goalRows = (shard.goals || []);
     const goalByDate = {{}};
     goalRows.forEach(r => {{ if (r.goal_weight_kg != null) goalByDate[r.date] = Number(r.goal_weight_kg); }});
     const goalData = top.map(r => goalByDate[r.date] ?? null);
     const hasGoal = goalData.some(v => v != null);
 
-    // Side stats
+    // Side stats: over every set, counted before the series was cut down.
     const latest = top[top.length - 1] || {{}};
-    const rpeRows = rows.filter(r => r.rpe);
-    const avgRpe = rpeRows.length ? rpeRows.reduce((s,r) => s + Number(r.rpe), 0) / rpeRows.length : null;
+    const stats = LIFT_STATS[exName] || {{}};
     const topNote = latest.notes || "";
 
     document.getElementById("latestTop").innerHTML = isBW
       ? (latest.reps_full ? `BW <span class="u">×${{latest.reps_full}}</span>` : "—")
       : (latest.weight_kg ? `${{latest.weight_kg}} <span class="u">×${{latest.reps_full}}</span>` : "—");
-    document.getElementById("setCount").textContent  = fmtInt(rows.length);
-    document.getElementById("recentRpe").textContent = rows.filter(r=>r.rpe).length ? fmt1(avgRpe) : "—";
+    document.getElementById("setCount").textContent  = fmtInt(stats.set_count);
+    document.getElementById("recentRpe").textContent = fmt1(stats.avg_rpe);
     document.getElementById("topNote").textContent   = topNote || "💪";
     document.getElementById("liftRange").textContent = labels.length ? `${{top[0].date}} — ${{top[top.length-1].date}}` : "—";
 
@@ -949,8 +1122,8 @@ document.querySelectorAll(".year-tab").forEach(btn => {{
       }}
     }});
   }}
-  sel.addEventListener("change", e => draw(e.target.value));
-  if (EXERCISE_LIST.length) {{ sel.value = EXERCISE_LIST[0].exercise; draw(EXERCISE_LIST[0].exercise); }}
+  sel.addEventListener("change", e => show(e.target.value));
+  if (EXERCISE_LIST.length) {{ sel.value = EXERCISE_LIST[0].exercise; show(EXERCISE_LIST[0].exercise); }}
 }})();
 
 (function renderPRs() {{
@@ -969,7 +1142,37 @@ document.querySelectorAll(".year-tab").forEach(btn => {{
 </html>"""
 
 
+def main(argv: list[str] | None = None) -> int:
+    import argparse
+
+    from traininglogs.cli.mirror import MIRROR_PATH
+
+    parser = argparse.ArgumentParser(description="Build docs/index.html from the database.")
+    parser.add_argument(
+        "--mirror",
+        nargs="?",
+        const=MIRROR_PATH,
+        type=Path,
+        metavar="PATH",
+        help="Build from the local mirror (`traininglogs mirror`) instead, with no connection. "
+        f"Default path: {MIRROR_PATH}",
+    )
+    args = parser.parse_args(argv)
+    if args.mirror is None:
+        build(dsn=read_database_url())
+        return 0
+
+    from traininglogs.db.mirror import MirrorConnection, MirrorUnavailable
+
+    try:
+        mirror = MirrorConnection(args.mirror, read_only=True)
+    except (MirrorUnavailable, FileNotFoundError) as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return 1
+    with mirror:
+        build(mirror)
+    return 0
+
+
 if __name__ == "__main__":
-    conn = get_connection()
-    build(conn)
-    conn.close()
+    sys.exit(main())
@@ -43,6 +43,7 @@ load_dotenv(str(PROJECT_ROOT / ".env"))
 
 from traininglogs.agent import extraction  # noqa: E402
 from traininglogs.agent.providers import AnthropicProvider, GroqProvider  # noqa: E402
+from traininglogs.agent.scheduler import BATCH, ScheduledProvider, scheduler_from_env  # noqa: E402
 from traininglogs.agent.schemas import LLMParserError  # noqa: E402
 
 EVAL_ROOT = PROJECT_ROOT / "eval_runs"
@@ -284,10 +285,20 @@ class CachedProvider:
         return result
 
 
+_scheduler = None
+
+
 def build_provider(kind: str, model: str, usage: _Usage) -> object:
+    """Batch priority: an eval run shares the API key with the live API, and must only use
+    what a person waiting on a card isn't (see traininglogs/agent/scheduler.py)."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = scheduler_from_env()
     if kind == "anthropic":
-        return InstrumentedAnthropic(model, usage)
-    return InstrumentedGroq(model, usage)
+        inner = InstrumentedAnthropic(model, usage)
+    else:
+        inner = InstrumentedGroq(model, usage)
+    return ScheduledProvider(inner, _scheduler, BATCH)
 
 
 def _reps(s) -> str:
@@ -47,8 +47,7 @@ from eval_ab import (  # noqa: E402
     EVAL_ROOT,
     MODELS,
     CachedProvider,
-    InstrumentedAnthropic,
-    InstrumentedGroq,
+    build_provider,
     _DryRunStop,
     _Usage,
 )
@@ -250,8 +249,7 @@ def main() -> int:
             print(f"\n  {path.name}  (truth: {len(truth)} ex, "
                   f"{sum(len(t['sets']) for t in truth)} sets)")
 
-            inner = (InstrumentedAnthropic(model, usage) if kind == "anthropic"
-                     else InstrumentedGroq(model, usage))
+            inner = build_provider(kind, model, usage)
             provider = CachedProvider(inner, model, usage, log_path, args.dry_run,
                                       args.max_cost, stage_label=f"{arm}:{path.name}")
             t0 = time.time()
@@ -0,0 +1,51 @@
+"""
+Recompute the tables derived from the sessions -- the personal records (current_prs,
+pr_events), exercise_state and daily_load -- from every session in the DB.
+Run: python scripts/rebuild_derived.py
+
+insert_session() keeps them current as sessions arrive, and apply_schema() fills any that are
+empty on a database that predates them. Run this after deleting sessions or importing out of
+date order.
+"""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from traininglogs.db.db import apply_schema, get_connection
+from traininglogs.db.insert import (
+    rebuild_daily_load,
+    rebuild_exercise_state,
+    rebuild_personal_records,
+)
+
+
+def main() -> None:
+    conn = get_connection()
+    apply_schema(conn)
+    rebuild_personal_records(conn)
+    rebuild_exercise_state(conn)
+    rebuild_daily_load(conn)
+    with conn.cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM current_prs")
+        records = cur.fetchone()[0]
+        cur.execute("SELECT COUNT(*) FROM pr_events")
+        events = cur.fetchone()[0]
+        cur.execute("SELECT COUNT(*) FROM exercise_state")
+        exercises = cur.fetchone()[0]
+        cur.execute("SELECT COUNT(*) FROM daily_load")
+        days = cur.fetchone()[0]
+    conn.close()
+    print(
+        f"Rebuilt {records} current records from {events} PR events, "
+        f"the state of {exercises} exercises, and {days} days of training load."
+    )
+
+
+if __name__ == "__main__":
+    main()
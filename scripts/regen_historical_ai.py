@@ -125,6 +125,7 @@ def main() -> None:
 
     from traininglogs.agent.llm_orchestrator import LLMOrchestrator
     from traininglogs.agent.providers import AnthropicProvider
+    from traininglogs.agent.scheduler import BATCH, ScheduledProvider, scheduler_from_env
     from traininglogs.agent.schemas import TrainingLogLLMExtract
     from traininglogs.db.db import apply_schema, get_connection
     from traininglogs.db.fetch import get_extraction
@@ -138,7 +139,10 @@ def main() -> None:
 
     # One provider for the whole run -- its .calls accumulates across every file, so
     # summing it at any point is the true cumulative spend, not just the last file's.
-    provider = AnthropicProvider()
+    # Batch priority (agent/scheduler.py): a back-fill only uses the capacity the live API
+    # isn't. Set LLM_SCHEDULER_DATABASE_URL to the API's database for that to hold across the
+    # two processes -- only advisory locks are taken there, nothing is written.
+    provider = ScheduledProvider(AnthropicProvider(), scheduler_from_env(), BATCH)
     total_cost = 0.0
     confirmed = skipped = failed = 0
 
@@ -0,0 +1,62 @@
+"""What changed on a validation card, as a JSON Patch (RFC 6902), one card section at a time.
+
+A correction usually touches one field, and the card around it is tens of kilobytes. A client
+that already has the card needs only the sections that changed: the session header, the
+warmup and cooldown sections, the note preview, the warnings, or one exercise card. So the
+patch is made at that level, not down to single fields. A few hundred bytes is small enough,
+and whole sections are simple for a client to apply: each one is swapped, never merged.
+
+Both cards are the JSON form (`jsonable_encoder(ValidationCardBuilder().build(...))`), the
+same shape GET /extractions/{id} returns.
+"""
+from __future__ import annotations
+
+import copy
+from typing import Any
+
+# Every key of UserValidationCard except `exercises`, which is patched per exercise.
+_SECTIONS = ("session_header", "warmup_section", "cooldown_section", "note_preview", "warnings")
+
+
+def card_patch(before: dict[str, Any], after: dict[str, Any]) -> list[dict[str, Any]]:
+    """The operations that turn `before` into `after`: `replace` for each changed section or
+    exercise, `add` for exercises appended, and `remove`, highest index first, for exercises
+    dropped from the end."""
+    ops: list[dict[str, Any]] = []
+    for section in _SECTIONS:
+        if before.get(section) != after.get(section):
+            ops.append({"op": "replace", "path": f"/{section}", "value": after.get(section)})
+
+    old, new = before.get("exercises", []), after.get("exercises", [])
+    for idx in range(min(len(old), len(new))):
+        if old[idx] != new[idx]:
+            ops.append({"op": "replace", "path": f"/exercises/{idx}", "value": new[idx]})
+    for idx in range(len(old), len(new)):
+        ops.append({"op": "add", "path": f"/exercises/{idx}", "value": new[idx]})
+    for idx in reversed(range(len(new), len(old))):
+        ops.append({"op": "remove", "path": f"/exercises/{idx}"})
+    return ops
+
+
+def apply_card_patch(card: dict[str, Any], ops: list[dict[str, Any]]) -> dict[str, Any]:
+    """`card` with `ops` applied, leaving `card` itself unchanged. Only the operations
+    card_patch() makes are understood; any other raises ValueError."""
+    result = copy.deepcopy(card)
+    for op in ops:
+        parts = op["path"].lstrip("/").split("/")
+        if parts[0] in _SECTIONS and len(parts) == 1 and op["op"] == "replace":
+            result[parts[0]] = copy.deepcopy(op["value"])
+        elif parts[0] == "exercises" and len(parts) == 2:
+            exercises = result.setdefault("exercises", [])
+            idx = int(parts[1])
+            if op["op"] == "replace":
+                exercises[idx] = copy.deepcopy(op["value"])
+            elif op["op"] == "add":
+                exercises.insert(idx, copy.deepcopy(op["value"]))
+            elif op["op"] == "remove":
+                del exercises[idx]
+            else:
+                raise ValueError(f"unsupported card patch operation: {op!r}")
+        else:
+            raise ValueError(f"unsupported card patch operation: {op!r}")
+    return result
@@ -0,0 +1,44 @@
+"""One time limit for a whole extraction, shared by every call inside it.
+
+Without one, nothing bounds how long `POST /inputs` can take: a rate-limit wait sleeps up to
+`_MAX_WORTH_WAITING` per call, up to `_MAX_RATE_LIMIT_WAITS` times, for every call in the
+session, while the client sits on an open request. A per-call timeout cannot fix that -- ten
+calls each under their own limit still add up to ten limits. A deadline is a single point in
+time, created once by the caller (the API or the CLI) and handed down through `assemble()` into
+every provider call, so each one can only spend what is actually left.
+"""
+from __future__ import annotations
+
+import time
+from typing import Callable
+
+from traininglogs.agent.schemas import LLMParserError
+
+
+class DeadlineExceeded(LLMParserError):
+    """The extraction's deadline passed before this call could finish.
+
+    A subclass of LLMParserError on purpose: to assemble() a worker that ran out of time is a
+    worker that failed, and becomes a placeholder the same way -- which also queues it for the
+    background retry, where there is no one waiting on it."""
+
+
+class Deadline:
+    def __init__(self, seconds: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.seconds = seconds
+        self._clock = clock
+        self._expires_at = clock() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self._expires_at - self._clock())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def allows(self, seconds: float) -> bool:
+        """Is there time to wait `seconds` and still make a call after it?"""
+        return seconds < self.remaining()
+
+    def check(self, what: str) -> None:
+        if self.expired():
+            raise DeadlineExceeded(f"{what}: the {self.seconds:g}s extraction deadline passed.")
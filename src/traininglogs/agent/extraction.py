@@ -2,15 +2,19 @@ from __future__ import annotations
 
 import re
 import unicodedata
+from contextlib import nullcontext
+from dataclasses import dataclass
 
 from pydantic import ValidationError
 
+from traininglogs.agent.deadline import Deadline, DeadlineExceeded
 from traininglogs.agent.prompts import (
     SHELL_SYSTEM_PROMPT,
     SPLITTER_SYSTEM_PROMPT,
     WORKER_SYSTEM_PROMPT,
 )
 from traininglogs.agent.providers import AnthropicProvider, ExtractionProvider
+from traininglogs.agent.routing import ESCALATED, FAST, RoutedProvider
 from traininglogs.agent.schemas import (
     ExerciseExtract,
     ExerciseSplit,
@@ -34,7 +38,16 @@ WORKER_TOOL_NAME = "extract_exercise"
 WORKER_TOOL_DESCRIPTION = "Extract one exercise — its sets, warmup sets and notes — from the text."
 
 
-def segment(text: str, provider: ExtractionProvider | None = None) -> ExerciseSplit:
+def _deadline_kwargs(deadline: Deadline | None) -> dict:
+    # Passed only when there is one. Providers written before deadlines existed -- every test
+    # double, eval_ab.py's CachedProvider -- duck-type extract() without the parameter, and a
+    # call with no deadline must keep working against them.
+    return {"deadline": deadline} if deadline is not None else {}
+
+
+def segment(
+    text: str, provider: ExtractionProvider | None = None, deadline: Deadline | None = None
+) -> ExerciseSplit:
     """List the main working exercises in `text`, in order, as {position, name} pairs."""
     provider = provider or AnthropicProvider()
     tool_schema = ExerciseSplit.model_json_schema()
@@ -46,6 +59,7 @@ def segment(text: str, provider: ExtractionProvider | None = None) -> ExerciseSp
         SEGMENT_TOOL_NAME,
         SEGMENT_TOOL_DESCRIPTION,
         validate=ExerciseSplit.model_validate,
+        **_deadline_kwargs(deadline),
     )
 
     try:
@@ -54,7 +68,9 @@ def segment(text: str, provider: ExtractionProvider | None = None) -> ExerciseSp
         raise LLMParserError(f"Exercise split did not pass validation:\n{exc}") from exc
 
 
-def extract_shell(text: str, provider: ExtractionProvider | None = None) -> SessionShellExtract:
+def extract_shell(
+    text: str, provider: ExtractionProvider | None = None, deadline: Deadline | None = None
+) -> SessionShellExtract:
     """Extract everything about `text` except the individual exercises."""
     provider = provider or AnthropicProvider()
     tool_schema = SessionShellExtract.model_json_schema()
@@ -66,6 +82,7 @@ def extract_shell(text: str, provider: ExtractionProvider | None = None) -> Sess
         SHELL_TOOL_NAME,
         SHELL_TOOL_DESCRIPTION,
         validate=SessionShellExtract.model_validate,
+        **_deadline_kwargs(deadline),
     )
 
     try:
@@ -75,7 +92,10 @@ def extract_shell(text: str, provider: ExtractionProvider | None = None) -> Sess
 
 
 def extract_exercise(
-    text: str, position: int | None = None, provider: ExtractionProvider | None = None
+    text: str,
+    position: int | None = None,
+    provider: ExtractionProvider | None = None,
+    deadline: Deadline | None = None,
 ) -> ExerciseExtract:
     """Extract one exercise from `text`.
 
@@ -105,6 +125,7 @@ def extract_exercise(
         WORKER_TOOL_NAME,
         WORKER_TOOL_DESCRIPTION,
         validate=ExerciseExtract.model_validate,
+        **_deadline_kwargs(deadline),
     )
 
     try:
@@ -298,7 +319,94 @@ def audit(text: str, exercises: list[Exercise]) -> list[str]:
     return warnings
 
 
-def assemble(text: str, provider: ExtractionProvider | None = None) -> TrainingLogLLMExtract:
+@dataclass(frozen=True)
+class FailedWorker:
+    """One worker that raised inside assemble() and became a placeholder.
+
+    Carries exactly what that worker was shown, so a later retry asks the same question rather
+    than re-running the splitter to rebuild the chunk -- a retry of one exercise must cost one
+    worker call, not a whole session."""
+
+    position: int
+    name: str
+    text: str
+    # None when `text` is an isolated chunk; the split position when it is the whole document
+    # (see extract_exercise()).
+    worker_position: int | None
+    error: str
+
+
+def run_worker(
+    worker_text: str,
+    worker_position: int | None,
+    position: int,
+    name: str,
+    provider: ExtractionProvider,
+    deadline: Deadline | None = None,
+) -> tuple[Exercise, list[str], list[str]]:
+    """One worker call plus the per-exercise checks, as (exercise, uncertain paths, warnings).
+
+    Shared by assemble() and the placeholder retry queue (ingest/retry.py), so an exercise
+    recovered later is held to exactly the checks it would have had the first time. Raises
+    LLMParserError unchanged; what a failure becomes is the caller's decision. Uncertain paths
+    are relative to the exercise -- the caller knows its index in the session, this does not.
+
+    With a RoutedProvider, the chunk goes to whichever model its policy picks (agent/routing.py).
+    An answer from the fast model that fails validation or quotes a source line that isn't in
+    the text is not kept: the chunk is asked again of the strong model, and that answer is the
+    one checked and returned. Running out of time is not a wrong answer and is never escalated.
+    """
+    def attempt(tier: str | None) -> tuple[ExerciseExtract, list[str]]:
+        with provider.routed(tier) if tier is not None else nullcontext():
+            result = extract_exercise(
+                worker_text, worker_position, provider=provider, deadline=deadline
+            )
+        # Checked against worker_text, which is what the model was actually shown — not the
+        # whole document, or a quote from an isolated chunk would look invented whenever the
+        # rest of the session happened not to contain it.
+        return result, check_sources_are_real(worker_text, result)
+
+    tier = None
+    if isinstance(provider, RoutedProvider):
+        tier = provider.policy.choose(worker_text, name)
+    try:
+        worker_result, source_warnings = attempt(tier)
+        escalate_because = "quoted a source line not in the text" if source_warnings else None
+    except DeadlineExceeded:
+        raise
+    except LLMParserError as exc:
+        if tier != FAST:
+            raise
+        escalate_because = str(exc).splitlines()[0][:160]
+    if tier == FAST and escalate_because:
+        print(f"[route] exercise {position} ({name}): fast model {escalate_because} — escalating")
+        worker_result, source_warnings = attempt(ESCALATED)
+
+    warnings: list[str] = []
+    for w in source_warnings:
+        warnings.append(f"Exercise {position} ({name}): {w}")
+    for w in check_sets_are_numbered_and_sourced(worker_result):
+        warnings.append(f"Exercise {position} ({name}): {w}")
+    # The splitter already told us the correct position, so it is passed in rather than
+    # asked of the worker and overwritten afterwards.
+    exercise, projection_warnings = worker_result.to_exercise(position)
+    for w in projection_warnings:
+        warnings.append(f"Exercise {position} ({name}): {w}")
+    return exercise, list(worker_result.uncertain_fields or []), warnings
+
+
+def failed_worker_warning(position: int, name: str, error: str) -> str:
+    """The warning a placeholder carries. One definition, because the retry queue has to find
+    and remove exactly this line once the exercise is recovered."""
+    return f"Exercise {position} ({name}) failed to extract: {error}"
+
+
+def assemble(
+    text: str,
+    provider: ExtractionProvider | None = None,
+    failed_workers: list[FailedWorker] | None = None,
+    deadline: Deadline | None = None,
+) -> TrainingLogLLMExtract:
     """Run the splitter, the session shell, and one worker call per exercise (sequential),
     then glue the results into a TrainingLogLLMExtract. Each worker gets an isolated,
     pre-sliced chunk of `text` for just its own exercise when the splitter's anchor for that
@@ -314,17 +422,26 @@ def assemble(text: str, provider: ExtractionProvider | None = None) -> TrainingL
     scores ~99.7% on the numeric spine; see `roadmap.md` for the evidence.
 
     A worker that raises becomes a flagged placeholder exercise plus a warning — never a crash
-    or a silent gap. The deterministic drop-check runs last and adds any findings to the same
-    warnings list."""
+    or a silent gap. When `failed_workers` is given, each of those is also appended to it, with
+    the text that worker was shown, so the caller can queue it for a retry (ingest/retry.py)
+    instead of asking the person to re-extract the whole session. The deterministic drop-check
+    runs last and adds any findings to the same warnings list.
+
+    `deadline` bounds the whole run. Without a split and a shell there is nothing to show, so
+    running out of time there raises; after that, every worker not yet started when it passes
+    becomes a placeholder without a call being made, and the result comes back partial with
+    one warning saying so -- a bounded wait for a card with gaps, rather than an unbounded one
+    for a complete card. Those placeholders are queued for retry like any other."""
     provider = provider or AnthropicProvider()
 
-    split = segment(text, provider=provider)
-    shell = extract_shell(text, provider=provider)
+    split = segment(text, provider=provider, deadline=deadline)
+    shell = extract_shell(text, provider=provider, deadline=deadline)
     chunks = _chunk_exercises(text, split)
 
     exercises: list[Exercise] = []
     uncertain_fields: list[str] = list(shell.uncertain_fields)
     warnings: list[str] = []
+    timed_out = 0
 
     for i, entry in enumerate(split.exercises):
         chunk_text = chunks.get(entry.position)
@@ -342,32 +459,42 @@ def assemble(text: str, provider: ExtractionProvider | None = None) -> TrainingL
             )
 
         try:
-            worker_result = extract_exercise(worker_text, worker_position, provider=provider)
-            # Checked against worker_text, which is what the model was actually shown — not the
-            # whole document, or a quote from an isolated chunk would look invented whenever the
-            # rest of the session happened not to contain it.
-            for w in check_sources_are_real(worker_text, worker_result):
-                warnings.append(f"Exercise {entry.position} ({entry.name}): {w}")
-            for w in check_sets_are_numbered_and_sourced(worker_result):
-                warnings.append(f"Exercise {entry.position} ({entry.name}): {w}")
-            # The splitter already told us the correct position, so it is passed in rather than
-            # asked of the worker and overwritten afterwards.
-            exercise, projection_warnings = worker_result.to_exercise(entry.position)
-            for w in projection_warnings:
-                warnings.append(f"Exercise {entry.position} ({entry.name}): {w}")
-            exercise_uncertain = worker_result.uncertain_fields
+            if deadline is not None:
+                deadline.check(f"Exercise {entry.position} was not started")
+            exercise, exercise_uncertain, exercise_warnings = run_worker(
+                worker_text, worker_position, entry.position, entry.name, provider,
+                deadline=deadline,
+            )
         except LLMParserError as exc:
+            if isinstance(exc, DeadlineExceeded):
+                timed_out += 1
             exercises.append(_placeholder_exercise(entry.position, entry.name, str(exc)))
-            warnings.append(
-                f"Exercise {entry.position} ({entry.name}) failed to extract: {exc}"
-            )
+            warnings.append(failed_worker_warning(entry.position, entry.name, str(exc)))
+            if failed_workers is not None:
+                failed_workers.append(
+                    FailedWorker(
+                        position=entry.position,
+                        name=entry.name,
+                        text=worker_text,
+                        worker_position=worker_position,
+                        error=str(exc),
+                    )
+                )
             continue
 
         exercises.append(exercise)
+        warnings.extend(exercise_warnings)
         uncertain_fields.extend(
             f"exercises.{i}.{path}" for path in exercise_uncertain
         )
 
+    if timed_out:
+        warnings.insert(
+            0,
+            f"Partial extract: the {deadline.seconds:g}s deadline passed with {timed_out} of "
+            f"{len(split.exercises)} exercise(s) unfinished; those are placeholders, not "
+            "extracted data.",
+        )
     warnings.extend(audit(text, exercises))
 
     return TrainingLogLLMExtract(
@@ -0,0 +1,191 @@
+"""Hedged requests: a call that is running long is sent to a second provider as well, and
+whichever answers first with a usable result wins.
+
+Every worker must finish before assemble() returns, so the card is as slow as its slowest
+call -- and worker latency has a long tail that has nothing to do with the chunk: the same
+request that usually answers in four seconds occasionally takes forty. Hedging at a high
+percentile of a step's own history costs a second call only on the few that are already in
+that tail, which is where nearly all of the waiting is.
+
+Opt-in, and a wrapper rather than a change to either provider: HedgedProvider is itself an
+ExtractionProvider, so assemble() and ingest.extract() take it without knowing it is there.
+"""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Mapping
+
+from traininglogs.agent.deadline import Deadline
+from traininglogs.agent.providers import ExtractionProvider, call_sink
+
+# Past p95 a call is in the tail; below it a hedge mostly duplicates calls that were about to
+# answer anyway.
+DEFAULT_HEDGE_PERCENTILE = 0.95
+
+# Shared by every HedgedProvider: the API builds one per request, and a pool per instance would
+# leave idle threads behind each of them. A loser leg keeps its thread until its call returns --
+# a synchronous SDK call cannot be cancelled -- so this is sized for a few of those in flight.
+_pool: ThreadPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+        return _pool
+
+
+def _leg(
+    provider: ExtractionProvider, args: tuple, kwargs: dict
+) -> tuple[dict | None, Exception | None, list[dict]]:
+    """One provider's attempt at the call: (payload, error, the records it produced)."""
+    records: list[dict] = []
+    token = call_sink.set(records)
+    try:
+        return provider.extract(*args, **kwargs), None, records
+    except Exception as exc:
+        return None, exc, records
+    finally:
+        call_sink.reset(token)
+
+
+class HedgedProvider:
+    """`primary` answers every call; a call still running after `hedge_after_ms[step]` is also
+    sent to `secondary`, and the first usable payload is returned. A step with no threshold
+    (no history yet) is never hedged.
+
+    "Usable" is whatever the providers already enforce: `validate` runs inside each of them, so
+    a leg that returns has passed it, and a leg that raises is not a winner -- the other is
+    still waited for. Only when both fail does the call fail, with the primary's error.
+
+    `.calls` carries every record from both legs, each marked `hedged` (was a second call
+    fired for this step) and `hedge_won` (was this leg's payload the one used). A losing leg
+    is not waited for -- waiting on it is the latency hedging exists to avoid -- so its record
+    arrives when it finishes, which for the last worker of a session is after extract() has
+    returned. A caller about to save `.calls` either hands those records off with
+    detach_late(), which costs no wait, or waits for them with drain()."""
+
+    def __init__(
+        self,
+        primary: ExtractionProvider,
+        secondary: ExtractionProvider,
+        hedge_after_ms: Mapping[str, float],
+    ) -> None:
+        self.primary = primary
+        self.secondary = secondary
+        self.model = getattr(primary, "model", None)
+        self.hedge_after_ms = dict(hedge_after_ms)
+        self.calls: list[dict] = []
+        self._lock = threading.Lock()
+        # Losing legs still running, counted down as each one's record is published.
+        self._outstanding = 0
+        self._settled = threading.Condition(self._lock)
+        # Set by detach_late(): where late records go instead of `.calls`.
+        self._persist_late: Callable[[list[dict]], None] | None = None
+
+    def extract(
+        self,
+        text: str,
+        tool_schema: dict,
+        system_prompt: str,
+        tool_name: str,
+        tool_description: str,
+        validate: Callable[[dict], Any] | None = None,
+        deadline: Deadline | None = None,
+    ) -> dict:
+        args = (text, tool_schema, system_prompt, tool_name, tool_description, validate)
+        kwargs = {"deadline": deadline} if deadline is not None else {}
+        # Captured here, on the caller's thread: the legs run elsewhere and cannot see it.
+        outer = call_sink.get()
+
+        after_ms = self.hedge_after_ms.get(tool_name)
+        if after_ms is None:
+            payload, error, records = _leg(self.primary, args, kwargs)
+            self._publish(records, outer, hedged=False, won=None)
+            if error is not None:
+                raise error
+            return payload
+
+        pool = _get_pool()
+        primary = pool.submit(_leg, self.primary, args, kwargs)
+        done, _ = wait([primary], timeout=after_ms / 1000)
+        if done or (deadline is not None and deadline.expired()):
+            # Answered in time -- or there is no time left for a second call to use.
+            payload, error, records = primary.result()
+            self._publish(records, outer, hedged=False, won=None)
+            if error is not None:
+                raise error
+            return payload
+
+        print(
+            f"[llm] {tool_name}: no answer after {after_ms:.0f}ms — "
+            f"hedging to {getattr(self.secondary, 'model', 'secondary')}"
+        )
+        secondary = pool.submit(_leg, self.secondary, args, kwargs)
+        errors: dict[Future, Exception] = {}
+        pending = {primary, secondary}
+        winner: dict | None = None
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for leg in done:
+                payload, error, records = leg.result()
+                won = error is None and winner is None
+                if won:
+                    winner = payload
+                elif error is not None:
+                    errors[leg] = error
+                self._publish(records, outer, hedged=True, won=won)
+
+        for leg in pending:
+            with self._lock:
+                self._outstanding += 1
+            leg.add_done_callback(lambda f: self._publish_late(f.result()[2], outer))
+        if winner is None:
+            raise errors.get(primary) or errors[secondary]
+        return winner
+
+    def drain(self, timeout: float | None = None) -> bool:
+        """Wait until every losing leg still running has finished and its record is in
+        `.calls`. False if `timeout` seconds pass first."""
+        with self._settled:
+            return self._settled.wait_for(lambda: self._outstanding == 0, timeout)
+
+    def detach_late(self, persist: Callable[[list[dict]], None]) -> None:
+        """From now on, hand the records of losing legs still running to `persist` as each
+        finishes, instead of adding them to `.calls`. For a caller about to save `.calls` and
+        stop reading it: every record is in exactly one of the two, and nothing waits."""
+        with self._lock:
+            self._persist_late = persist
+
+    def _publish_late(self, records: list[dict], outer: list[dict] | None) -> None:
+        with self._settled:
+            persist = self._persist_late
+            if persist is None:
+                self._append(records, outer, hedged=True, won=False)
+            self._outstanding -= 1
+            self._settled.notify_all()
+        if persist is not None:
+            for record in records:
+                record["hedged"] = True
+                record["hedge_won"] = False
+            persist(records)
+
+    def _publish(
+        self, records: list[dict], outer: list[dict] | None, hedged: bool, won: bool | None
+    ) -> None:
+        with self._lock:
+            self._append(records, outer, hedged, won)
+
+    def _append(
+        self, records: list[dict], outer: list[dict] | None, hedged: bool, won: bool | None
+    ) -> None:
+        # Under self._lock.
+        for record in records:
+            record["hedged"] = hedged
+            record["hedge_won"] = won
+            self.calls.append(record)
+            if outer is not None:
+                outer.append(record)
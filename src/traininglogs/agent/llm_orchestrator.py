@@ -29,7 +29,9 @@ class LLMOrchestrator:
         self._input_fn = input_fn
         self._builder = ValidationCardBuilder()
 
-    def confirm_loop(self, extract: TrainingLogLLMExtract) -> TrainingLogLLMExtract:
+    def confirm_loop(
+        self, extract: TrainingLogLLMExtract, history: dict[str, dict] | None = None
+    ) -> TrainingLogLLMExtract:
         """Show the card, apply corrections until confirmed.
 
         Every correction is recorded in `self.corrections` -- what the person said, and the
@@ -43,6 +45,9 @@ class LLMOrchestrator:
         This is the half of the old monolithic `run()` that blocks on a human at a terminal,
         split out so it is the only half that has to: `ingest/extract.py` can now call an
         LLM without ever waiting on `input()`.
+
+        `history` is exercise_state by exercise name (db.fetch.get_exercise_states()), looked
+        up by the caller for the card's "last time" lines -- see ValidationCardBuilder.build().
         """
         from datetime import datetime, timezone
 
@@ -54,7 +59,7 @@ class LLMOrchestrator:
         validator = LLMExtractValidator(correction_provider)
 
         while True:
-            card = self._builder.build(extract)
+            card = self._builder.build(extract, history)
             self._renderer.render(card)
             self._renderer.console.print(_CONFIRM_PROMPT, end="")
             answer = self._input_fn().strip()
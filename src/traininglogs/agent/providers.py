@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 import os
+import random
 import re
 import time
+from contextvars import ContextVar
 from typing import Any, Callable, Protocol, runtime_checkable
 
 import anthropic
 
+from traininglogs.agent.deadline import Deadline, DeadlineExceeded
 from traininglogs.agent.schemas import LLMParserError
 
 DEFAULT_ANTHROPIC_MODEL = "claude-haiku-4-5-20251001"
@@ -22,6 +25,13 @@ PRICING: dict[str, tuple[float, float]] = {
 }
 
 
+# When set, every record _record_call() appends is also appended here. For a wrapper that runs
+# a provider on another thread and needs to know exactly which records *that* call produced
+# (agent/hedging.py): slicing `provider.calls` by length is wrong as soon as two calls on the
+# same provider overlap. A ContextVar, so each thread sets its own and none sees another's.
+call_sink: ContextVar[list[dict] | None] = ContextVar("call_sink", default=None)
+
+
 def _record_call(
     calls: list[dict],
     step: str,
@@ -32,6 +42,7 @@ def _record_call(
     elapsed_ms: int,
     failed: str | None,
     raw_payload: dict | None,
+    transport_retries: int = 0,
 ) -> None:
     """Append one llm_calls-shaped record, the same shape from every provider.
 
@@ -44,20 +55,24 @@ def _record_call(
     """
     price_in, price_out = PRICING.get(model, (0.0, 0.0))
     cost_usd = round(input_tokens / 1e6 * price_in + output_tokens / 1e6 * price_out, 6)
-    calls.append(
-        {
-            "step": step,
-            "model": model,
-            "attempts": attempts,
-            "input_tokens": input_tokens,
-            "output_tokens": output_tokens,
-            "cost_usd": cost_usd,
-            "ms": elapsed_ms,
-            "cached": False,
-            "failed": failed,
-            "raw_payload": raw_payload,
-        }
-    )
+    record = {
+        "step": step,
+        "model": model,
+        "attempts": attempts,
+        "transport_retries": transport_retries,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "cost_usd": cost_usd,
+        "ms": elapsed_ms,
+        "cached": False,
+        "failed": failed,
+        "raw_payload": raw_payload,
+    }
+    calls.append(record)
+    sink = call_sink.get()
+    if sink is not None:
+        sink.append(record)
+
 
 # Ceiling on a single call's output. Shared by both providers so they cannot drift apart --
 # GroqProvider previously set none at all, and OpenAI-compatible APIs reserve
@@ -152,6 +167,56 @@ def _describe_wait(exc: Exception) -> str:
     return "an unknown amount of time"
 
 
+# Transport failures -- the connection dropped, the request timed out, the server answered 5xx
+# or "overloaded" -- are a third kind of failure, and get a third budget. They say nothing about
+# the answer (there isn't one), so they must not spend the reask budget; and unlike a 429 the
+# server gives no hint when to come back, so the wait is ours to choose.
+#
+# Exponential backoff with full jitter: each wait is uniform in [0, min(cap, base * 2**n)].
+# Full jitter, not a fixed doubling, because the calls that fail together are the workers of
+# one session hitting the same blip -- identical waits would send them back at the same moment
+# to fail together again.
+#
+# The SDK clients are built with `max_retries=0` so this is the only retry loop. The SDKs' own
+# (two retries, by default) is invisible: it never reaches `_record_call`, and it knows nothing
+# of the extraction deadline.
+_MAX_TRANSPORT_RETRIES = 4
+_TRANSPORT_BASE_DELAY = 1.0
+_TRANSPORT_MAX_DELAY = 20.0
+
+
+def _transport_wait_seconds(retry: int, rand: Callable[[], float] = random.random) -> float:
+    """Full-jitter wait before transport retry number `retry` (1-based)."""
+    return rand() * min(_TRANSPORT_MAX_DELAY, _TRANSPORT_BASE_DELAY * 2 ** (retry - 1))
+
+
+def _transient_failure(exc: Exception, timed_out: bool) -> str | None:
+    """What kind of transport failure `exc` is, or None if retrying it cannot help.
+
+    Called only for the SDKs' APIConnectionError / APIStatusError, after the 429 and 400
+    clauses have taken theirs. No status code means the request never got an answer. 408 and
+    409 are the two 4xx the server itself says are worth repeating; every other 4xx (auth, not
+    found, too large) fails identically however many times it is sent."""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        return "timed out" if timed_out else "connection error"
+    if status == 529:
+        return "overloaded (529)"
+    if status in (408, 409) or status >= 500:
+        return f"server error ({status})"
+    return None
+
+
+def _request_options(deadline: Deadline | None) -> dict:
+    """Per-request SDK options for a call made under `deadline`: its timeout is whatever time is
+    left. Empty without one, so the request is exactly what it was before deadlines existed."""
+    return {"timeout": deadline.remaining()} if deadline is not None else {}
+
+
+def _deadline_error(deadline: Deadline, reason: str) -> str:
+    return f"{reason} The {deadline.seconds:g}s extraction deadline leaves no time for another."
+
+
 def _reask_message(last_error: str) -> dict:
     # For failures where there is no tool call to replay: the API rejected the request before
     # answering, or answered without calling the tool. A plain user turn is the only shape
@@ -238,6 +303,7 @@ class ExtractionProvider(Protocol):
         tool_name: str,
         tool_description: str,
         validate: Callable[[dict], Any] | None = None,
+        deadline: Deadline | None = None,
     ) -> dict:
         """`validate` is called on the tool payload before it is returned. If it raises, the
         provider re-asks with the error rather than handing the bad payload to the caller.
@@ -245,7 +311,12 @@ class ExtractionProvider(Protocol):
         This is the whole point of passing it down: validation used to live in the caller, one
         layer above the retry loop, so the retry budget could never be spent on the most common
         failure -- a tool call that parses as JSON but doesn't satisfy the model it's meant to
-        fill. Callers keep their own validation as the final check."""
+        fill. Callers keep their own validation as the final check.
+
+        `deadline`, when given, bounds the whole call -- every attempt, every wait between
+        them. A provider raises DeadlineExceeded rather than start an attempt or a wait that
+        cannot finish in time. Optional in practice: callers only pass it when they have one
+        (see agent/extraction.py), so a provider written before it existed keeps working."""
         ...
 
 
@@ -255,7 +326,10 @@ class AnthropicProvider:
     ) -> None:
         self.model = model
         self.max_tokens = max_tokens
-        self._client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+        # max_retries=0: retries are ours, not the SDK's -- see _MAX_TRANSPORT_RETRIES.
+        self._client = anthropic.Anthropic(
+            api_key=os.environ.get("ANTHROPIC_API_KEY"), max_retries=0
+        )
         # One record per extract() call -- i.e. per step (segment/shell/worker/correction), not
         # per raw HTTP attempt -- appended in `finally` whether the call ends in success or a
         # raised LLMParserError. ingest/extract.py drains this into the llm_calls table after
@@ -272,10 +346,12 @@ class AnthropicProvider:
         tool_name: str,
         tool_description: str,
         validate: Callable[[dict], Any] | None = None,
+        deadline: Deadline | None = None,
     ) -> dict:
         messages: list[dict] = [{"role": "user", "content": text}]
         last_error: str = ""
         rate_limit_waits = 0
+        transport_retries = 0
         attempt = 0
         input_tokens = 0
         output_tokens = 0
@@ -285,6 +361,9 @@ class AnthropicProvider:
 
         try:
             while attempt <= _MAX_RETRIES:
+                if deadline is not None and deadline.expired():
+                    last_error = _deadline_error(deadline, f"Stopped after {attempt} attempt(s).")
+                    raise DeadlineExceeded(last_error)
                 try:
                     response = self._client.messages.create(
                         model=self.model,
@@ -305,6 +384,7 @@ class AnthropicProvider:
                         ],
                         tool_choice={"type": "tool", "name": tool_name},
                         messages=messages,
+                        **_request_options(deadline),
                     )
                 except anthropic.RateLimitError as exc:
                     wait = _rate_limit_wait_seconds(exc)
@@ -321,6 +401,11 @@ class AnthropicProvider:
                             f"reopening."
                         )
                         raise LLMParserError(f"{last_error} Full response: {exc}") from exc
+                    if deadline is not None and not deadline.allows(wait):
+                        last_error = _deadline_error(
+                            deadline, f"Rate limited; the window reopens in {wait:.0f}s."
+                        )
+                        raise DeadlineExceeded(last_error) from exc
                     time.sleep(wait)
                     continue  # deliberately not `attempt += 1` — see _MAX_RATE_LIMIT_WAITS
                 except anthropic.BadRequestError as exc:
@@ -333,6 +418,30 @@ class AnthropicProvider:
                     messages.append(_reask_message(last_error))
                     attempt += 1
                     continue
+                except (anthropic.APIConnectionError, anthropic.APIStatusError) as exc:
+                    failure = _transient_failure(exc, isinstance(exc, anthropic.APITimeoutError))
+                    if failure is None:
+                        raise
+                    last_error = f"Transport failure, {failure}: {exc}"
+                    if deadline is not None and deadline.expired():
+                        # Most likely the timeout the deadline itself set.
+                        last_error = _deadline_error(deadline, f"The call failed ({failure}).")
+                        raise DeadlineExceeded(last_error) from exc
+                    transport_retries += 1
+                    if transport_retries > _MAX_TRANSPORT_RETRIES:
+                        raise LLMParserError(
+                            f"Gave up after {_MAX_TRANSPORT_RETRIES} transport retries. "
+                            f"Last error: {last_error}"
+                        ) from exc
+                    wait = _transport_wait_seconds(transport_retries)
+                    if deadline is not None and not deadline.allows(wait):
+                        last_error = _deadline_error(
+                            deadline, f"Transport failure ({failure}); next retry in {wait:.1f}s."
+                        )
+                        raise DeadlineExceeded(last_error) from exc
+                    print(f"[llm] {tool_name}: {failure} — retrying in {wait:.1f}s")
+                    time.sleep(wait)
+                    continue  # not `attempt += 1` either — see _MAX_TRANSPORT_RETRIES
 
                 attempt += 1
                 usage = getattr(response, "usage", None)
@@ -390,6 +499,7 @@ class AnthropicProvider:
                 elapsed_ms=round((time.time() - t0) * 1000),
                 failed=None if succeeded else (last_error or "unknown"),
                 raw_payload=raw_payload,
+                transport_retries=transport_retries,
             )
 
 
@@ -401,7 +511,7 @@ class GroqProvider:
 
         self.model = model
         self.max_tokens = max_tokens
-        self._client = groq.Groq(api_key=os.environ.get("GROQ_API_KEY"))
+        self._client = groq.Groq(api_key=os.environ.get("GROQ_API_KEY"), max_retries=0)
         # Same shape as AnthropicProvider.calls, via the same _record_call() -- see the note
         # above ExtractionProvider. A provider swapped in by parameter must not silently drop
         # cost/failure visibility just because it was the second one instrumented.
@@ -415,6 +525,7 @@ class GroqProvider:
         tool_name: str,
         tool_description: str,
         validate: Callable[[dict], Any] | None = None,
+        deadline: Deadline | None = None,
     ) -> dict:
         import groq
         import json
@@ -436,6 +547,7 @@ class GroqProvider:
         tool_choice = {"type": "function", "function": {"name": tool_name}}
         last_error: str = ""
         rate_limit_waits = 0
+        transport_retries = 0
         attempt = 0
         input_tokens = 0
         output_tokens = 0
@@ -445,6 +557,9 @@ class GroqProvider:
 
         try:
             while attempt <= _MAX_RETRIES:
+                if deadline is not None and deadline.expired():
+                    last_error = _deadline_error(deadline, f"Stopped after {attempt} attempt(s).")
+                    raise DeadlineExceeded(last_error)
                 try:
                     response = self._client.chat.completions.create(
                         model=self.model,
@@ -456,6 +571,7 @@ class GroqProvider:
                         # Grammar-constrained decoding is not used on either provider — see the
                         # note above AnthropicProvider. `validate` below guards the payload.
                         temperature=0,
+                        **_request_options(deadline),
                     )
                 except groq.RateLimitError as exc:
                     # The free tier meters tokens per minute and reserves `input + max_tokens`
@@ -477,6 +593,11 @@ class GroqProvider:
                             f"reopening."
                         )
                         raise LLMParserError(f"{last_error} Full response: {exc}") from exc
+                    if deadline is not None and not deadline.allows(wait):
+                        last_error = _deadline_error(
+                            deadline, f"Rate limited; the window reopens in {wait:.0f}s."
+                        )
+                        raise DeadlineExceeded(last_error) from exc
                     time.sleep(wait)
                     continue  # deliberately not `attempt += 1` — see _MAX_RATE_LIMIT_WAITS
                 except groq.BadRequestError as exc:
@@ -489,6 +610,30 @@ class GroqProvider:
                     messages.append(_reask_message(last_error))
                     attempt += 1
                     continue
+                except (groq.APIConnectionError, groq.APIStatusError) as exc:
+                    failure = _transient_failure(exc, isinstance(exc, groq.APITimeoutError))
+                    if failure is None:
+                        raise
+                    last_error = f"Transport failure, {failure}: {exc}"
+                    if deadline is not None and deadline.expired():
+                        # Most likely the timeout the deadline itself set.
+                        last_error = _deadline_error(deadline, f"The call failed ({failure}).")
+                        raise DeadlineExceeded(last_error) from exc
+                    transport_retries += 1
+                    if transport_retries > _MAX_TRANSPORT_RETRIES:
+                        raise LLMParserError(
+                            f"Gave up after {_MAX_TRANSPORT_RETRIES} transport retries. "
+                            f"Last error: {last_error}"
+                        ) from exc
+                    wait = _transport_wait_seconds(transport_retries)
+                    if deadline is not None and not deadline.allows(wait):
+                        last_error = _deadline_error(
+                            deadline, f"Transport failure ({failure}); next retry in {wait:.1f}s."
+                        )
+                        raise DeadlineExceeded(last_error) from exc
+                    print(f"[llm] {tool_name}: {failure} — retrying in {wait:.1f}s")
+                    time.sleep(wait)
+                    continue  # not `attempt += 1` either — see _MAX_TRANSPORT_RETRIES
 
                 attempt += 1
                 usage = getattr(response, "usage", None)
@@ -574,4 +719,5 @@ class GroqProvider:
                 elapsed_ms=round((time.time() - t0) * 1000),
                 failed=None if succeeded else (last_error or "unknown"),
                 raw_payload=raw_payload,
+                transport_retries=transport_retries,
             )
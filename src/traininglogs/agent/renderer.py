@@ -149,6 +149,11 @@ class TerminalRenderer:
             if card.failure_reason:
                 self.console.print(f"    [red]{card.failure_reason}[/red]", highlight=False)
             return
+        if card.last_time and card.last_time.summary:
+            self.console.print(
+                f"    [dim]Last time ({card.last_time.date}):[/dim] {card.last_time.summary}",
+                highlight=False,
+            )
         if card.warmup_rows:
             self._render_warmup_rows(card.warmup_rows)
         self._render_working_set_rows(card.working_set_rows)
@@ -0,0 +1,195 @@
+"""Per-chunk model routing: send each worker chunk to the cheapest model likely to read it right,
+and move it up to the strong model when that turns out to be wrong.
+
+Most chunks are a heading and a handful of programmed `63 x 10` lines -- a faster, cheaper
+model reads those as well as the strong one does. The chunks that need the strong model are the
+long, free-written ones: sets described in prose, corrections mid-line, notes between sets. The
+difference is visible before any call is made, from three cheap features: how long the chunk
+is, how much of it is set-shaped, and whether that exercise has failed to extract before.
+
+A wrong guess toward the fast model is caught, not trusted: if its answer fails validation or
+quotes a source line that isn't in the text, the same chunk is asked again of the strong model
+(see run_worker() in agent/extraction.py). The route taken is recorded on every llm_calls row,
+so route choices can be checked against the accuracy scripts/eval_arms.py measures per model.
+"""
+from __future__ import annotations
+
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, Mapping
+
+from traininglogs.agent.deadline import Deadline
+from traininglogs.agent.providers import ExtractionProvider, call_sink
+
+FAST = "fast"
+STRONG = "strong"
+# The strong model, asked again after the fast one's answer was rejected.
+ESCALATED = "escalated"
+
+# `63 x 10`, `1. 280 x 12 RPE 9.5`, `80kg × 8` -- a weight, a multiplication sign, reps.
+_SET_LINE = re.compile(r"\d+(?:\.\d+)?\s*(?:kg|lbs?)?\s*[x×*]\s*\d+", re.IGNORECASE)
+
+# Scaffolding every chunk carries whatever its content: markdown headings and `**Name:**` /
+# `**Goal:**` field lines. Counted, they would make every short chunk look like prose.
+_SCAFFOLD_LINE = re.compile(r"^\s*(?:#|\*\*[^*]+:\*\*)")
+
+# Measured 2026-10-19 over the 1,011 exercise blocks in inputs/: median 453 characters, and the
+# median block has 43% of its remaining lines set-shaped -- the rest are warmup prose, notes and
+# cues. At most 600 characters and at least half set lines picks out 313 of them (31%): the
+# programmed blocks, with little written around the numbers.
+DEFAULT_MAX_FAST_CHARS = 600
+DEFAULT_MIN_SET_DENSITY = 0.5
+
+
+@dataclass(frozen=True)
+class ChunkFeatures:
+    chars: int
+    lines: int
+    set_lines: int
+
+    @property
+    def set_density(self) -> float:
+        return self.set_lines / self.lines if self.lines else 0.0
+
+
+def chunk_features(text: str) -> ChunkFeatures:
+    """Length, and how many of the chunk's content lines look like a set."""
+    lines = [
+        line for line in text.splitlines()
+        if line.strip() and not _SCAFFOLD_LINE.match(line)
+    ]
+    return ChunkFeatures(
+        chars=len(text),
+        lines=len(lines),
+        set_lines=sum(1 for line in lines if _SET_LINE.search(line)),
+    )
+
+
+class RoutingPolicy:
+    """FAST for a short, mostly set-shaped chunk of an exercise with no placeholder history;
+    STRONG for everything else.
+
+    `placeholder_history` maps a lower-cased exercise name to how often it has come back as a
+    placeholder before (db.fetch.get_placeholder_counts()). One is enough: an exercise that
+    has already beaten a model once is not the place to save money."""
+
+    def __init__(
+        self,
+        max_fast_chars: int = DEFAULT_MAX_FAST_CHARS,
+        min_set_density: float = DEFAULT_MIN_SET_DENSITY,
+        placeholder_history: Mapping[str, int] | None = None,
+    ) -> None:
+        self.max_fast_chars = max_fast_chars
+        self.min_set_density = min_set_density
+        self.placeholder_history = dict(placeholder_history or {})
+
+    def choose(self, chunk: str, name: str) -> str:
+        if self.placeholder_history.get(name.strip().lower(), 0) > 0:
+            return STRONG
+        features = chunk_features(chunk)
+        if features.chars > self.max_fast_chars:
+            return STRONG
+        if features.set_lines == 0 or features.set_density < self.min_set_density:
+            return STRONG
+        return FAST
+
+
+_route: ContextVar[str] = ContextVar("route", default=STRONG)
+
+
+class RoutedProvider:
+    """An ExtractionProvider over two others, `fast` and `strong`. Every call goes to `strong`
+    unless made inside `routed(FAST)` -- which run_worker() does for chunks the policy sends
+    there. Splitter and shell calls see the whole session and always go to `strong`.
+
+    `.calls` carries both providers' records, each with `route` set to the tier that made it,
+    so a fast call, a strong one and an escalation are told apart in llm_calls."""
+
+    def __init__(
+        self,
+        fast: ExtractionProvider,
+        strong: ExtractionProvider,
+        policy: RoutingPolicy | None = None,
+    ) -> None:
+        self.fast = fast
+        self.strong = strong
+        self.policy = policy or RoutingPolicy()
+        # The model that answers for the extraction as a whole, as ingest.extract() stores it.
+        self.model = getattr(strong, "model", None)
+        self.calls: list[dict] = []
+        self._lock = threading.Lock()
+        # Set by detach_late(): where records that arrive late go instead of `.calls`.
+        self._persist_late: Callable[[list[dict]], None] | None = None
+
+    @contextmanager
+    def routed(self, tier: str) -> Iterator[None]:
+        token = _route.set(tier)
+        try:
+            yield
+        finally:
+            _route.reset(token)
+
+    def extract(
+        self,
+        text: str,
+        tool_schema: dict,
+        system_prompt: str,
+        tool_name: str,
+        tool_description: str,
+        validate: Callable[[dict], Any] | None = None,
+        deadline: Deadline | None = None,
+    ) -> dict:
+        tier = _route.get()
+        delegate = self.fast if tier == FAST else self.strong
+        kwargs = {"deadline": deadline} if deadline is not None else {}
+        token = call_sink.set(_RouteSink(self, tier, call_sink.get()))
+        try:
+            return delegate.extract(
+                text, tool_schema, system_prompt, tool_name, tool_description, validate,
+                **kwargs,
+            )
+        finally:
+            call_sink.reset(token)
+
+    def detach_late(self, persist: Callable[[list[dict]], None]) -> None:
+        """Hand records that arrive from now on -- a hedged call's losing leg -- to `persist`,
+        tagged with their route, instead of adding them to `.calls` (see
+        HedgedProvider.detach_late()). Every record comes through this router's sink, so the
+        providers under it need not be told."""
+        with self._lock:
+            self._persist_late = persist
+
+    def drain(self, timeout: float | None = None) -> bool:
+        """Wait for records still to come from either provider (HedgedProvider.drain())."""
+        drained = True
+        for provider in (self.fast, self.strong):
+            if hasattr(provider, "drain"):
+                drained = provider.drain(timeout) and drained
+        return drained
+
+
+class _RouteSink(list):
+    """The call_sink for one routed call. Each record is tagged and handed to the router as it
+    is appended, not when the call returns: a hedged call's losing leg appends its record
+    after that."""
+
+    def __init__(self, router: RoutedProvider, tier: str, outer: list[dict] | None) -> None:
+        super().__init__()
+        self._router = router
+        self._tier = tier
+        self._outer = outer
+
+    def append(self, record: dict) -> None:
+        record["route"] = self._tier
+        with self._router._lock:
+            super().append(record)
+            persist = self._router._persist_late
+            if persist is None:
+                self._router.calls.append(record)
+                if self._outer is not None:
+                    self._outer.append(record)
+        if persist is not None:
+            persist([record])
@@ -0,0 +1,187 @@
+"""Admission to the provider layer, by priority: a person waiting on a card goes first, the
+retry queue next, and back-fills only use whatever capacity is left over.
+
+The API, scripts/regen_historical_ai.py and the eval scripts can all run on one API key, and
+one key has one rate limit. Without a scheduler, each caller just retries into the same 429s as
+the others, and a regen run that keeps the window full leaves the person in front of the
+confirm card waiting behind it, with nothing to say they should go first. Admission is per
+provider call, not per session, so an interactive step gets in between two calls of a batch
+run rather than after all of it.
+
+Within a process, a Scheduler has a fixed number of slots. A waiting caller of a higher class
+is always admitted before any of a lower one, and batch work may never hold more than
+`batch_capacity` of the slots, so the rest are always free for a person.
+
+Across processes -- the API and a regen run are never the same process -- slots cannot be
+counted, so the rule is simpler: lower classes wait for as long as any higher-class work is
+active anywhere. Interactive and background callers hold a shared Postgres advisory lock for
+their class while they wait and run. A lower-class caller is admitted only if it could take
+that lock exclusively, which means no other session holds it. The locks need only a
+connection, not a table, so the database named by `dsn` can be any one that every process can
+reach. It is opt-in (LLM_SCHEDULER_DATABASE_URL, the same value in every process); without it
+the priorities hold within each process only.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+import psycopg2
+
+from traininglogs.agent.deadline import Deadline
+from traininglogs.agent.providers import ExtractionProvider
+
+INTERACTIVE = 0
+BACKGROUND = 1
+BATCH = 2
+PRIORITIES = {"interactive": INTERACTIVE, "background": BACKGROUND, "batch": BATCH}
+
+# First key of the two-int advisory lock form; the second is the priority class. Arbitrary, it
+# only has to differ from any other advisory lock taken on the same database.
+_LOCK_NAMESPACE = 0x7C5C
+
+
+class Scheduler:
+    def __init__(
+        self,
+        capacity: int = 4,
+        batch_capacity: int | None = None,
+        dsn: str | None = None,
+        poll_seconds: float = 0.5,
+    ) -> None:
+        self.capacity = capacity
+        # Half by default: a regen run still moves, and a person still always finds a slot.
+        self.batch_capacity = (
+            batch_capacity if batch_capacity is not None else max(1, capacity // 2)
+        )
+        self.poll_seconds = poll_seconds
+        self._dsn = dsn
+        self._conn = None
+        self._cond = threading.Condition()
+        self._running = [0, 0, 0]
+        self._waiting = [0, 0, 0]
+
+    @contextmanager
+    def admit(self, priority: int, deadline: Deadline | None = None) -> Iterator[None]:
+        """Block until a call of class `priority` may run, and hold its slot for the block.
+
+        Time spent queued counts against `deadline` like any other: past it, this raises
+        DeadlineExceeded instead of admitting a call there is no time left to make."""
+        announced = priority != BATCH
+        with self._cond:
+            if announced:
+                self._lock("pg_advisory_lock_shared", priority)
+            self._waiting[priority] += 1
+            try:
+                while not self._may_run(priority):
+                    if deadline is not None:
+                        deadline.check("Still queued for the model")
+                    # Timed, not only woken by notify(): work in another process finishing
+                    # has no way to notify this one.
+                    self._cond.wait(timeout=self.poll_seconds)
+            except BaseException:
+                if announced:
+                    self._lock("pg_advisory_unlock_shared", priority)
+                raise
+            finally:
+                self._waiting[priority] -= 1
+            self._running[priority] += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._running[priority] -= 1
+                if announced:
+                    self._lock("pg_advisory_unlock_shared", priority)
+                self._cond.notify_all()
+
+    def _may_run(self, priority: int) -> bool:
+        if sum(self._running) >= self.capacity:
+            return False
+        if any(self._waiting[higher] for higher in range(priority)):
+            return False
+        if priority == BATCH and self._running[BATCH] >= self.batch_capacity:
+            return False
+        return not any(self._active_elsewhere(higher) for higher in range(priority))
+
+    def _active_elsewhere(self, priority: int) -> bool:
+        """Does another session hold class `priority`'s shared lock? This session's own never
+        counts: a session's locks never conflict with each other, and in-process work is
+        already governed by the slot counts above."""
+        if self._connection() is None:
+            return False
+        if not self._lock("pg_try_advisory_lock", priority):
+            return True
+        self._lock("pg_advisory_unlock", priority)
+        return False
+
+    def _lock(self, function: str, priority: int) -> bool:
+        conn = self._connection()
+        if conn is None:
+            return True
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT {function}(%s, %s)", (_LOCK_NAMESPACE, priority))
+            result = cur.fetchone()[0]
+        return result is not False
+
+    def _connection(self):
+        if self._dsn is None:
+            return None
+        if self._conn is None or self._conn.closed:
+            self._conn = psycopg2.connect(self._dsn)
+            # Session-level locks, outside any transaction: nothing to commit, and nothing
+            # left open holding a snapshot for the life of the process.
+            self._conn.autocommit = True
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def scheduler_from_env() -> Scheduler:
+    """LLM_CONCURRENCY slots (default 4), shared with other processes through
+    LLM_SCHEDULER_DATABASE_URL when it is set. One per process: the API and each script build
+    theirs once and wrap every provider they make with it."""
+    return Scheduler(
+        capacity=int(os.environ.get("LLM_CONCURRENCY") or 4),
+        dsn=os.environ.get("LLM_SCHEDULER_DATABASE_URL") or None,
+    )
+
+
+class ScheduledProvider:
+    """An ExtractionProvider whose every call is admitted by `scheduler` at `priority` first.
+
+    Wraps a base provider, not a composite. agent/routing.py and agent/hedging.py go around
+    the scheduled ones, so a hedge leg or an escalation waits its turn like any other call,
+    and run_worker() still sees the RoutedProvider it checks for. `.calls` is the inner
+    provider's own list, so records land where they always have."""
+
+    def __init__(
+        self, inner: ExtractionProvider, scheduler: Scheduler, priority: int
+    ) -> None:
+        self.inner = inner
+        self.scheduler = scheduler
+        self.priority = priority
+        self.model = getattr(inner, "model", None)
+        self.calls: list[dict] = getattr(inner, "calls", [])
+
+    def extract(
+        self,
+        text: str,
+        tool_schema: dict,
+        system_prompt: str,
+        tool_name: str,
+        tool_description: str,
+        validate: Callable[[dict], Any] | None = None,
+        deadline: Deadline | None = None,
+    ) -> dict:
+        kwargs = {"deadline": deadline} if deadline is not None else {}
+        with self.scheduler.admit(self.priority, deadline):
+            return self.inner.extract(
+                text, tool_schema, system_prompt, tool_name, tool_description, validate,
+                **kwargs,
+            )
@@ -6,6 +6,7 @@ from traininglogs.agent.validation_card_data import (
     ExerciseCard,
     ExerciseHeader,
     GoalSummary,
+    LastTime,
     MovementRow,
     NotePreview,
     SessionHeader,
@@ -32,14 +33,37 @@ _SESSION_FIELDS = frozenset(
 _SESSION_FIELD_RENAME = {"session_duration_minutes": "duration_minutes"}
 
 
+def _sets_summary(sets: list[dict]) -> str:
+    """exercise_state's last_sets as "60 × 10, 10, 9" -- or "60 × 10, 62.5 × 8+1" when the
+    weight changes; reps alone for unweighted sets."""
+    parts: list[str] = []
+    weight: object = object()
+    for s in sets:
+        reps = "?" if s.get("reps_full") is None else str(s["reps_full"])
+        if s.get("reps_partial"):
+            reps += f"+{s['reps_partial']}"
+        if s.get("weight_kg") != weight:
+            weight = s.get("weight_kg")
+            parts.append(f"{weight:g} × {reps}" if weight is not None else reps)
+        else:
+            parts.append(reps)
+    return ", ".join(parts)
+
+
 class ValidationCardBuilder:
-    def build(self, extract: TrainingLogLLMExtract) -> UserValidationCard:
+    def build(
+        self, extract: TrainingLogLLMExtract, history: dict[str, dict] | None = None
+    ) -> UserValidationCard:
+        """The card for `extract`. `history` is db.fetch.get_exercise_states() for its
+        exercise names. With it, each exercise done before gets a `last_time`. The builder
+        itself never touches the database."""
         uncertain = set(extract.uncertain_fields)
+        history = history or {}
         return UserValidationCard(
             session_header=self._session_header(extract, uncertain),
             warmup_section=self._movement_section("Warmup", extract.warmup),
             exercises=[
-                self._exercise_card(ex, idx, uncertain)
+                self._exercise_card(ex, idx, uncertain, history.get(ex.name))
                 for idx, ex in enumerate(extract.exercises)
             ],
             cooldown_section=self._movement_section("Cooldown", extract.cooldown),
@@ -84,7 +108,7 @@ class ValidationCardBuilder:
         )
 
     def _exercise_card(
-        self, ex: Exercise, ex_idx: int, uncertain: set[str]
+        self, ex: Exercise, ex_idx: int, uncertain: set[str], state: dict | None = None
     ) -> ExerciseCard:
         ex_prefix = f"exercises.{ex_idx}."
         header_uf: set[str] = set()
@@ -110,6 +134,16 @@ class ValidationCardBuilder:
             note_preview=NotePreview(ex.notes) if ex.notes and not failed else None,
             warmup_note_preview=NotePreview(ex.warmup_notes) if ex.warmup_notes else None,
             failure_reason=ex.notes if failed else None,
+            last_time=self._last_time(state) if state else None,
+        )
+
+    def _last_time(self, state: dict) -> LastTime:
+        best = state.get("best_e1rm_kg")
+        return LastTime(
+            date=str(state["last_date"]),
+            summary=_sets_summary(state.get("last_sets") or []),
+            best_e1rm_kg=float(best) if best is not None else None,
+            session_count=state.get("session_count") or 0,
         )
 
     def _goal_summary(self, goal: Goal) -> GoalSummary:
@@ -92,6 +92,16 @@ class ExerciseHeader:
     failed: bool = False
 
 
+@dataclass
+class LastTime:
+    """The exercise as it was last done, from exercise_state: a misread weight or rep count
+    stands out next to it."""
+    date: str
+    summary: str  # "60 × 10, 10, 9": the weight is repeated only when it changes
+    best_e1rm_kg: float | None = None
+    session_count: int = 0
+
+
 @dataclass
 class ExerciseCard:
     header: ExerciseHeader
@@ -102,6 +112,8 @@ class ExerciseCard:
     # Full (untruncated) failure reason — only set when header.failed is True. Kept separate
     # from note_preview, which truncates to NOTE_PREVIEW_CHARS and would hide the actual error.
     failure_reason: str | None = None
+    # Only when the builder was given history and this exercise has been done before.
+    last_time: LastTime | None = None
 
 
 @dataclass
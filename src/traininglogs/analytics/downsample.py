@@ -0,0 +1,166 @@
+"""
+Fewer points for a chart series, whatever the length of the history behind it.
+
+The progression queries return every working set ever logged for an exercise --
+exercise_sets_trend(), goal_vs_actual(), the dashboard's get_all_goal_vs_actual() -- and the
+dashboards inline all of it as chart JSON. That is fine for a season and heavy after a few
+years: a chart a few hundred pixels wide cannot show more than a few hundred points anyway.
+downsample() cuts a series to at most `max_points` rows, by one of three modes:
+
+  top_set  The best row of each session day: the heaviest set, say. Every day stays on the
+           chart, so this is exact for a "top set per day" line, which is what the charts draw.
+  weekly   The best row of each calendar week (Monday to Sunday). Coarser, and steadier.
+  lttb     Largest-Triangle-Three-Buckets (Steinarsson, 2013): splits the series into
+           `max_points` buckets and keeps from each the row that forms the largest triangle with
+           its neighbours' picks. It keeps the peaks, troughs and turns that give a line its
+           shape, where taking every n-th row or bucket averages would flatten them.
+
+Whatever the mode, a result still longer than `max_points` is then cut with LTTB, so the cap
+always holds. The rows that survive are the input's own dicts, unchanged and in order: the
+result has the shape the chart code already reads, and every point is a real set.
+
+Rows are placed by `when(row)` -- a date, an ISO date string, or epoch milliseconds, as the
+dashboards' `x` is -- and compared by `value(row)`. Rows whose value is None cannot be drawn
+and are left out.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Iterable
+
+MODES = ("top_set", "weekly", "lttb")
+
+# A few hundred points is more than a dashboard-width chart can separate.
+DEFAULT_MAX_POINTS = 400
+
+
+def _as_date(when: Any) -> date:
+    if isinstance(when, datetime):
+        return when.date()
+    if isinstance(when, date):
+        return when
+    if isinstance(when, str):
+        return date.fromisoformat(when[:10])
+    return datetime.fromtimestamp(when / 1000, tz=timezone.utc).date()
+
+
+def _position(when: Any) -> float:
+    """`when` on a numeric axis: epoch milliseconds as they are, dates as days."""
+    if isinstance(when, (int, float)):
+        return float(when)
+    return float(_as_date(when).toordinal())
+
+
+def _best_per(
+    rows: list[dict], key: Callable[[dict], Any], value: Callable[[dict], Any]
+) -> list[dict]:
+    """The row with the highest value for each `key(row)`, in the order the keys first appear.
+    Ties go to the earliest row."""
+    best: dict[Any, dict] = {}
+    for row in rows:
+        k = key(row)
+        if k not in best or value(row) > value(best[k]):
+            best[k] = row
+    return list(best.values())
+
+
+def top_set_per_session(
+    rows: Iterable[dict], *, when: Callable[[dict], Any], value: Callable[[dict], Any]
+) -> list[dict]:
+    """The best row of each day."""
+    drawn = [r for r in rows if value(r) is not None]
+    return _best_per(drawn, lambda r: _as_date(when(r)), value)
+
+
+def weekly(
+    rows: Iterable[dict], *, when: Callable[[dict], Any], value: Callable[[dict], Any]
+) -> list[dict]:
+    """The best row of each Monday-to-Sunday week."""
+    def monday(row: dict) -> date:
+        d = _as_date(when(row))
+        return d - timedelta(days=d.weekday())
+
+    drawn = [r for r in rows if value(r) is not None]
+    return _best_per(drawn, monday, value)
+
+
+def lttb(
+    rows: Iterable[dict],
+    max_points: int,
+    *,
+    when: Callable[[dict], Any],
+    value: Callable[[dict], Any],
+) -> list[dict]:
+    """At most `max_points` of `rows`, chosen by Largest-Triangle-Three-Buckets. The first and
+    last rows are always kept. `rows` must be in `when` order."""
+    drawn = [r for r in rows if value(r) is not None]
+    n = len(drawn)
+    if max_points >= n:
+        return drawn
+    if max_points <= 2:
+        return [drawn[0], drawn[-1]][:max(max_points, 0)]
+
+    xs = [_position(when(r)) for r in drawn]
+    ys = [float(value(r)) for r in drawn]
+    # The first and last rows are buckets of their own; the rest share max_points - 2.
+    every = (n - 2) / (max_points - 2)
+    kept = [0]
+    a = 0
+    for i in range(max_points - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        # The next bucket's average is the triangle's third corner; after the last bucket,
+        # the last row is.
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n)
+        if next_start >= next_end or i == max_points - 3:
+            next_start, next_end = n - 1, n
+        span = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / span
+        avg_y = sum(ys[next_start:next_end]) / span
+
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            # Twice the triangle's area; only the comparison matters.
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return [drawn[i] for i in kept]
+
+
+def downsample(
+    rows: Iterable[dict],
+    max_points: int = DEFAULT_MAX_POINTS,
+    *,
+    mode: str = "lttb",
+    when: Callable[[dict], Any],
+    value: Callable[[dict], Any],
+) -> list[dict]:
+    """`rows` reduced by `mode` (one of MODES), then cut to at most `max_points` with LTTB.
+    `rows` must be in `when` order."""
+    if mode == "top_set":
+        rows = top_set_per_session(rows, when=when, value=value)
+    elif mode == "weekly":
+        rows = weekly(rows, when=when, value=value)
+    elif mode != "lttb":
+        raise ValueError(f"unknown downsampling mode {mode!r}: expected one of {MODES}")
+    return lttb(rows, max_points, when=when, value=value)
+
+
+def lift_value(sets: list[dict]) -> Callable[[dict], Any]:
+    """How to rank an exercise's sets (exercise_sets_trend() rows): by weight, or by reps for a
+    bodyweight exercise -- one where no set has a weight -- as the lift charts draw them."""
+    field = "weight_kg" if any(s["weight_kg"] is not None for s in sets) else "reps_full"
+    return lambda s: s[field]
+
+
+def epley(weight_kg: Any, reps: Any) -> float | None:
+    """Epley's estimated 1RM, as the progression charts plot it: the weight itself for a set
+    without reps. For ranking sets by e1RM when downsampling."""
+    if weight_kg is None:
+        return None
+    if not reps or reps < 1:
+        return float(weight_kg)
+    return float(weight_kg) * (1 + reps / 30)
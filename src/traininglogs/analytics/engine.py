@@ -0,0 +1,516 @@
+"""
+Dashboard analytics over one in-memory, columnar snapshot of every working set.
+
+The named queries in analytics.queries each re-join working_sets x exercises x sessions, and a
+dashboard build runs a dozen of them -- two per charted exercise in scripts/build_dashboard.py
+-- then loops over the row dicts in Python. The whole training history is a few tens of
+thousands of sets, which fits in a handful of NumPy arrays. WorkingSets.load() reads it with one
+query. Each metric is then a vectorized group-by over those arrays: PRs, e1RM curves, tonnage,
+fatigue and deload stats.
+
+Each method returns the same keys, row order and JSON values as the query or dashboard helper
+it stands in for, so a builder can use either. Numbers come back as float or int rather than
+Decimal, and dates as datetime.date. Averages are computed in floating point where Postgres
+uses exact numerics, so one landing exactly on a rounding boundary can differ in its last
+digit.
+
+NumPy is an optional dependency (`pip install traininglogs[analytics]`). Importing this module
+without it raises ImportError, and the dashboard builders fall back to the SQL queries.
+"""
+from __future__ import annotations
+
+from datetime import date
+
+import numpy as np
+from psycopg2.extensions import connection as Connection
+
+# Stands in for NULL in the integer columns (phase, week, set number), which NumPy can't hold
+# as NaN.
+_NULL = np.iinfo(np.int64).min
+
+_MS_PER_DAY = 86_400_000
+
+_REP_BRACKETS = (1, 3, 5, 8, 10)
+
+_SNAPSHOT_SQL = """
+    SELECT
+        s.session_id,
+        s.date,
+        s.phase,
+        s.week,
+        s.is_deload_week,
+        s.focus,
+        s.source_file,
+        e.name,
+        e.goal_weight_kg,
+        e.goal_rep_min,
+        e.goal_rep_max,
+        ws.id IS NOT NULL AS has_set,
+        ws.number,
+        ws.weight_kg,
+        ws.reps_full,
+        ws.reps_partial,
+        ws.rpe,
+        ws.rep_quality,
+        ws.notes
+    FROM sessions s
+    LEFT JOIN exercises e     ON e.session_id = s.session_id
+    LEFT JOIN working_sets ws ON ws.exercise_id = e.id
+    ORDER BY s.date ASC, s.session_id ASC, e.number ASC, ws.number ASC
+"""
+
+
+def _ints(values) -> np.ndarray:
+    return np.array([_NULL if v is None else v for v in values], dtype=np.int64)
+
+
+def _floats(values) -> np.ndarray:
+    # None becomes NaN, Decimal becomes float.
+    return np.array(values, dtype=np.float64).reshape(-1)
+
+
+def _days(values) -> np.ndarray:
+    return np.array(values, dtype="datetime64[D]").astype(np.int64).reshape(-1)
+
+
+def _int_or_none(value) -> int | None:
+    return None if value == _NULL else int(value)
+
+
+def _float_or_none(value) -> float | None:
+    return None if np.isnan(value) else float(value)
+
+
+def _as_date(day) -> date:
+    return np.datetime64(int(day), "D").astype(date)
+
+
+def _half_away(values, digits: int = 0):
+    """Rounded like Postgres rounds numerics: halves away from zero, where np.round and
+    round() go to the even neighbour."""
+    scale = 10.0 ** digits
+    return np.sign(values) * np.floor(np.abs(values) * scale + 0.5) / scale
+
+
+def _bigint(value) -> int:
+    """`value::bigint`."""
+    return int(_half_away(value))
+
+
+def _round(values: np.ndarray, digits: int) -> list[float | None]:
+    return [None if np.isnan(v) else v for v in _half_away(values, digits).tolist()]
+
+
+def _mean(total: np.ndarray, count: np.ndarray) -> np.ndarray:
+    """Per-group averages, NaN where a group had nothing to average (SQL's NULL)."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+
+def _group(*keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """The distinct rows of `keys` (sorted) and, for every element, its row's index."""
+    stacked = np.stack(keys, axis=1)
+    groups, inverse = np.unique(stacked, axis=0, return_inverse=True)
+    return groups, inverse.reshape(-1)
+
+
+def _best(group: np.ndarray, *order: np.ndarray) -> np.ndarray:
+    """For each distinct `group`, the index of its element that sorts last by `order` (the
+    last key is the primary one, as for np.lexsort): an argmax with tie-breaks."""
+    idx = np.lexsort((*order, group))
+    last = np.r_[group[idx][1:] != group[idx][:-1], True]
+    return idx[last]
+
+
+class WorkingSets:
+    """Every working set, one NumPy column per field, plus one row per session.
+
+    Exercises are integer codes into `exercise_names`. Dates are day numbers since 1970-01-01.
+    The set columns hold only actual sets. Sessions and exercises with none still count in
+    the per-session columns, as they do in the LEFT JOINs of overview_stats().
+    """
+
+    def __init__(self, columns: dict[str, list]) -> None:
+        # The snapshot's rows come grouped by session, so a session starts wherever the id
+        # changes.
+        sessions = np.array(columns["session_id"], dtype=object)
+        starts = np.r_[True, sessions[1:] != sessions[:-1]] if len(sessions) else np.zeros(
+            0, dtype=bool
+        )
+        first = np.flatnonzero(starts)
+        self.session_ids = sessions[first]
+        self.session_day = _days(columns["date"])[first]
+        self.session_phase = _ints(columns["phase"])[first]
+        self.session_week = _ints(columns["week"])[first]
+        self.session_deload = np.array(
+            [bool(v) for v in columns["is_deload_week"]], dtype=bool
+        ).reshape(-1)[first]
+        self.session_focus = np.array(columns["focus"], dtype=object)[first]
+        self.session_source = np.array(columns["source_file"], dtype=object)[first]
+
+        has_set = np.array(columns["has_set"], dtype=bool).reshape(-1)
+        self.session = (np.cumsum(starts) - 1)[has_set]
+
+        names = np.array(columns["name"], dtype=object)[has_set]
+        self.exercise_names, exercise = np.unique(names.astype(str), return_inverse=True)
+        self.exercise = exercise.reshape(-1)
+        self._lower_names = np.char.lower(self.exercise_names.astype(str))
+
+        self.day = self.session_day[self.session]
+        self.phase = self.session_phase[self.session]
+        self.week = self.session_week[self.session]
+        self.deload = self.session_deload[self.session]
+        self.set_number = _ints(columns["number"])[has_set]
+        self.weight = _floats(columns["weight_kg"])[has_set]
+        self.reps = _floats(columns["reps_full"])[has_set]
+        self.partial = _floats(columns["reps_partial"])[has_set]
+        self.rpe = _floats(columns["rpe"])[has_set]
+        self.quality = np.array(columns["rep_quality"], dtype=object)[has_set]
+        self.notes = np.array(columns["notes"], dtype=object)[has_set]
+        self.goal_weight = _floats(columns["goal_weight_kg"])[has_set]
+        self.goal_rep_min = _floats(columns["goal_rep_min"])[has_set]
+        self.goal_rep_max = _floats(columns["goal_rep_max"])[has_set]
+
+    @classmethod
+    def load(cls, conn: Connection) -> "WorkingSets":
+        """The snapshot, in one query."""
+        with conn.cursor() as cur:
+            cur.execute(_SNAPSHOT_SQL)
+            cols = [d[0] for d in cur.description]
+            rows = cur.fetchall()
+        values = list(zip(*rows)) if rows else [() for _ in cols]
+        return cls(dict(zip(cols, (list(v) for v in values))))
+
+    def __len__(self) -> int:
+        return len(self.weight)
+
+    def _named(self, exercise_name: str) -> np.ndarray:
+        """Mask of the sets of `exercise_name`, matched case-insensitively like the queries'
+        LOWER(e.name) = LOWER(%s)."""
+        codes = np.flatnonzero(self._lower_names == exercise_name.lower())
+        return np.isin(self.exercise, codes)
+
+    # --- whole-history numbers ------------------------------------------------------------
+
+    def overview(self) -> dict:
+        """analytics.queries.overview_stats()."""
+        if not len(self.session_ids):
+            return {
+                "total_tonnage_kg": 0, "weeks_trained": 0, "current_phase": None,
+                "current_week": None, "last_session_date": None, "total_sessions": 0,
+            }
+        weeks = len(_group(self.session_phase, self.session_week)[0])
+        last = len(self.session_ids) - 1
+        return {
+            "total_tonnage_kg": _bigint(np.nansum(self.weight * self.reps)),
+            "weeks_trained": weeks,
+            "current_phase": _int_or_none(self.session_phase[last]),
+            "current_week": _int_or_none(self.session_week[last]),
+            "last_session_date": _as_date(self.session_day[last]),
+            "total_sessions": len(self.session_ids),
+        }
+
+    def session_list(self) -> list[dict]:
+        """analytics.queries.session_list(): newest first."""
+        order = np.arange(len(self.session_ids))[::-1]
+        return [
+            {
+                "session_id": self.session_ids[i],
+                "date": _as_date(self.session_day[i]),
+                "phase": _int_or_none(self.session_phase[i]),
+                "week": _int_or_none(self.session_week[i]),
+                "focus": self.session_focus[i],
+                "is_deload_week": bool(self.session_deload[i]),
+                "source_file": self.session_source[i],
+            }
+            for i in order
+        ]
+
+    def weekly_tonnage_by_phase(self) -> list[dict]:
+        """analytics.queries.weekly_tonnage_by_phase()."""
+        if not len(self):
+            return []
+        weeks, inv = _group(self.phase, self.week)
+        n = len(weeks)
+        tonnage = np.bincount(inv, np.nan_to_num(self.weight * self.reps), n)
+        rpe_known = ~np.isnan(self.rpe)
+        avg_rpe = _mean(
+            np.bincount(inv, np.where(rpe_known, self.rpe, 0.0), n),
+            np.bincount(inv, rpe_known, n),
+        )
+        deload = np.bincount(inv, self.deload, n) > 0
+        sets = np.bincount(inv, minlength=n)
+        return [
+            {
+                "phase": _int_or_none(phase),
+                "week": _int_or_none(week),
+                "is_deload_week": bool(is_deload),
+                "tonnage_kg": _bigint(t),
+                "working_sets": int(count),
+                "avg_rpe": rpe,
+            }
+            for (phase, week), is_deload, t, count, rpe in zip(
+                weeks, deload, tonnage, sets, _round(avg_rpe, 2)
+            )
+        ]
+
+    def deload_effect(self) -> list[dict]:
+        """analytics.queries.deload_effect(): the week before, of and after each deload."""
+        if not len(self):
+            return []
+        weeks, inv = _group(self.phase, self.week)
+        n = len(weeks)
+        product = self.weight * self.reps
+        known = ~np.isnan(product)
+        tonnage = np.where(
+            np.bincount(inv, known, n) > 0,
+            np.bincount(inv, np.where(known, product, 0.0), n),
+            np.nan,
+        )
+        rpe_known = ~np.isnan(self.rpe)
+        avg_rpe = _half_away(
+            _mean(
+                np.bincount(inv, np.where(rpe_known, self.rpe, 0.0), n),
+                np.bincount(inv, rpe_known, n),
+            ),
+            2,
+        )
+        deload = np.bincount(inv, self.deload, n) > 0
+        index = {(int(p), int(w)): i for i, (p, w) in enumerate(weeks)}
+
+        def at(phase: int, week: int) -> tuple[float | None, int | None]:
+            # NULL weeks never match, as in the SQL's equality joins.
+            i = index.get((phase, week)) if _NULL not in (phase, week) else None
+            if i is None:
+                return None, None
+            t = tonnage[i]
+            return _float_or_none(avg_rpe[i]), None if np.isnan(t) else _bigint(t)
+
+        result = []
+        for i in np.flatnonzero(deload):
+            phase, week = (int(v) for v in weeks[i])
+            pre, cur, post = at(phase, week - 1), at(phase, week), at(phase, week + 1)
+            result.append({
+                "phase": _int_or_none(phase),
+                "deload_week": _int_or_none(week),
+                "pre_avg_rpe": pre[0],
+                "deload_avg_rpe": cur[0],
+                "post_avg_rpe": post[0],
+                "pre_tonnage_kg": pre[1],
+                "deload_tonnage_kg": cur[1],
+                "post_tonnage_kg": post[1],
+            })
+        return result
+
+    def fatigue_within_phase(self, phase: int) -> list[dict]:
+        """analytics.queries.fatigue_within_phase()."""
+        mask = self.phase == phase
+        if not mask.any():
+            return []
+        weeks, inv = _group(self.week[mask], self.deload[mask].astype(np.int64))
+        n = len(weeks)
+        rpe = self.rpe[mask]
+        rpe_known = ~np.isnan(rpe)
+        full = np.nan_to_num(self.reps[mask])
+        partial = np.nan_to_num(self.partial[mask])
+        quality = self.quality[mask]
+        rated = np.array([q is not None for q in quality], dtype=bool)
+        good = np.isin(quality, ["good", "perfect"])
+
+        avg_rpe = _mean(
+            np.bincount(inv, np.where(rpe_known, rpe, 0.0), n), np.bincount(inv, rpe_known, n)
+        )
+        partial_share = _mean(
+            np.bincount(inv, partial, n), np.bincount(inv, full + partial, n)
+        ) * 100
+        good_share = _mean(np.bincount(inv, good, n), np.bincount(inv, rated, n)) * 100
+        sets = np.bincount(inv, minlength=n)
+        return [
+            {
+                "week": _int_or_none(week),
+                "is_deload_week": bool(is_deload),
+                "avg_rpe": a,
+                "partial_rep_share_pct": p,
+                "good_rep_share_pct": g,
+                "total_sets": int(count),
+            }
+            for (week, is_deload), a, p, g, count in zip(
+                weeks, _round(avg_rpe, 2), _round(partial_share, 2), _round(good_share, 2), sets
+            )
+        ]
+
+    # --- per exercise ---------------------------------------------------------------------
+
+    def exercise_list(self, min_sets: int = 10) -> list[dict]:
+        """analytics.queries.exercise_list(): most-trained first."""
+        n = len(self.exercise_names)
+        counts = np.bincount(self.exercise, minlength=n)
+        first = np.full(n, np.iinfo(np.int64).max)
+        last = np.full(n, np.iinfo(np.int64).min)
+        np.minimum.at(first, self.exercise, self.day)
+        np.maximum.at(last, self.exercise, self.day)
+        keep = np.flatnonzero(counts >= min_sets)
+        keep = keep[np.argsort(-counts[keep], kind="stable")]
+        return [
+            {
+                "exercise": str(self.exercise_names[i]),
+                "set_count": int(counts[i]),
+                "first_date": _as_date(first[i]),
+                "last_date": _as_date(last[i]),
+            }
+            for i in keep
+        ]
+
+    def exercises_with_sessions(self, min_sessions: int = 3) -> list[str]:
+        """Exercises with a weighted set in at least `min_sessions` sessions, by name."""
+        weighted = ~np.isnan(self.weight)
+        if not weighted.any():
+            return []
+        pairs, _ = _group(self.exercise[weighted], self.session[weighted])
+        sessions = np.bincount(pairs[:, 0], minlength=len(self.exercise_names))
+        return [str(name) for name in self.exercise_names[sessions >= min_sessions]]
+
+    def personal_records(self) -> list[dict]:
+        """analytics.queries.personal_records(): the heaviest set of each exercise, the most
+        recent one on a tie."""
+        weighted = np.flatnonzero(~np.isnan(self.weight))
+        if not len(weighted):
+            return []
+        best = weighted[_best(self.exercise[weighted], self.day[weighted],
+                              self.weight[weighted])]
+        return [
+            {
+                "exercise": str(self.exercise_names[self.exercise[i]]),
+                "weight_kg": float(self.weight[i]),
+                "reps_full": None if np.isnan(self.reps[i]) else int(self.reps[i]),
+                "date": _as_date(self.day[i]),
+                "phase": _int_or_none(self.phase[i]),
+                "week": _int_or_none(self.week[i]),
+            }
+            for i in best
+        ]
+
+    def e1rm(self) -> np.ndarray:
+        """Epley estimated one-rep max of every set, rounded like key_lift_prs(); NaN for a set
+        without both a positive weight and positive reps."""
+        valid = (self.weight > 0) & (self.reps > 0)
+        with np.errstate(invalid="ignore"):
+            return np.where(valid, _half_away(self.weight * (1 + self.reps / 30), 2), np.nan)
+
+    def key_lift_prs(self, key_lifts: list[str]) -> dict:
+        """analytics.queries.key_lift_prs(): best weight at 1, 3, 5, 8 and 10 reps, and the
+        best e1RM, for each lift; the most recent date wins a tie."""
+        e1rm = self.e1rm()
+        result: dict = {}
+        for lift in key_lifts:
+            named = self._named(lift)
+            lift_data: dict = {"rep_prs": {}, "e1rm_kg": None, "e1rm_date": None}
+            # One lexsort per lift, ranking every set by (reps, weight, date).
+            candidates = np.flatnonzero(named & (self.weight > 0) & np.isin(self.reps,
+                                                                            _REP_BRACKETS))
+            if len(candidates):
+                for i in candidates[_best(self.reps[candidates], self.day[candidates],
+                                          self.weight[candidates])]:
+                    lift_data["rep_prs"][int(self.reps[i])] = {
+                        "weight_kg": float(self.weight[i]), "date": str(_as_date(self.day[i])),
+                    }
+            rated = np.flatnonzero(named & ~np.isnan(e1rm))
+            if len(rated):
+                i = rated[np.lexsort((self.day[rated], e1rm[rated]))[-1]]
+                lift_data["e1rm_kg"] = float(e1rm[i])
+                lift_data["e1rm_date"] = str(_as_date(self.day[i]))
+            result[lift] = lift_data
+        return result
+
+    def e1rm_curve(self, exercise_name: str) -> list[dict]:
+        """The best e1RM of each training day for an exercise, oldest first."""
+        e1rm = self.e1rm()
+        rated = np.flatnonzero(self._named(exercise_name) & ~np.isnan(e1rm))
+        if not len(rated):
+            return []
+        best = rated[_best(self.day[rated], e1rm[rated])]
+        return [
+            {"date": _as_date(self.day[i]), "e1rm_kg": float(e1rm[i])} for i in best
+        ]
+
+    def exercise_sets_trend(self, exercise_name: str) -> list[dict]:
+        """analytics.queries.exercise_sets_trend()."""
+        rows = np.flatnonzero(self._named(exercise_name))
+        rows = rows[np.lexsort((self.set_number[rows], self.day[rows]))]
+        return [
+            {
+                "date": _as_date(self.day[i]),
+                "phase": _int_or_none(self.phase[i]),
+                "week": _int_or_none(self.week[i]),
+                "is_deload_week": bool(self.deload[i]),
+                "set_number": _int_or_none(self.set_number[i]),
+                "weight_kg": _float_or_none(self.weight[i]),
+                "reps_full": None if np.isnan(self.reps[i]) else int(self.reps[i]),
+                "reps_partial": None if np.isnan(self.partial[i]) else int(self.partial[i]),
+                "rpe": _float_or_none(self.rpe[i]),
+                "rep_quality": self.quality[i],
+                "notes": self.notes[i],
+            }
+            for i in rows
+        ]
+
+    def goal_vs_actual(self, exercise_name: str) -> list[dict]:
+        """analytics.queries.goal_vs_actual()."""
+        rows = np.flatnonzero(self._named(exercise_name) & ~np.isnan(self.weight))
+        rows = rows[np.lexsort((self.set_number[rows], self.day[rows]))]
+        return [
+            {
+                "date": _as_date(self.day[i]),
+                "phase": _int_or_none(self.phase[i]),
+                "week": _int_or_none(self.week[i]),
+                "set_number": _int_or_none(self.set_number[i]),
+                "actual_kg": float(self.weight[i]),
+                "goal_weight_kg": _float_or_none(self.goal_weight[i]),
+                "reps_full": None if np.isnan(self.reps[i]) else int(self.reps[i]),
+                "rpe": _float_or_none(self.rpe[i]),
+            }
+            for i in rows
+        ]
+
+    def goal_vs_actual_series(self, exercise_names: list[str]) -> dict:
+        """The progression chart's points for each exercise, named exactly: every weighted set
+        as {x, y, reps, rpe, set_n, date}, and each day's goal as {x, goal_kg, goal_reps,
+        date}. `x` is the day's UTC midnight in epoch milliseconds, as the charts take it."""
+        result: dict = {}
+        codes = np.searchsorted(self.exercise_names, exercise_names)
+        for name, code in zip(exercise_names, codes):
+            if code >= len(self.exercise_names) or self.exercise_names[code] != name:
+                continue
+            rows = np.flatnonzero((self.exercise == code) & ~np.isnan(self.weight))
+            if not len(rows):
+                continue
+            rows = rows[np.lexsort((self.set_number[rows], self.day[rows]))]
+            day = self.day[rows]
+            x = (day * _MS_PER_DAY).tolist()
+            dates = [str(d) for d in day.astype("datetime64[D]")]
+            sets = [
+                {"x": xi, "y": y, "reps": r, "rpe": rpe, "set_n": n, "date": d}
+                for xi, y, r, rpe, n, d in zip(
+                    x,
+                    self.weight[rows].tolist(),
+                    [None if np.isnan(v) else int(v) for v in self.reps[rows]],
+                    [None if np.isnan(v) else v for v in self.rpe[rows].tolist()],
+                    [_int_or_none(v) for v in self.set_number[rows]],
+                    dates,
+                )
+            ]
+            # Each day's first set that carries a goal.
+            with_goal = np.flatnonzero(~np.isnan(self.goal_weight[rows]))
+            _, first = np.unique(day[with_goal], return_index=True)
+            goals = []
+            for j in with_goal[first]:
+                rep_min, rep_max = self.goal_rep_min[rows[j]], self.goal_rep_max[rows[j]]
+                both = rep_min > 0 and rep_max > 0
+                goals.append({
+                    "x": x[j],
+                    "goal_kg": float(self.goal_weight[rows[j]]),
+                    "goal_reps": (rep_min + rep_max) / 2 if both else None,
+                    "date": dates[j],
+                })
+            result[name] = {"sets": sets, "goals": goals}
+        return result
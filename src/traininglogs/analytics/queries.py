@@ -1,12 +1,20 @@
 """
 Reusable training analytics queries.
 All functions take a psycopg2 connection and return plain dicts/lists.
+Named queries are @read_cached: with the read cache on (db/cache.py), don't mutate results.
 Add new queries here as useful patterns emerge.
 """
 
+from datetime import date
+from typing import Iterator
+from uuid import uuid4
+
 from psycopg2.extensions import connection as Connection
 
+from traininglogs.db.cache import read_cached
+
 
+@read_cached
 def exercise_progression(conn: Connection, exercise_name: str) -> list[dict]:
     """Weight and reps over time for a given exercise. One row per working set."""
     with conn.cursor() as cur:
@@ -34,37 +42,111 @@ def exercise_progression(conn: Connection, exercise_name: str) -> list[dict]:
         return [dict(zip(cols, row)) for row in cur.fetchall()]
 
 
+@read_cached
 def personal_records(conn: Connection) -> list[dict]:
-    """Heaviest weight lifted per exercise (across all working sets)."""
+    """Heaviest weight lifted per exercise (across all working sets), from current_prs."""
     with conn.cursor() as cur:
         cur.execute(
             """
-            WITH ranked AS (
-                SELECT
-                    e.name          AS exercise,
-                    ws.weight_kg,
-                    ws.reps_full,
-                    s.date,
-                    s.phase,
-                    s.week,
-                    ROW_NUMBER() OVER (
-                        PARTITION BY e.name ORDER BY ws.weight_kg DESC
-                    ) AS rn
-                FROM working_sets ws
-                JOIN exercises e ON e.id = ws.exercise_id
-                JOIN sessions s ON s.session_id = e.session_id
-                WHERE ws.weight_kg IS NOT NULL
-            )
-            SELECT exercise, weight_kg, reps_full, date, phase, week
-            FROM ranked
-            WHERE rn = 1
-            ORDER BY exercise ASC
+            SELECT
+                p.exercise,
+                p.weight_kg,
+                p.reps_full,
+                p.date,
+                s.phase,
+                s.week
+            FROM current_prs p
+            JOIN sessions s ON s.session_id = p.session_id
+            WHERE p.record = 'weight'
+            ORDER BY p.exercise ASC
             """
         )
         cols = [d[0] for d in cur.description]
         return [dict(zip(cols, row)) for row in cur.fetchall()]
 
 
+@read_cached
+def pr_events_since(conn: Connection, since: date) -> list[dict]:
+    """
+    Records set on or after `since`, oldest first: each with the value it beat
+    (previous_kg, None for an exercise's first). record is 'weight', 'reps' (best at exactly
+    `reps`) or 'e1rm'; value_kg is the weight, or the e1RM estimate.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT
+                exercise,
+                record,
+                reps,
+                value_kg,
+                weight_kg,
+                reps_full,
+                previous_kg,
+                date,
+                session_id
+            FROM pr_events
+            WHERE date >= %s
+            ORDER BY date ASC, exercise ASC, record ASC, reps ASC, id ASC
+            """,
+            (since,),
+        )
+        cols = [d[0] for d in cur.description]
+        return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+
+@read_cached
+def training_load(
+    conn: Connection,
+    since: date | None = None,
+    until: date | None = None,
+    last_weeks: int | None = None,
+) -> list[dict]:
+    """
+    Rolling load by calendar day, oldest first, from daily_load (see schema.sql): the day's
+    tonnage, sets and sessions, then 7-day acute and 28-day chronic (weekly average) tonnage
+    and sets, the acute:chronic ratio, monotony and strain. Rest days are rows of zero load.
+    The series ends at the latest session. `last_weeks` keeps only that many weeks up to it --
+    bounded in SQL, for a chart that needs no date of its own to ask for them.
+    """
+    conditions, params = [], []
+    if last_weeks is not None:
+        conditions.append("date >= (SELECT MAX(date) FROM daily_load) - %s")
+        params.append(last_weeks * 7)
+    if since is not None:
+        conditions.append("date >= %s")
+        params.append(since)
+    if until is not None:
+        conditions.append("date <= %s")
+        params.append(until)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT
+                date,
+                tonnage_kg,
+                working_sets,
+                sessions,
+                acute_tonnage_kg,
+                chronic_tonnage_kg,
+                acute_sets,
+                chronic_sets,
+                acwr,
+                monotony,
+                strain
+            FROM daily_load
+            {where}
+            ORDER BY date ASC
+            """,
+            params,
+        )
+        cols = [d[0] for d in cur.description]
+        return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+
+@read_cached
 def volume_by_session(conn: Connection, phase: int | None = None) -> list[dict]:
     """Total working sets per session, optionally filtered by phase."""
     params = []
@@ -96,6 +178,7 @@ def volume_by_session(conn: Connection, phase: int | None = None) -> list[dict]:
         return [dict(zip(cols, row)) for row in cur.fetchall()]
 
 
+@read_cached
 def rpe_trend(conn: Connection, phase: int | None = None) -> list[dict]:
     """Average RPE per session over time. Shows if you're working harder."""
     params: list = [phase] if phase is not None else []
@@ -125,6 +208,7 @@ def rpe_trend(conn: Connection, phase: int | None = None) -> list[dict]:
         return [dict(zip(cols, row)) for row in cur.fetchall()]
 
 
+@read_cached
 def top_rpe_sets(conn: Connection, n: int = 10) -> list[dict]:
     """The N hardest sets you've ever done (RPE 10, sorted by weight)."""
     with conn.cursor() as cur:
@@ -154,6 +238,7 @@ def top_rpe_sets(conn: Connection, n: int = 10) -> list[dict]:
         return [dict(zip(cols, row)) for row in cur.fetchall()]
 
 
+@read_cached
 def sessions_per_week(conn: Connection) -> list[dict]:
     """Number of sessions logged per phase/week. Shows training consistency."""
     with conn.cursor() as cur:
@@ -174,6 +259,7 @@ def sessions_per_week(conn: Connection) -> list[dict]:
         return [dict(zip(cols, row)) for row in cur.fetchall()]
 
 
+@read_cached
 def failure_technique_usage(conn: Connection) -> list[dict]:
     """How often each failure technique (MyoReps, LLP, etc.) has been used."""
     with conn.cursor() as cur:
@@ -192,17 +278,84 @@ def failure_technique_usage(conn: Connection) -> list[dict]:
         return [dict(zip(cols, row)) for row in cur.fetchall()]
 
 
-def custom_query(conn: Connection, sql: str, params: list | None = None) -> list[dict]:
+# custom_query() guards: how long the query may run, how many rows it may return, and how many
+# rows come over from the server at a time.
+CUSTOM_QUERY_TIMEOUT_MS = 10_000
+CUSTOM_QUERY_MAX_ROWS = 10_000
+CUSTOM_QUERY_BATCH_SIZE = 500
+
+
+class RowLimitExceeded(Exception):
+    """A custom query returned more than its `max_rows`."""
+
+
+def iter_custom_query(
+    conn: Connection,
+    sql: str,
+    params: list | None = None,
+    *,
+    timeout_ms: int = CUSTOM_QUERY_TIMEOUT_MS,
+    max_rows: int = CUSTOM_QUERY_MAX_ROWS,
+    batch_size: int = CUSTOM_QUERY_BATCH_SIZE,
+) -> Iterator[dict]:
     """
-    Run an arbitrary read-only SQL query against the DB.
-    Use for ad-hoc exploration. Promote useful queries to named functions above.
+    Run an arbitrary SQL query and yield its rows as dicts, `batch_size` at a time.
+
+    Guarded, since the SQL is whatever someone typed:
+    - it runs read-only, so it cannot write to any table;
+    - Postgres cancels it after `timeout_ms` (QueryCanceled);
+    - rows come through a named server-side cursor, so memory holds one batch, not the result;
+    - the row after `max_rows` raises RowLimitExceeded rather than being fetched.
+
+    The guards live in a savepoint that is rolled back when the rows run out, fail or stop
+    being read, so they end with the query: the caller's transaction goes on as before, still
+    writable, with no timeout, and intact even if the query failed. Needs a connection that is
+    not in autocommit mode.
+
+    The cursor and savepoint are named per call, so a second query can be read while the first
+    is still open on the same connection (a fixed name fails with "cursor already exists").
     """
+    name = f"custom_query_{uuid4().hex}"
     with conn.cursor() as cur:
-        cur.execute(sql, params or [])
-        cols = [d[0] for d in cur.description]
-        return [dict(zip(cols, row)) for row in cur.fetchall()]
+        cur.execute(f"SAVEPOINT {name}")
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SET LOCAL transaction_read_only = on")
+            cur.execute("SET LOCAL statement_timeout = %s", (timeout_ms,))
+        with conn.cursor(name=name) as cur:
+            cur.itersize = batch_size
+            cur.execute(sql, params or [])
+            cols = None
+            for count, row in enumerate(cur, start=1):
+                if count > max_rows:
+                    raise RowLimitExceeded(f"custom query returned more than {max_rows} rows")
+                if cols is None:
+                    cols = [d[0] for d in cur.description]
+                yield dict(zip(cols, row))
+    finally:
+        with conn.cursor() as cur:
+            cur.execute(f"ROLLBACK TO SAVEPOINT {name}")
+            cur.execute(f"RELEASE SAVEPOINT {name}")
+
+
+def custom_query(
+    conn: Connection,
+    sql: str,
+    params: list | None = None,
+    *,
+    timeout_ms: int = CUSTOM_QUERY_TIMEOUT_MS,
+    max_rows: int = CUSTOM_QUERY_MAX_ROWS,
+) -> list[dict]:
+    """
+    Run an arbitrary read-only SQL query against the DB, under iter_custom_query()'s guards.
+    Use for ad-hoc exploration. Promote useful queries to named functions above.
+    """
+    return list(
+        iter_custom_query(conn, sql, params, timeout_ms=timeout_ms, max_rows=max_rows)
+    )
 
 
+@read_cached
 def overview_stats(conn: Connection) -> dict:
     """Hero-strip numbers: total tonnage lifted, weeks trained, current phase/week, last session."""
     with conn.cursor() as cur:
@@ -225,12 +378,26 @@ def overview_stats(conn: Connection) -> dict:
         return dict(zip(cols, row)) if row else {}
 
 
+@read_cached
 def exercise_sets_trend(conn: Connection, exercise_name: str) -> list[dict]:
     """Working sets for an exercise over time — actual weight, reps, RPE, and notes."""
+    return exercise_sets_trend_by_name(conn, [exercise_name]).get(exercise_name, [])
+
+
+@read_cached
+def exercise_sets_trend_by_name(
+    conn: Connection, exercise_names: list[str]
+) -> dict[str, list[dict]]:
+    """
+    exercise_sets_trend() for several exercises in one query, keyed by the names as given and
+    matched in any case. A dashboard charting N lifts makes one round trip instead of N.
+    Exercises with no sets are left out.
+    """
     with conn.cursor() as cur:
         cur.execute(
             """
             SELECT
+                LOWER(e.name)    AS exercise_key,
                 s.date,
                 s.phase,
                 s.week,
@@ -245,15 +412,25 @@ def exercise_sets_trend(conn: Connection, exercise_name: str) -> list[dict]:
             FROM working_sets ws
             JOIN exercises e ON e.id = ws.exercise_id
             JOIN sessions s  ON s.session_id = e.session_id
-            WHERE LOWER(e.name) = LOWER(%s)
+            WHERE LOWER(e.name) = ANY(%s)
             ORDER BY s.date ASC, ws.number ASC
             """,
-            (exercise_name,),
+            (list({name.lower() for name in exercise_names}),),
         )
-        cols = [d[0] for d in cur.description]
-        return [dict(zip(cols, row)) for row in cur.fetchall()]
+        return _by_name(cur, exercise_names)
+
+
+def _by_name(cur, names: list[str]) -> dict[str, list[dict]]:
+    """The rows of a query whose first column is LOWER(exercise name), grouped under each of
+    `names` that has any, in query order and without that column."""
+    cols = [d[0] for d in cur.description][1:]
+    grouped: dict[str, list[dict]] = {}
+    for key, *row in cur.fetchall():
+        grouped.setdefault(key, []).append(dict(zip(cols, row)))
+    return {name: grouped[name.lower()] for name in names if name.lower() in grouped}
 
 
+@read_cached
 def exercise_list(conn: Connection, min_sets: int = 10) -> list[dict]:
     """
     Distinct exercises with at least `min_sets` working sets. Used to populate the
@@ -279,6 +456,7 @@ def exercise_list(conn: Connection, min_sets: int = 10) -> list[dict]:
         return [dict(zip(cols, row)) for row in cur.fetchall()]
 
 
+@read_cached
 def weekly_muscle_group_volume(conn: Connection, phase: int | None = None) -> list[dict]:
     """
     Weekly working sets per muscle group. Compared against the 10-20 sets/week
@@ -302,7 +480,7 @@ def weekly_muscle_group_volume(conn: Connection, phase: int | None = None) -> li
             FROM sessions s
             JOIN exercises e    ON e.session_id   = s.session_id
             JOIN working_sets ws ON ws.exercise_id = e.id
-            CROSS JOIN LATERAL UNNEST(COALESCE(e.target_muscle_groups, ARRAY[]::TEXT[])) AS mg
+            CROSS JOIN LATERAL UNNEST(COALESCE(e.target_muscle_groups, ARRAY[]::TEXT[])) AS g(mg)
             {phase_filter}
             GROUP BY s.phase, s.week, mg
             ORDER BY s.phase ASC, s.week ASC, mg ASC
@@ -313,6 +491,7 @@ def weekly_muscle_group_volume(conn: Connection, phase: int | None = None) -> li
         return [dict(zip(cols, row)) for row in cur.fetchall()]
 
 
+@read_cached
 def rpe_distribution(conn: Connection, phase: int | None = None) -> list[dict]:
     """
     Histogram of RPE bucketed to whole numbers (6-10). Shows intensity profile:
@@ -344,6 +523,7 @@ def rpe_distribution(conn: Connection, phase: int | None = None) -> list[dict]:
         return [dict(zip(cols, row)) for row in cur.fetchall()]
 
 
+@read_cached
 def fatigue_within_phase(conn: Connection, phase: int) -> list[dict]:
     """
     Per-week fatigue markers within a phase. A well-programmed mesocycle should
@@ -380,6 +560,7 @@ def fatigue_within_phase(conn: Connection, phase: int) -> list[dict]:
         return [dict(zip(cols, row)) for row in cur.fetchall()]
 
 
+@read_cached
 def deload_effect(conn: Connection) -> list[dict]:
     """
     Paired comparison around each deload week: avg RPE and tonnage the week before,
@@ -423,6 +604,7 @@ def deload_effect(conn: Connection) -> list[dict]:
         return [dict(zip(cols, row)) for row in cur.fetchall()]
 
 
+@read_cached
 def stimulus_fatigue_by_exercise(conn: Connection, min_sets: int = 10) -> list[dict]:
     """
     Per-exercise stimulus-to-fatigue proxy: avg tonnage per set (stimulus) vs avg RPE
@@ -453,6 +635,7 @@ def stimulus_fatigue_by_exercise(conn: Connection, min_sets: int = 10) -> list[d
         return [dict(zip(cols, row)) for row in cur.fetchall()]
 
 
+@read_cached
 def session_list(conn: Connection) -> list[dict]:
     """All sessions ordered by date descending, with source_file for linking."""
     with conn.cursor() as cur:
@@ -474,81 +657,67 @@ def session_list(conn: Connection) -> list[dict]:
         return [dict(zip(cols, row)) for row in cur.fetchall()]
 
 
+@read_cached
 def key_lift_prs(conn: Connection, key_lifts: list[str]) -> dict:
     """
     For each key lift: best weight at exactly 1, 3, 5, 8, 10 reps, plus Epley e1RM.
     Returns dict keyed by exercise name.
     Tie-break: most recent date wins.
+    One lookup in current_prs for all lifts; names match in any case, across spellings.
     """
-    result: dict = {}
     rep_brackets = [1, 3, 5, 8, 10]
-
+    result: dict = {
+        lift: {"rep_prs": {}, "e1rm_kg": None, "e1rm_date": None} for lift in key_lifts
+    }
+    by_lower: dict[str, list[str]] = {}
     for lift in key_lifts:
-        lift_data: dict = {"rep_prs": {}, "e1rm_kg": None, "e1rm_date": None}
-
-        for reps in rep_brackets:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT ws.weight_kg, s.date
-                    FROM working_sets ws
-                    JOIN exercises e ON e.id = ws.exercise_id
-                    JOIN sessions  s ON s.session_id = e.session_id
-                    WHERE LOWER(e.name) = LOWER(%s)
-                      AND ws.reps_full = %s
-                      AND ws.weight_kg IS NOT NULL
-                      AND ws.weight_kg > 0
-                    ORDER BY ws.weight_kg DESC, s.date DESC
-                    LIMIT 1
-                    """,
-                    (lift, reps),
-                )
-                row = cur.fetchone()
-            if row:
-                lift_data["rep_prs"][reps] = {"weight_kg": float(row[0]), "date": str(row[1])}
-
-        # Epley e1RM: best weight * (1 + reps/30) across all sets
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT
-                    ws.weight_kg,
-                    ws.reps_full,
-                    s.date,
-                    ROUND((ws.weight_kg * (1 + ws.reps_full::numeric / 30))::numeric, 2) AS e1rm
-                FROM working_sets ws
-                JOIN exercises e ON e.id = ws.exercise_id
-                JOIN sessions  s ON s.session_id = e.session_id
-                WHERE LOWER(e.name) = LOWER(%s)
-                  AND ws.weight_kg IS NOT NULL
-                  AND ws.weight_kg > 0
-                  AND ws.reps_full IS NOT NULL
-                  AND ws.reps_full > 0
-                ORDER BY e1rm DESC, s.date DESC
-                LIMIT 1
-                """,
-                (lift,),
-            )
-            row = cur.fetchone()
-        if row:
-            lift_data["e1rm_kg"] = float(row[3])
-            lift_data["e1rm_date"] = str(row[2])
-
-        result[lift] = lift_data
+        by_lower.setdefault(lift.lower(), []).append(lift)
 
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT DISTINCT ON (LOWER(exercise), record, reps)
+                LOWER(exercise), record, reps, value_kg, date
+            FROM current_prs
+            WHERE LOWER(exercise) = ANY(%s)
+              AND (record = 'e1rm' OR (record = 'reps' AND reps = ANY(%s)))
+            ORDER BY LOWER(exercise), record, reps, value_kg DESC, date DESC
+            """,
+            (list(by_lower), rep_brackets),
+        )
+        rows = cur.fetchall()
+
+    for name, record, reps, value_kg, day in sorted(rows, key=lambda r: r[2]):
+        for lift in by_lower[name]:
+            if record == "e1rm":
+                result[lift]["e1rm_kg"] = float(value_kg)
+                result[lift]["e1rm_date"] = str(day)
+            else:
+                result[lift]["rep_prs"][reps] = {"weight_kg": float(value_kg), "date": str(day)}
     return result
 
 
+@read_cached
 def goal_vs_actual(conn: Connection, exercise_name: str) -> list[dict]:
     """
     Every working set for an exercise, with the session's goal_weight_kg alongside.
     Used to plot goal line vs actual dots on the progression chart.
     goal_weight_kg is NULL for sessions where it wasn't set — skip those for the goal line.
     """
+    return goal_vs_actual_by_name(conn, [exercise_name]).get(exercise_name, [])
+
+
+@read_cached
+def goal_vs_actual_by_name(
+    conn: Connection, exercise_names: list[str]
+) -> dict[str, list[dict]]:
+    """goal_vs_actual() for several exercises in one query, keyed like
+    exercise_sets_trend_by_name()."""
     with conn.cursor() as cur:
         cur.execute(
             """
             SELECT
+                LOWER(e.name)  AS exercise_key,
                 s.date,
                 s.phase,
                 s.week,
@@ -560,16 +729,16 @@ def goal_vs_actual(conn: Connection, exercise_name: str) -> list[dict]:
             FROM working_sets ws
             JOIN exercises e ON e.id = ws.exercise_id
             JOIN sessions  s ON s.session_id = e.session_id
-            WHERE LOWER(e.name) = LOWER(%s)
+            WHERE LOWER(e.name) = ANY(%s)
               AND ws.weight_kg IS NOT NULL
             ORDER BY s.date ASC, ws.number ASC
             """,
-            (exercise_name,),
+            (list({name.lower() for name in exercise_names}),),
         )
-        cols = [d[0] for d in cur.description]
-        return [dict(zip(cols, row)) for row in cur.fetchall()]
+        return _by_name(cur, exercise_names)
 
 
+@read_cached
 def weekly_tonnage_by_phase(conn: Connection) -> list[dict]:
     """
     Total tonnage (kg) per phase/week. Visualising this shows the mesocycle shape:
@@ -1,31 +1,115 @@
+import base64
+import json
 import os
 import sys
+import threading
+import time
 from contextlib import asynccontextmanager
-from typing import Annotated
+from datetime import date
+from typing import Annotated, Callable, Literal
 
 from dotenv import load_dotenv
-from fastapi import Depends, FastAPI, Header, HTTPException, Query, Response
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES
 from psycopg2.pool import SimpleConnectionPool
 
-from traininglogs.db.fetch import get_exercise_history, get_session, get_sessions
+from traininglogs.analytics import queries as analytics
+from traininglogs.analytics.downsample import DEFAULT_MAX_POINTS
+from traininglogs.db.cache import ReadCache, freeze_args
+from traininglogs.db.fetch import (
+    EXERCISE_HISTORY_KEYSET,
+    SESSION_KEYSET,
+    get_exercise_history,
+    get_session,
+    get_sessions,
+)
 from traininglogs.api.schemas import (
     CaptureIn,
     CaptureOut,
     ConfirmIn,
     ConfirmOut,
+    CorrectDraftOut,
     CorrectIn,
     CorrectOut,
+    DeloadEffect,
+    DraftOut,
     ExerciseHistoryRow,
+    ExerciseState,
+    ExerciseSummary,
+    FailureTechniqueUsage,
+    GoalVsActualRow,
+    KeyLiftPRs,
+    MuscleGroupVolume,
+    OverviewStats,
+    PersonalRecord,
+    PhaseFatigueWeek,
+    ProgressionSet,
+    RpeBucket,
+    RpeTrendRow,
     SessionDetail,
     SessionSummary,
+    SessionVolume,
+    SetsTrendRow,
+    StimulusFatigue,
+    TopRpeSet,
+    TrainingLoadDay,
+    WeeklyTonnage,
+    WeekSessionCount,
 )
 
 load_dotenv()
 
 ALLOWED_ORIGINS = os.environ.get("ALLOWED_ORIGINS", "").split(",")
 
+# How long POST /inputs may spend extracting before it returns what it has. A person is waiting
+# on the response; past this the card comes back partial, with placeholders, and the retry queue
+# finishes the rest. 0 turns the limit off.
+EXTRACTION_DEADLINE_SECONDS = float(os.environ.get("EXTRACTION_DEADLINE_SECONDS") or 90)
+
+# Percentile (0-1) of a step's own latency history past which POST /inputs also asks Groq and
+# takes whichever usable answer comes first (agent/hedging.py). Unset or 0 = no hedging.
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE") or 0)
+
+# A cheaper model for short, strictly formatted exercise chunks; everything else, and any chunk
+# whose fast answer is rejected, goes to the default model (agent/routing.py). Unset = no routing.
+FAST_LLM_MODEL = os.environ.get("FAST_LLM_MODEL")
+
+# How long a POST /inputs response is kept for replay to a retry with the same Idempotency-Key,
+# and how long such a retry waits on a first request still running before it gets a 409.
+IDEMPOTENCY_TTL_HOURS = float(os.environ.get("IDEMPOTENCY_TTL_HOURS") or 24)
+IDEMPOTENCY_WAIT_SECONDS = float(os.environ.get("IDEMPOTENCY_WAIT_SECONDS") or 10)
+
+# How long a first request may hold its key before a retry may assume it died and take over.
+# Twice the extraction deadline leaves room for capture and a slow commit either side of it.
+_IDEMPOTENCY_LEASE_SECONDS = (
+    2 * EXTRACTION_DEADLINE_SECONDS if EXTRACTION_DEADLINE_SECONDS > 0 else 600.0
+)
+_IDEMPOTENCY_POLL_SECONDS = 0.25
+
+# Entries in this process's read cache (db/cache.py), invalidated through Postgres NOTIFY on
+# every session write. Unset or 0 = every read goes to Postgres.
+READ_CACHE_SIZE = int(os.environ.get("READ_CACHE_SIZE") or 0)
+
+# /analytics/*: results kept per query, arguments and data version, and the longest one query
+# may run before the request gets a 504 instead of holding a connection indefinitely.
+ANALYTICS_CACHE_SIZE = int(os.environ.get("ANALYTICS_CACHE_SIZE") or 256)
+ANALYTICS_TIMEOUT_MS = int(os.environ.get("ANALYTICS_TIMEOUT_MS") or 5000)
+
+# How long a server-side correction draft outlives its last correction.
+CORRECTION_DRAFT_TTL_HOURS = float(os.environ.get("CORRECTION_DRAFT_TTL_HOURS") or 24)
+
+# How long after a client's own confirm its reads stay on the primary rather than
+# DATABASE_READ_URL, so a session it just wrote cannot be missing from a lagging replica.
+READ_YOUR_WRITES_SECONDS = float(os.environ.get("READ_YOUR_WRITES_SECONDS") or 10)
+
 _pool: SimpleConnectionPool | None = None
+_read_pool: SimpleConnectionPool | None = None
+_scheduler = None
+# time.monotonic() of this process's last session write, for clients that drop cookies.
+_last_write_at = float("-inf")
+_WROTE_COOKIE = "tl_wrote"
 
 
 def _get_pool() -> SimpleConnectionPool:
@@ -36,8 +120,84 @@ def _get_pool() -> SimpleConnectionPool:
     return _pool
 
 
+def _scheduled(provider, priority: str):
+    """`provider`, admitted through this process's one scheduler (agent/scheduler.py). Request
+    handlers are interactive and the retry loop is background, so a person never waits behind
+    a retry -- or, with LLM_SCHEDULER_DATABASE_URL set, behind a regen run elsewhere."""
+    from traininglogs.agent.scheduler import PRIORITIES, ScheduledProvider, scheduler_from_env
+
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = scheduler_from_env()
+    return ScheduledProvider(provider, _scheduler, PRIORITIES[priority])
+
+
+def _get_read_pool() -> SimpleConnectionPool | None:
+    """A pool on DATABASE_READ_URL -- a read replica -- or None when it isn't set."""
+    global _read_pool
+    read_url = os.environ.get("DATABASE_READ_URL")
+    if not read_url:
+        return None
+    if _read_pool is None:
+        _read_pool = SimpleConnectionPool(minconn=1, maxconn=10, dsn=read_url)
+    return _read_pool
+
+
 def _db():
-    pool = _get_pool()
+    yield from _pooled(_get_pool())
+
+
+def _read_db(request: Request):
+    """A connection for a read that may be served from the replica: the session list, detail
+    and history, and analytics. The capture/extract/correct/confirm workflow's own reads stay
+    on _db, since each reads what the step before it just wrote.
+
+    Without DATABASE_READ_URL, or within READ_YOUR_WRITES_SECONDS of the client's own confirm,
+    this is the primary."""
+    pool = _get_read_pool()
+    if pool is None or _wrote_recently(request):
+        pool = _get_pool()
+    yield from _pooled(pool)
+
+
+def _mark_write(response: Response) -> None:
+    """Send this client's reads to the primary for READ_YOUR_WRITES_SECONDS. A cookie carries
+    that to whichever instance serves the next request; the process-wide timestamp covers a
+    client that doesn't keep cookies, when the next request lands on this instance."""
+    global _last_write_at
+    if READ_YOUR_WRITES_SECONDS <= 0:
+        return
+    _last_write_at = time.monotonic()
+    response.set_cookie(
+        _WROTE_COOKIE, "1", max_age=max(1, round(READ_YOUR_WRITES_SECONDS)), httponly=True,
+        samesite="lax",
+    )
+
+
+def _wrote_recently(request: Request) -> bool:
+    return (
+        _WROTE_COOKIE in request.cookies
+        or time.monotonic() - _last_write_at < READ_YOUR_WRITES_SECONDS
+    )
+
+
+def _late_calls_saver(raw_input_id: str):
+    """Saves llm_calls records for `raw_input_id` that arrive after its request has returned
+    -- a hedged call's losing leg (agent/hedging.py) -- each time on a pooled connection of
+    its own: the request's went back to the pool long before."""
+    from traininglogs.db.insert import insert_llm_calls
+
+    def save(records: list[dict]) -> None:
+        try:
+            for conn in _db():
+                insert_llm_calls(conn, raw_input_id, records)
+        except Exception as exc:
+            print(f"[ingest] raw_input_id={raw_input_id} late llm_calls not saved: {exc}")
+
+    return save
+
+
+def _pooled(pool: SimpleConnectionPool):
     conn = pool.getconn()
     try:
         yield conn
@@ -60,6 +220,36 @@ def _auth(x_api_key: Annotated[str, Header()] = ""):
         raise HTTPException(status_code=401, detail="Invalid API key")
 
 
+def _retry_loop(stop: threading.Event, interval: float) -> None:
+    """Drain the placeholder retry queue every `interval` seconds until `stop` is set.
+
+    Runs on its own pooled connection, outside any request, so a retry is never something a
+    client waits on -- the card simply has one fewer failed exercise the next time it is
+    fetched. RETRY_LLM_MODEL picks the model retries use, when it should differ from the one
+    that failed."""
+    from traininglogs.agent.providers import AnthropicProvider
+    from traininglogs.ingest.retry import retry_failed_exercises
+
+    model = os.environ.get("RETRY_LLM_MODEL")
+    provider = _scheduled(
+        AnthropicProvider(model=model) if model else AnthropicProvider(), "background"
+    )
+    while not stop.wait(interval):
+        pool = _get_pool()
+        conn = pool.getconn()
+        try:
+            retry_failed_exercises(conn, provider=provider)
+        except Exception as exc:
+            # One bad pass must not end the loop -- the rows it claimed come due again once
+            # their lease expires.
+            print(f"[retry] pass failed: {exc}", file=sys.stderr)
+        finally:
+            conn.rollback()
+            pool.putconn(conn)
+            # Persisted by retry_failed_exercises() as it goes; kept here they would only grow.
+            provider.calls.clear()
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     if not os.environ.get("API_KEY"):
@@ -69,9 +259,35 @@ async def lifespan(app: FastAPI):
         )
         sys.exit(1)
     _get_pool()
+    if READ_CACHE_SIZE > 0:
+        from traininglogs.db.cache import enable_read_cache
+
+        # With a replica, a read just after a write may still see the old data there; what
+        # it returns then is not cached, or it would stay until the next write.
+        enable_read_cache(
+            READ_CACHE_SIZE,
+            dsn=os.environ["DATABASE_URL"],
+            settle_seconds=READ_YOUR_WRITES_SECONDS if _get_read_pool() else 0.0,
+        )
+    # Off unless configured: a retry spends money, so turning it on is a deployment decision.
+    retry_interval = float(os.environ.get("EXTRACTION_RETRY_INTERVAL_SECONDS") or 0)
+    stop_retries = threading.Event()
+    if retry_interval > 0:
+        threading.Thread(
+            target=_retry_loop, args=(stop_retries, retry_interval), daemon=True
+        ).start()
     yield
+    stop_retries.set()
+    if READ_CACHE_SIZE > 0:
+        from traininglogs.db.cache import disable_read_cache
+
+        disable_read_cache()
+    if _scheduler is not None:
+        _scheduler.close()
     if _pool:
         _pool.closeall()
+    if _read_pool:
+        _read_pool.closeall()
 
 
 app = FastAPI(title="traininglogs", lifespan=lifespan)
@@ -81,57 +297,312 @@ app.add_middleware(
     allow_origins=ALLOWED_ORIGINS if ALLOWED_ORIGINS != [""] else [],
     allow_credentials=True,
     allow_methods=["GET", "POST"],
-    allow_headers=["X-Api-Key", "Content-Type"],
+    allow_headers=["X-Api-Key", "Content-Type", "Idempotency-Key"],
+    expose_headers=["Idempotent-Replayed", "Link", "ETag"],
+)
+# Session lists and history are JSON arrays that compress well, and a phone on gym Wi-Fi pays
+# for every byte. Below 1 KB the gzip framing is not worth it.
+#
+# Parquet and Arrow exports (db.export.MEDIA_TYPES, not imported here so that pyarrow is not
+# loaded with the app) are left alone: Parquet is zstd-compressed already and Arrow's buffers
+# barely shrink, so gzip would spend CPU on the biggest responses the API sends for next to
+# nothing. NDJSON exports are gzipped like any JSON.
+UNCOMPRESSED_MEDIA_TYPES = ("application/vnd.apache.parquet", "application/vnd.apache.arrow.stream")
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=1000,
+    exclude_content_types=(*DEFAULT_EXCLUDED_CONTENT_TYPES, *UNCOMPRESSED_MEDIA_TYPES),
 )
 
 
-@app.get("/sessions", response_model=list[SessionSummary])
+# The most rows one page of a list endpoint may ask for. Without `limit` a list endpoint
+# still returns everything, as it always has, for clients that predate pagination.
+MAX_PAGE_SIZE = 1000
+
+_SESSION_CURSOR = (date.fromisoformat, str)
+_EXERCISE_HISTORY_CURSOR = (date.fromisoformat, str, int, int)
+
+
+def _encode_cursor(row: dict, keyset: tuple[str, ...]) -> str:
+    """A page's last row's keyset values, as an opaque URL-safe token."""
+    values = [
+        row[k].isoformat() if isinstance(row[k], date) else row[k] for k in keyset
+    ]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, types: tuple[Callable, ...]) -> tuple:
+    """The keyset values in a cursor from _encode_cursor(), each checked by its `types`
+    entry; 400 for anything that isn't one, rather than a database error on a bad value."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError(cursor)
+        return tuple(kind(v) for kind, v in zip(types, values))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _fields(fields: str | None) -> list[str] | None:
+    return [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+
+def _paginate(
+    request: Request, response: Response, rows: list[dict], limit: int | None,
+    keyset: tuple[str, ...],
+) -> list[dict]:
+    """Trim the one extra row fetched past `limit`. Its presence means there is a next page,
+    linked from a `Link: <...>; rel="next"` header (RFC 8288) so the body stays the plain
+    list it has always been."""
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_url = request.url.include_query_params(cursor=_encode_cursor(rows[-1], keyset))
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return rows
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison (RFC 9110 8.8.3.2): W/ prefixes don't count.
+    ours = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == ours for tag in if_none_match.split(","))
+
+
+def _not_modified(
+    request: Request, response: Response, conn, version: int | None = None
+) -> Response | None:
+    """A 304 for a client whose If-None-Match still matches the session data, or None after
+    setting this response's ETag for the caller to go on and build the body.
+
+    The ETag is the data_version counter (bumped by every session write) and the package
+    version (a deploy can change a response's shape with no data changing), so the check is
+    one single-row read before any of the real queries. It is weak: the same data comes back
+    gzipped or not, and in any page or projection a URL asks for -- the client's cache is
+    per URL, so that never mixes two representations up."""
+    from traininglogs import __version__
+    from traininglogs.db.fetch import get_data_version
+
+    if version is None:
+        version = get_data_version(conn)
+    etag = f'W/"{version}-{__version__}"'
+    # Cache it, but ask every time: the point is a cheap "still the same?", not a stale copy.
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+@app.get(
+    "/sessions", response_model=list[SessionSummary], response_model_exclude_unset=True
+)
 def list_sessions(
+    request: Request,
+    response: Response,
     phase: int | None = Query(None),
     week: int | None = Query(None),
     from_date: str | None = Query(None),
     to_date: str | None = Query(None),
-    conn=Depends(_db),
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="From the previous page's Link header."),
+    fields: str | None = Query(
+        None, description="Comma-separated columns to return; session_id and date always are."
+    ),
+    conn=Depends(_read_db),
     _=Depends(_auth),
 ):
-    return get_sessions(conn, phase=phase, week=week, from_date=from_date, to_date=to_date)
+    """Sessions newest first. With `limit`, one page at a time: follow the `Link` header's
+    rel="next" URL for the next, until a page comes back without one."""
+    if (not_modified := _not_modified(request, response, conn)) is not None:
+        return not_modified
+    after = _decode_cursor(cursor, _SESSION_CURSOR) if cursor else None
+    try:
+        rows = get_sessions(
+            conn, phase=phase, week=week, from_date=from_date, to_date=to_date,
+            limit=limit + 1 if limit is not None else None, after=after,
+            fields=_fields(fields),
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    return _paginate(request, response, rows, limit, SESSION_KEYSET)
 
 
 @app.get("/sessions/{session_id}", response_model=SessionDetail)
-def session_detail(session_id: str, conn=Depends(_db), _=Depends(_auth)):
+def session_detail(
+    session_id: str,
+    request: Request,
+    response: Response,
+    conn=Depends(_read_db),
+    _=Depends(_auth),
+):
+    if (not_modified := _not_modified(request, response, conn)) is not None:
+        return not_modified
     session = get_session(conn, session_id)
     if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
     return session
 
 
-@app.get("/exercises/{name}/history", response_model=list[ExerciseHistoryRow])
-def exercise_history(name: str, conn=Depends(_db), _=Depends(_auth)):
-    rows = get_exercise_history(conn, name)
-    if not rows:
+@app.get("/exercises/state", response_model=dict[str, ExerciseState])
+def exercise_states(
+    request: Request,
+    response: Response,
+    name: list[str] = Query(..., min_length=1, description="Repeat for each exercise."),
+    conn=Depends(_read_db),
+    _=Depends(_auth),
+):
+    """How each named exercise went last time, keyed by the names as given, in any case --
+    one lookup however many. Exercises never done before are left out."""
+    from traininglogs.db.fetch import get_exercise_states
+
+    if (not_modified := _not_modified(request, response, conn)) is not None:
+        return not_modified
+    return get_exercise_states(conn, name)
+
+
+@app.get(
+    "/exercises/{name}/history",
+    response_model=list[ExerciseHistoryRow],
+    response_model_exclude_unset=True,
+)
+def exercise_history(
+    name: str,
+    request: Request,
+    response: Response,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="From the previous page's Link header."),
+    fields: str | None = Query(
+        None,
+        description="Comma-separated columns to return; date, session_id, exercise_number "
+        "and number always are.",
+    ),
+    conn=Depends(_read_db),
+    _=Depends(_auth),
+):
+    """Every working set of one exercise, oldest first, paged as GET /sessions is."""
+    if (not_modified := _not_modified(request, response, conn)) is not None:
+        return not_modified
+    after = _decode_cursor(cursor, _EXERCISE_HISTORY_CURSOR) if cursor else None
+    try:
+        rows = get_exercise_history(
+            conn, name, limit=limit + 1 if limit is not None else None, after=after,
+            fields=_fields(fields),
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    # Past the last page is an empty page, not a missing exercise.
+    if not rows and after is None:
         raise HTTPException(status_code=404, detail="No history found for this exercise")
-    return rows
+    return _paginate(request, response, rows, limit, EXERCISE_HISTORY_KEYSET)
 
 
 @app.post("/inputs", response_model=CaptureOut)
-def create_input(body: CaptureIn, response: Response, conn=Depends(_db), _=Depends(_auth)):
+def create_input(
+    body: CaptureIn,
+    response: Response,
+    idempotency_key: Annotated[str | None, Header(max_length=255)] = None,
+    conn=Depends(_db),
+    _=Depends(_auth),
+):
     """capture() then extract() -- the same two ingest/ functions cli/log.py calls, over HTTP.
 
     capture() commits before extract() is ever attempted, so a failed extraction still leaves
     `raw_input_id` in the response -- the text is not lost, and the caller can retry extraction
     against the same raw input (extract() is idempotent) rather than resubmitting it.
+
+    With an `Idempotency-Key` header, a retry of a request the client never saw the answer to
+    costs a lookup, not another capture and extraction: the first request's response -- 201 or
+    502 alike -- is stored under the key and replayed, marked `Idempotent-Replayed: true`. A
+    retry arriving while the first is still running waits up to IDEMPOTENCY_WAIT_SECONDS for
+    it, then gets a 409 to try again later. The same key with a different body is a 422.
     """
+    if idempotency_key is None:
+        return _capture_and_extract(body, response, conn)
+
+    from traininglogs.db.insert import (
+        claim_idempotency_key,
+        complete_idempotency_key,
+        content_checksum,
+        release_idempotency_key,
+    )
+
+    request_hash = content_checksum(body.model_dump_json())
+    give_up_at = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+    while True:
+        held = claim_idempotency_key(
+            conn, idempotency_key, request_hash,
+            ttl_seconds=IDEMPOTENCY_TTL_HOURS * 3600,
+            lease_seconds=_IDEMPOTENCY_LEASE_SECONDS,
+        )
+        if held is None:
+            break
+        if held["request_hash"] != request_hash:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used for a different request body",
+            )
+        if held["response"] is not None:
+            response.status_code = held["status_code"]
+            response.headers["Idempotent-Replayed"] = "true"
+            return CaptureOut(**held["response"])
+        if time.monotonic() >= give_up_at:
+            raise HTTPException(
+                status_code=409,
+                detail="A request with this Idempotency-Key is still in progress",
+                headers={"Retry-After": "5"},
+            )
+        time.sleep(_IDEMPOTENCY_POLL_SECONDS)
+
+    try:
+        out = _capture_and_extract(body, response, conn)
+    except BaseException:
+        conn.rollback()
+        release_idempotency_key(conn, idempotency_key)
+        raise
+    complete_idempotency_key(conn, idempotency_key, response.status_code, out.model_dump())
+    return out
+
+
+def _capture_and_extract(body: CaptureIn, response: Response, conn) -> CaptureOut:
+    from traininglogs.agent.deadline import Deadline
     from traininglogs.agent.providers import AnthropicProvider
     from traininglogs.ingest.capture import capture
     from traininglogs.ingest.extract import extract
 
+    # Started before capture(), so the limit is on the request as the client experiences it.
+    deadline = Deadline(EXTRACTION_DEADLINE_SECONDS) if EXTRACTION_DEADLINE_SECONDS > 0 else None
     raw_input_id = capture(
         conn, body.content, source_kind=body.source_kind, source_file=body.source_file
     )
 
     try:
-        provider = AnthropicProvider()
-        extraction_id = extract(conn, raw_input_id, provider=provider, model=provider.model)
+        provider = _scheduled(AnthropicProvider(), "interactive")
+        if HEDGE_PERCENTILE > 0:
+            from traininglogs.agent.hedging import HedgedProvider
+            from traininglogs.agent.providers import GroqProvider
+            from traininglogs.db.fetch import get_step_latency_percentiles
+
+            provider = HedgedProvider(
+                provider,
+                _scheduled(GroqProvider(), "interactive"),
+                get_step_latency_percentiles(conn, HEDGE_PERCENTILE, provider.model),
+            )
+        if FAST_LLM_MODEL:
+            from traininglogs.agent.routing import RoutedProvider, RoutingPolicy
+            from traininglogs.db.fetch import get_placeholder_counts
+
+            provider = RoutedProvider(
+                _scheduled(AnthropicProvider(model=FAST_LLM_MODEL), "interactive"),
+                provider,
+                RoutingPolicy(placeholder_history=get_placeholder_counts(conn)),
+            )
+        extraction_id = extract(
+            conn, raw_input_id, provider=provider, model=provider.model, deadline=deadline,
+            save_late_calls=_late_calls_saver(raw_input_id),
+        )
     except Exception as exc:
         response.status_code = 502
         return CaptureOut(raw_input_id=raw_input_id, error=str(exc))
@@ -140,6 +611,16 @@ def create_input(body: CaptureIn, response: Response, conn=Depends(_db), _=Depen
     return CaptureOut(raw_input_id=raw_input_id, extraction_id=extraction_id)
 
 
+def _history(conn, *extracts) -> dict[str, dict]:
+    """exercise_state for every exercise in `extracts`, in one query: the cards' "last time"
+    lines (ValidationCardBuilder.build()'s `history`)."""
+    from traininglogs.db.fetch import get_exercise_states
+
+    return get_exercise_states(
+        conn, sorted({ex.name for extract in extracts for ex in extract.exercises})
+    )
+
+
 @app.get("/extractions/{extraction_id}")
 def get_extraction_card(extraction_id: str, conn=Depends(_db), _=Depends(_auth)):
     """The same card the CLI's confirm loop renders to a terminal, as JSON instead --
@@ -156,7 +637,7 @@ def get_extraction_card(extraction_id: str, conn=Depends(_db), _=Depends(_auth))
         raise HTTPException(status_code=404, detail="Extraction not found")
 
     extract_obj = TrainingLogLLMExtract.model_validate(stored["extract"])
-    card = ValidationCardBuilder().build(extract_obj)
+    card = ValidationCardBuilder().build(extract_obj, _history(conn, extract_obj))
     return jsonable_encoder(card)
 
 
@@ -170,28 +651,67 @@ def confirm_extraction_endpoint(
 ):
     """ingest.confirm() over HTTP. `body.extract` lets a client submit the result of one or
     more /correct calls; omitted, the extraction's own stored reading is confirmed as-is.
+    `body.draft_version` confirms the server-side correction draft instead, which must still
+    be at that version.
     """
     from traininglogs.agent.schemas import TrainingLogLLMExtract
     from traininglogs.db.fetch import get_extraction
+    from traininglogs.db.insert import delete_correction_draft
     from traininglogs.ingest.confirm import confirm
 
     stored = get_extraction(conn, extraction_id)
     if stored is None:
         raise HTTPException(status_code=404, detail="Extraction not found")
 
-    extract_dict = body.extract if body.extract is not None else stored["extract"]
+    corrections = body.corrections
+    if body.draft_version is not None:
+        if body.extract is not None or body.corrections is not None:
+            raise HTTPException(
+                status_code=422,
+                detail="Send either draft_version or extract/corrections, not both",
+            )
+        draft = _current_draft(conn, extraction_id, body.draft_version)
+        extract_dict, corrections = draft["extract"], draft["corrections"]
+    else:
+        extract_dict = body.extract if body.extract is not None else stored["extract"]
     final_extract = TrainingLogLLMExtract.model_validate(extract_dict)
 
     try:
-        session = confirm(conn, extraction_id, final_extract, corrections=body.corrections)
+        session = confirm(conn, extraction_id, final_extract, corrections=corrections)
     except SystemExit as exc:
         raise HTTPException(status_code=409, detail=str(exc))
+    # Confirmed, the draft has nothing left to do; any other ending leaves it to expire.
+    delete_correction_draft(conn, extraction_id)
+    _mark_write(response)
 
     response.status_code = 201
     return ConfirmOut(session_id=session.session_id)
 
 
-@app.post("/extractions/{extraction_id}/correct", response_model=CorrectOut)
+def _current_draft(conn, extraction_id: str, version: int) -> dict:
+    """The extraction's draft, which the client says is at `version`; 409 if it is not."""
+    from traininglogs.db.fetch import get_correction_draft
+
+    draft = get_correction_draft(conn, extraction_id)
+    if draft is None or draft["version"] != version:
+        current = draft["version"] if draft is not None else None
+        raise HTTPException(
+            status_code=409,
+            detail=(
+                f"Correction draft is at version {current}, not {version}: GET "
+                f"/extractions/{extraction_id}/draft for its current state, or send "
+                "draft_version 0 to start over"
+                if current is not None
+                else "No correction draft for this extraction (it may have expired): send "
+                "draft_version 0 to start one"
+            ),
+        )
+    return draft
+
+
+@app.post(
+    "/extractions/{extraction_id}/correct", response_model=CorrectOut | CorrectDraftOut
+)
 def correct_extraction(
     extraction_id: str, body: CorrectIn, conn=Depends(_db), _=Depends(_auth)
 ):
@@ -199,26 +719,47 @@ def correct_extraction(
     endpoint here. `body.extract` (the previous response's own `extract`) carries state
     between calls instead of the server holding any; the extraction's own stored reading is
     the starting point when it's omitted, on the first correction.
+
+    With `body.draft_version`, the one exception: the working extract stays on the server, in
+    correction_drafts, and neither it nor the card crosses the network. The client sends only
+    its instruction and the version it last saw, and gets back a JSON Patch of the card
+    sections that changed -- a few hundred bytes where the stateless form moves tens of
+    kilobytes each way. GET /extractions/{id}/draft recovers the full state, and /confirm
+    takes `draft_version` to finish.
     """
     from datetime import datetime, timezone
 
     from fastapi.encoders import jsonable_encoder
 
+    from traininglogs.agent.card_diff import card_patch
     from traininglogs.agent.llm_extract_validator import LLMExtractValidator
     from traininglogs.agent.patch import PatchError
     from traininglogs.agent.providers import AnthropicProvider
     from traininglogs.agent.schemas import LLMParserError, TrainingLogLLMExtract
     from traininglogs.agent.validation_card_builder import ValidationCardBuilder
     from traininglogs.db.fetch import get_extraction
+    from traininglogs.db.insert import save_correction_draft
 
     stored = get_extraction(conn, extraction_id)
     if stored is None:
         raise HTTPException(status_code=404, detail="Extraction not found")
 
-    extract_dict = body.extract if body.extract is not None else stored["extract"]
+    corrections: list[dict] = []
+    if body.draft_version is not None:
+        if body.extract is not None:
+            raise HTTPException(
+                status_code=422, detail="Send either draft_version or extract, not both"
+            )
+        if body.draft_version == 0:
+            extract_dict = stored["extract"]
+        else:
+            draft = _current_draft(conn, extraction_id, body.draft_version)
+            extract_dict, corrections = draft["extract"], draft["corrections"]
+    else:
+        extract_dict = body.extract if body.extract is not None else stored["extract"]
     current_extract = TrainingLogLLMExtract.model_validate(extract_dict)
 
-    validator = LLMExtractValidator(AnthropicProvider())
+    validator = LLMExtractValidator(_scheduled(AnthropicProvider(), "interactive"))
     try:
         updated_extract, edits = validator.apply_correction(current_extract, body.instruction)
     except PatchError as exc:
@@ -231,10 +772,355 @@ def correct_extraction(
         "instruction": body.instruction,
         "edits": [e.model_dump(mode="json") for e in edits],
     }
-    card = ValidationCardBuilder().build(updated_extract)
+    builder = ValidationCardBuilder()
+    history = _history(conn, current_extract, updated_extract)
+    card = jsonable_encoder(builder.build(updated_extract, history))
 
-    return CorrectOut(
-        extract=updated_extract.model_dump(mode="json"),
-        card=jsonable_encoder(card),
+    if body.draft_version is None:
+        return CorrectOut(
+            extract=updated_extract.model_dump(mode="json"),
+            card=card,
+            correction=correction,
+        )
+
+    version = save_correction_draft(
+        conn, extraction_id, body.draft_version, updated_extract.model_dump(mode="json"),
+        corrections + [correction], ttl_seconds=CORRECTION_DRAFT_TTL_HOURS * 3600,
+    )
+    if version is None:
+        # Another correction landed on the same version while this one was with the model.
+        _current_draft(conn, extraction_id, body.draft_version)
+        raise HTTPException(status_code=409, detail="Correction draft changed; retry")
+    return CorrectDraftOut(
+        draft_version=version,
+        patch=card_patch(jsonable_encoder(builder.build(current_extract, history)), card),
         correction=correction,
     )
+
+
+@app.get("/extractions/{extraction_id}/draft", response_model=DraftOut)
+def get_correction_draft_endpoint(extraction_id: str, conn=Depends(_db), _=Depends(_auth)):
+    """A correction draft in full -- for a client that lost track of it, or was told its
+    version is stale."""
+    from fastapi.encoders import jsonable_encoder
+
+    from traininglogs.agent.schemas import TrainingLogLLMExtract
+    from traininglogs.agent.validation_card_builder import ValidationCardBuilder
+    from traininglogs.db.fetch import get_correction_draft
+
+    draft = get_correction_draft(conn, extraction_id)
+    if draft is None:
+        raise HTTPException(status_code=404, detail="No correction draft for this extraction")
+    extract = TrainingLogLLMExtract.model_validate(draft["extract"])
+    card = ValidationCardBuilder().build(extract, _history(conn, extract))
+    return DraftOut(
+        draft_version=draft["version"],
+        extract=draft["extract"],
+        card=jsonable_encoder(card),
+        corrections=draft["corrections"],
+    )
+
+
+# --- /analytics/* -----------------------------------------------------------------------------
+# analytics.queries over HTTP, so a client can show live numbers rather than wait for the next
+# dashboard build. Every endpoint goes through _analytics(): replica-eligible, ETag'd like the
+# session reads, cached, and bounded in time.
+
+_analytics_cache = ReadCache(ANALYTICS_CACHE_SIZE)
+
+
+def _analytics(request: Request, response: Response, conn, query: Callable, *args):
+    """`query(conn, *args)`, answered from memory when the data hasn't changed since it last
+    ran.
+
+    The cache key includes the data_version counter, read first and once: a result is never
+    served for data it wasn't computed from -- across instances, or from a replica that is
+    behind, which is read with its own counter -- and needs no invalidation, only the LRU
+    bound to age out old versions. The same read makes the ETag, so an unchanged poll is a
+    304 before even the cache is consulted.
+
+    Past ANALYTICS_TIMEOUT_MS, Postgres cancels the query and the client gets a 504. The
+    timeout is SET LOCAL, so it ends with the request's transaction and never follows the
+    pooled connection into another request."""
+    import psycopg2.errors
+
+    from traininglogs.db.fetch import get_data_version
+
+    version = get_data_version(conn)
+    if (not_modified := _not_modified(request, response, conn, version)) is not None:
+        return not_modified
+    key = (query.__name__, freeze_args(args), version)
+    result = _analytics_cache.get(key, None)
+    if result is not None:
+        return result
+    with conn.cursor() as cur:
+        cur.execute("SET LOCAL statement_timeout = %s", (ANALYTICS_TIMEOUT_MS,))
+    try:
+        result = query(conn, *args)
+    except psycopg2.errors.QueryCanceled:
+        raise HTTPException(
+            status_code=504,
+            detail=f"{query.__name__} did not finish within {ANALYTICS_TIMEOUT_MS} ms",
+        )
+    _analytics_cache.put(key, result, _analytics_cache.generation)
+    return result
+
+
+@app.get("/analytics/overview", response_model=OverviewStats)
+def analytics_overview(
+    request: Request, response: Response, conn=Depends(_read_db), _=Depends(_auth)
+):
+    return _analytics(request, response, conn, analytics.overview_stats)
+
+
+@app.get("/analytics/personal-records", response_model=list[PersonalRecord])
+def analytics_personal_records(
+    request: Request, response: Response, conn=Depends(_read_db), _=Depends(_auth)
+):
+    return _analytics(request, response, conn, analytics.personal_records)
+
+
+@app.get("/analytics/key-lift-prs", response_model=dict[str, KeyLiftPRs])
+def analytics_key_lift_prs(
+    request: Request,
+    response: Response,
+    lift: list[str] = Query(..., min_length=1, description="Repeat for each lift."),
+    conn=Depends(_read_db),
+    _=Depends(_auth),
+):
+    return _analytics(request, response, conn, analytics.key_lift_prs, lift)
+
+
+@app.get("/analytics/volume-by-session", response_model=list[SessionVolume])
+def analytics_volume_by_session(
+    request: Request,
+    response: Response,
+    phase: int | None = Query(None),
+    conn=Depends(_read_db),
+    _=Depends(_auth),
+):
+    return _analytics(request, response, conn, analytics.volume_by_session, phase)
+
+
+@app.get("/analytics/rpe-trend", response_model=list[RpeTrendRow])
+def analytics_rpe_trend(
+    request: Request,
+    response: Response,
+    phase: int | None = Query(None),
+    conn=Depends(_read_db),
+    _=Depends(_auth),
+):
+    return _analytics(request, response, conn, analytics.rpe_trend, phase)
+
+
+@app.get("/analytics/rpe-distribution", response_model=list[RpeBucket])
+def analytics_rpe_distribution(
+    request: Request,
+    response: Response,
+    phase: int | None = Query(None),
+    conn=Depends(_read_db),
+    _=Depends(_auth),
+):
+    return _analytics(request, response, conn, analytics.rpe_distribution, phase)
+
+
+@app.get("/analytics/top-rpe-sets", response_model=list[TopRpeSet])
+def analytics_top_rpe_sets(
+    request: Request,
+    response: Response,
+    n: int = Query(10, ge=1, le=100),
+    conn=Depends(_read_db),
+    _=Depends(_auth),
+):
+    return _analytics(request, response, conn, analytics.top_rpe_sets, n)
+
+
+@app.get("/analytics/sessions-per-week", response_model=list[WeekSessionCount])
+def analytics_sessions_per_week(
+    request: Request, response: Response, conn=Depends(_read_db), _=Depends(_auth)
+):
+    return _analytics(request, response, conn, analytics.sessions_per_week)
+
+
+@app.get("/analytics/failure-techniques", response_model=list[FailureTechniqueUsage])
+def analytics_failure_techniques(
+    request: Request, response: Response, conn=Depends(_read_db), _=Depends(_auth)
+):
+    return _analytics(request, response, conn, analytics.failure_technique_usage)
+
+
+@app.get("/analytics/exercises", response_model=list[ExerciseSummary])
+def analytics_exercises(
+    request: Request,
+    response: Response,
+    min_sets: int = Query(10, ge=1),
+    conn=Depends(_read_db),
+    _=Depends(_auth),
+):
+    return _analytics(request, response, conn, analytics.exercise_list, min_sets)
+
+
+@app.get("/analytics/exercises/{name}/progression", response_model=list[ProgressionSet])
+def analytics_exercise_progression(
+    name: str, request: Request, response: Response, conn=Depends(_read_db),
+    _=Depends(_auth),
+):
+    return _analytics(request, response, conn, analytics.exercise_progression, name)
+
+
+# ?downsample= on the per-set series: which rows to keep for a chart (analytics/downsample.py).
+Downsample = Literal["top_set", "weekly", "lttb"]
+_MAX_POINTS = Query(DEFAULT_MAX_POINTS, ge=3, le=10_000, description="Cap on rows when downsampling.")
+
+
+def _sampled_sets_trend(conn, name: str, mode: str, max_points: int) -> list[dict]:
+    from traininglogs.analytics.downsample import downsample, lift_value
+
+    sets = analytics.exercise_sets_trend(conn, name)
+    return downsample(
+        sets, max_points, mode=mode, when=lambda r: r["date"], value=lift_value(sets)
+    )
+
+
+def _sampled_goal_vs_actual(conn, name: str, mode: str, max_points: int) -> list[dict]:
+    from traininglogs.analytics.downsample import downsample
+
+    return downsample(
+        analytics.goal_vs_actual(conn, name), max_points, mode=mode,
+        when=lambda r: r["date"], value=lambda r: r["actual_kg"],
+    )
+
+
+@app.get("/analytics/exercises/{name}/sets-trend", response_model=list[SetsTrendRow])
+def analytics_exercise_sets_trend(
+    name: str,
+    request: Request,
+    response: Response,
+    downsample: Downsample | None = None,
+    max_points: int = _MAX_POINTS,
+    conn=Depends(_read_db),
+    _=Depends(_auth),
+):
+    """Every working set, or with `downsample` at most `max_points` of them: the top set of
+    each day (`top_set`) or week (`weekly`), or the sets that keep the curve's shape (`lttb`)."""
+    if downsample is None:
+        return _analytics(request, response, conn, analytics.exercise_sets_trend, name)
+    return _analytics(
+        request, response, conn, _sampled_sets_trend, name, downsample, max_points
+    )
+
+
+@app.get("/analytics/exercises/{name}/goal-vs-actual", response_model=list[GoalVsActualRow])
+def analytics_exercise_goal_vs_actual(
+    name: str,
+    request: Request,
+    response: Response,
+    downsample: Downsample | None = None,
+    max_points: int = _MAX_POINTS,
+    conn=Depends(_read_db),
+    _=Depends(_auth),
+):
+    """As /sets-trend, with each set's goal alongside."""
+    if downsample is None:
+        return _analytics(request, response, conn, analytics.goal_vs_actual, name)
+    return _analytics(
+        request, response, conn, _sampled_goal_vs_actual, name, downsample, max_points
+    )
+
+
+@app.get("/analytics/muscle-group-volume", response_model=list[MuscleGroupVolume])
+def analytics_muscle_group_volume(
+    request: Request,
+    response: Response,
+    phase: int | None = Query(None),
+    conn=Depends(_read_db),
+    _=Depends(_auth),
+):
+    return _analytics(request, response, conn, analytics.weekly_muscle_group_volume, phase)
+
+
+@app.get("/analytics/phases/{phase}/fatigue", response_model=list[PhaseFatigueWeek])
+def analytics_phase_fatigue(
+    phase: int, request: Request, response: Response, conn=Depends(_read_db),
+    _=Depends(_auth),
+):
+    return _analytics(request, response, conn, analytics.fatigue_within_phase, phase)
+
+
+@app.get("/analytics/deload-effect", response_model=list[DeloadEffect])
+def analytics_deload_effect(
+    request: Request, response: Response, conn=Depends(_read_db), _=Depends(_auth)
+):
+    return _analytics(request, response, conn, analytics.deload_effect)
+
+
+@app.get("/analytics/stimulus-fatigue", response_model=list[StimulusFatigue])
+def analytics_stimulus_fatigue(
+    request: Request,
+    response: Response,
+    min_sets: int = Query(10, ge=1),
+    conn=Depends(_read_db),
+    _=Depends(_auth),
+):
+    return _analytics(request, response, conn, analytics.stimulus_fatigue_by_exercise, min_sets)
+
+
+@app.get("/analytics/weekly-tonnage", response_model=list[WeeklyTonnage])
+def analytics_weekly_tonnage(
+    request: Request, response: Response, conn=Depends(_read_db), _=Depends(_auth)
+):
+    return _analytics(request, response, conn, analytics.weekly_tonnage_by_phase)
+
+
+@app.get("/analytics/training-load", response_model=list[TrainingLoadDay])
+def analytics_training_load(
+    request: Request,
+    response: Response,
+    since: date | None = None,
+    until: date | None = None,
+    conn=Depends(_read_db),
+    _=Depends(_auth),
+):
+    """Rolling load by calendar day: acute and chronic tonnage and sets, ACWR, monotony and
+    strain, from daily_load. `since`/`until` bound it, both inclusive."""
+    return _analytics(request, response, conn, analytics.training_load, since, until)
+
+
+@app.get("/export")
+def export(
+    request: Request,
+    fmt: Annotated[
+        Literal["parquet", "arrow", "ndjson"], Query(alias="format")
+    ] = "ndjson",
+    since: date | None = None,
+    until: date | None = None,
+    _=Depends(_auth),
+):
+    """Every working set as one flat table (db/export.py), streamed batch by batch as Parquet,
+    an Arrow IPC stream or NDJSON, so memory stays flat however long the history. Parquet and
+    Arrow need pyarrow on the server: without it, 501. `since`/`until` bound the session
+    date, both inclusive.
+
+    The connection is held for as long as the response streams, and returned when it ends or
+    the client goes away -- not when this function returns, which is before the first row."""
+    from fastapi.responses import StreamingResponse
+
+    from traininglogs.db.export import EXTENSIONS, MEDIA_TYPES, ExportUnavailable, iter_export
+
+    db = _read_db(request)
+    conn = next(db)
+    try:
+        chunks = iter_export(conn, fmt, since, until)
+    except ExportUnavailable as exc:
+        db.close()
+        raise HTTPException(status_code=501, detail=str(exc))
+
+    def body():
+        try:
+            yield from chunks
+        finally:
+            db.close()
+
+    # Only NDJSON is gzipped (see UNCOMPRESSED_MEDIA_TYPES).
+    headers = {"Content-Disposition": f'attachment; filename="traininglogs.{EXTENSIONS[fmt]}"'}
+    return StreamingResponse(body(), media_type=MEDIA_TYPES[fmt], headers=headers)
@@ -7,15 +7,17 @@ from pydantic import BaseModel, Field
 
 
 class SessionSummary(BaseModel):
+    # The keyset columns are always present. The rest default to absent rather than required,
+    # so a `fields=` projection can leave them out; the endpoint drops unset ones from the JSON.
     session_id: str
     date: date
-    program: Optional[str]
-    phase: Optional[int]
-    week: Optional[int]
-    focus: Optional[str]
-    duration_minutes: Optional[int]
-    is_deload_week: Optional[bool]
-    weight_unit: str
+    program: Optional[str] = None
+    phase: Optional[int] = None
+    week: Optional[int] = None
+    focus: Optional[str] = None
+    duration_minutes: Optional[int] = None
+    is_deload_week: Optional[bool] = None
+    weight_unit: Optional[str] = None
 
 
 class MovementOut(BaseModel):
@@ -123,6 +125,11 @@ class ConfirmIn(BaseModel):
         description="The corrections that produced `extract`, recorded alongside the "
         "extraction. Omit if none were applied.",
     )
+    draft_version: Optional[int] = Field(
+        default=None,
+        description="Confirm the server-side correction draft at this version, with the "
+        "corrections it accumulated, instead of sending `extract` and `corrections`.",
+    )
 
 
 class ConfirmOut(BaseModel):
@@ -139,6 +146,15 @@ class CorrectIn(BaseModel):
         ),
     )
     instruction: str = Field(min_length=1, description="What's wrong, in plain language.")
+    draft_version: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description=(
+            "Correct the server-side draft instead of a round-tripped `extract`: the "
+            "`draft_version` of the previous response, or 0 to start a draft from the "
+            "extraction's own stored reading. The response is then a CorrectDraftOut."
+        ),
+    )
 
 
 class CorrectOut(BaseModel):
@@ -153,15 +169,224 @@ class CorrectOut(BaseModel):
     )
 
 
+class CorrectDraftOut(BaseModel):
+    draft_version: int = Field(description="Send this as `draft_version` on the next call.")
+    patch: list[dict[str, Any]] = Field(
+        description="JSON Patch (RFC 6902) from the card as it was to the card as it is now, "
+        "one replaced, added or removed section or exercise per operation."
+    )
+    correction: dict[str, Any] = Field(
+        description="{at, instruction, edits} -- already kept with the draft, for display."
+    )
+
+
+class DraftOut(BaseModel):
+    draft_version: int
+    extract: dict[str, Any]
+    card: dict[str, Any]
+    corrections: list[dict[str, Any]]
+
+
 class ExerciseHistoryRow(BaseModel):
+    # As SessionSummary: keyset columns always, the rest only when selected.
+    date: date
+    session_id: str
+    exercise_number: int
+    number: int
+    phase: Optional[int] = None
+    week: Optional[int] = None
+    weight_kg: Optional[float] = None
+    reps_full: Optional[int] = None
+    reps_partial: Optional[int] = None
+    rpe: Optional[float] = None
+    rep_quality: Optional[str] = None
+    failure_technique: Optional[Any] = None
+
+
+class ExerciseState(BaseModel):
+    """One exercise's exercise_state row: how it went last time, and overall."""
+    exercise: str
+    last_date: date
+    last_session_id: str
+    # [{number, weight_kg, reps_full, reps_partial, rpe}], in order.
+    last_sets: list[dict[str, Any]]
+    # {weight_kg, sets, rep_min, rep_max}; None when that session set no goal.
+    last_goal: Optional[dict[str, Any]] = None
+    best_e1rm_kg: Optional[float] = None
+    best_e1rm_date: Optional[date] = None
+    session_count: int
+
+
+# --- /analytics/* -- one model per analytics.queries row shape. ---
+
+
+class OverviewStats(BaseModel):
+    total_tonnage_kg: int
+    weeks_trained: int
+    current_phase: Optional[int] = None
+    current_week: Optional[int] = None
+    last_session_date: Optional[date] = None
+    total_sessions: int
+
+
+class PersonalRecord(BaseModel):
+    exercise: str
+    weight_kg: float
+    reps_full: Optional[int]
     date: date
     phase: Optional[int]
     week: Optional[int]
+
+
+class RepPR(BaseModel):
+    weight_kg: float
+    date: str
+
+
+class KeyLiftPRs(BaseModel):
+    rep_prs: dict[int, RepPR]
+    e1rm_kg: Optional[float]
+    e1rm_date: Optional[str]
+
+
+class SessionVolume(BaseModel):
     session_id: str
-    number: int
+    date: date
+    phase: Optional[int]
+    week: Optional[int]
+    focus: Optional[str]
+    total_working_sets: int
+
+
+class RpeTrendRow(BaseModel):
+    date: date
+    phase: Optional[int]
+    week: Optional[int]
+    focus: Optional[str]
+    avg_rpe: float
+    sets_recorded: int
+
+
+class RpeBucket(BaseModel):
+    rpe_bucket: int
+    sets: int
+
+
+class TopRpeSet(BaseModel):
+    date: date
+    phase: Optional[int]
+    week: Optional[int]
+    exercise: str
     weight_kg: Optional[float]
     reps_full: Optional[int]
     reps_partial: Optional[int]
-    rpe: Optional[float]
+    rpe: float
     rep_quality: Optional[str]
     failure_technique: Optional[Any]
+
+
+class WeekSessionCount(BaseModel):
+    phase: Optional[int]
+    week: Optional[int]
+    session_count: int
+    week_start: date
+    week_end: date
+
+
+class FailureTechniqueUsage(BaseModel):
+    technique: Optional[str]
+    usage_count: int
+
+
+class ExerciseSummary(BaseModel):
+    exercise: str
+    set_count: int
+    first_date: date
+    last_date: date
+
+
+class ProgressionSet(BaseModel):
+    date: date
+    phase: Optional[int]
+    week: Optional[int]
+    set_number: int
+    weight_kg: Optional[float]
+    reps_full: Optional[int]
+    reps_partial: Optional[int]
+    rpe: Optional[float]
+    rep_quality: Optional[str]
+
+
+class SetsTrendRow(ProgressionSet):
+    is_deload_week: Optional[bool]
+    notes: Optional[str]
+
+
+class GoalVsActualRow(BaseModel):
+    date: date
+    phase: Optional[int]
+    week: Optional[int]
+    set_number: int
+    actual_kg: float
+    goal_weight_kg: Optional[float]
+    reps_full: Optional[int]
+    rpe: Optional[float]
+
+
+class MuscleGroupVolume(BaseModel):
+    phase: Optional[int]
+    week: Optional[int]
+    muscle_group: str
+    working_sets: int
+
+
+class PhaseFatigueWeek(BaseModel):
+    week: Optional[int]
+    is_deload_week: Optional[bool]
+    avg_rpe: Optional[float]
+    partial_rep_share_pct: Optional[float]
+    good_rep_share_pct: Optional[float]
+    total_sets: int
+
+
+class DeloadEffect(BaseModel):
+    phase: Optional[int]
+    deload_week: Optional[int]
+    pre_avg_rpe: Optional[float]
+    deload_avg_rpe: Optional[float]
+    post_avg_rpe: Optional[float]
+    pre_tonnage_kg: Optional[int]
+    deload_tonnage_kg: Optional[int]
+    post_tonnage_kg: Optional[int]
+
+
+class StimulusFatigue(BaseModel):
+    exercise: str
+    set_count: int
+    avg_tonnage_per_set: Optional[float]
+    avg_rpe: Optional[float]
+    avg_weight_kg: Optional[float]
+    avg_reps: Optional[float]
+
+
+class TrainingLoadDay(BaseModel):
+    date: date
+    tonnage_kg: float
+    working_sets: int
+    sessions: int
+    acute_tonnage_kg: Optional[float]
+    chronic_tonnage_kg: Optional[float]
+    acute_sets: Optional[int]
+    chronic_sets: Optional[float]
+    acwr: Optional[float]
+    monotony: Optional[float]
+    strain: Optional[float]
+
+
+class WeeklyTonnage(BaseModel):
+    phase: Optional[int]
+    week: Optional[int]
+    is_deload_week: Optional[bool]
+    tonnage_kg: int
+    working_sets: int
+    avg_rpe: Optional[float]
@@ -21,10 +21,32 @@ Commands:
                         --phase N           Phase number
                         --week N            Week number
                         --parser ai|rules   Parser backend (default: ai)
+                        --deadline SECONDS  Cap extraction time per file (ai only)
                         --no-commit         Insert to DB but skip git commit
                         --message MSG       Custom commit message
                         --pr                Open a pull request after committing
 
+  export              Write every working set as one flat table, for pandas,
+                      Polars or DuckDB. Streams: memory stays flat however
+                      long the history.
+
+                      Options:
+                        --format parquet|arrow|ndjson  (default: parquet;
+                                            parquet and arrow need pyarrow)
+                        --output PATH       File, or - for stdout
+                                            (default: traininglogs.<ext>)
+                        --since DATE        First session date, inclusive
+                        --until DATE        Last session date, inclusive
+
+  mirror              Copy what changed since the last sync into a local
+                      DuckDB file, for dashboard builds and analysis with
+                      no connection (--mirror). Needs the mirror extra.
+
+                      Options:
+                        --path PATH         The mirror file (default:
+                                            LOCAL_MIRROR_PATH, or
+                                            .cache/mirror.duckdb)
+
 Decision guide:
   Want to test parsing without touching the DB?  →  traininglogs validate
   Want to insert but not commit yet?             →  traininglogs log --no-commit
@@ -46,6 +68,12 @@ def main() -> None:
     elif cmd == "validate":
         from traininglogs.cli.validate import main as _main
         raise SystemExit(_main())
+    elif cmd == "export":
+        from traininglogs.cli.export import main as _main
+        raise SystemExit(_main())
+    elif cmd == "mirror":
+        from traininglogs.cli.mirror import main as _main
+        raise SystemExit(_main())
     else:
         print(f"Unknown command: {cmd}")
         print("Run 'traininglogs --help' for usage.")
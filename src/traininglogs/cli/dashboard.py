@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import json
+import os
 import re
 import sys
 from datetime import date, datetime
@@ -13,17 +14,35 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-from traininglogs.db.db import get_connection
+from traininglogs.cli.dashboard_shards import inline_json, prune, write_shard
+from traininglogs.db.db import read_database_url
+from traininglogs.db.gather import ReadPool
+from traininglogs.analytics.downsample import DEFAULT_MAX_POINTS, downsample, epley
 from traininglogs.analytics.queries import (
     overview_stats,
     session_list,
     key_lift_prs,
+    training_load,
 )
 
+try:
+    from traininglogs.analytics.engine import WorkingSets
+except ImportError:  # NumPy is optional: without it, every section is its own query.
+    WorkingSets = None
+
 REPO_ROOT = Path(__file__).parent.parent.parent.parent
 OUTPUT = REPO_ROOT / "docs" / "index.html"
+# Sections of the last build and the inputs they were built from (see build()).
+CACHE = Path(os.environ.get("DASHBOARD_CACHE", REPO_ROOT / ".cache" / "dashboard.json"))
+# Bumped when a section's shape changes, so that no build renders one cached in the old shape.
+CACHE_VERSION = 1
 KEY_LIFTS_CONFIG = REPO_ROOT / "config" / "key_lifts.yaml"
 GITHUB_BASE = "https://github.com/apoorvasharma007/traininglogs/blob/main"
+# Points per chart series, however long the history (see analytics/downsample.py).
+MAX_CHART_POINTS = int(os.environ.get("DASHBOARD_MAX_POINTS", DEFAULT_MAX_POINTS))
+# The rolling-load chart's span, up to the latest session, as scripts/build_dashboard.py has
+# it. Read in SQL: daily_load has a row per calendar day of the whole history.
+ROLLING_LOAD_WEEKS = 26
 
 
 def serial(obj):
@@ -135,32 +154,214 @@ def get_all_goal_vs_actual(conn, exercise_names: list[str]) -> dict:
     return result
 
 
-def build(conn) -> None:
-    overview = overview_stats(conn)
-    sessions = session_list(conn)
+def section_keys(conn, key_lifts: list[str], min_sessions: int = 3) -> dict:
+    """What each dashboard section is built from, as a key that changes whenever that does.
+
+    Sessions, exercises and sets are only ever inserted or deleted, never updated, and set ids
+    come from a sequence, so the ids of the rows behind a section identify their content:
+    logging a session changes the keys of the sections it touches and no others. The
+    sessions themselves, and the handful of PR rows, are hashed whole.
+
+    daily_load is updated in place rather than appended to, but every write to a row stamps
+    its updated_at, so the rolling-load section's key is the table's size, span and latest
+    stamp.
+
+    Returns {"overview", "timeline", "prs", "load": key, "progression": {exercise: key}}, with
+    "progression" holding the exercises get_exercises_with_sessions() would, in its order."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT md5(COALESCE(string_agg(
+                concat_ws('|', session_id, date, phase, week, focus, is_deload_week, source_file),
+                ',' ORDER BY session_id
+            ), ''))
+            FROM sessions
+            """
+        )
+        timeline = cur.fetchone()[0]
+        cur.execute("SELECT concat_ws('|', COUNT(*), MAX(id), SUM(id)) FROM working_sets")
+        all_sets = cur.fetchone()[0]
+        cur.execute(
+            """
+            SELECT md5(COALESCE(string_agg(
+                concat_ws('|', exercise, record, reps, value_kg, date),
+                ',' ORDER BY exercise, record, reps
+            ), ''))
+            FROM current_prs
+            WHERE LOWER(exercise) = ANY(%s)
+            """,
+            ([lift.lower() for lift in key_lifts],),
+        )
+        prs = cur.fetchone()[0]
+        cur.execute("SELECT concat_ws('|', COUNT(*), MAX(date), MAX(updated_at)) FROM daily_load")
+        load = cur.fetchone()[0]
+        cur.execute(
+            """
+            SELECT e.name, md5(string_agg(ws.id::text, ',' ORDER BY ws.id))
+            FROM exercises e
+            JOIN sessions s  ON s.session_id = e.session_id
+            JOIN working_sets ws ON ws.exercise_id = e.id
+            WHERE ws.weight_kg IS NOT NULL
+            GROUP BY e.name
+            HAVING COUNT(DISTINCT s.session_id) >= %s
+            ORDER BY e.name ASC
+            """,
+            (min_sessions,),
+        )
+        progression = dict(cur.fetchall())
+    return {
+        # Total tonnage is over every set; the rest is the latest session's.
+        "overview": f"{timeline}|{all_sets}",
+        "timeline": timeline,
+        "prs": f"{prs}|{','.join(key_lifts)}",
+        "load": f"{load}|{ROLLING_LOAD_WEEKS}",
+        "progression": progression,
+    }
+
+
+def _plain(value):
+    """`value` as the JSON it is cached and rendered as, so that a section read back from the
+    cache renders exactly as it did when it was built."""
+    return json.loads(json.dumps(value, default=serial))
+
+
+def _load_cache(settings: dict) -> dict[str, dict]:
+    """Sections cached by the last build, {name: {"key", "data"}}; none if it was built with
+    different settings, or the cache is missing or unreadable."""
+    try:
+        cached = json.loads(CACHE.read_text())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cached, dict) or cached.get("settings") != settings:
+        return {}
+    return cached.get("sections") or {}
+
+
+def write_if_changed(path: Path, text: str) -> bool:
+    """Write `text` to `path` unless it already holds exactly that, and say whether it wrote.
+    An unchanged page keeps its mtime, and git sees no diff. The write is atomic, so a reader
+    -- a local server, a half-finished push -- never sees half a page."""
+    try:
+        if path.read_text() == text:
+            return False
+    except OSError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+    return True
+
+
+def _progression(series: dict) -> dict:
+    # The chart plots sets by e1RM, so LTTB keeps the sets that shape that curve.
+    return {
+        **series,
+        "sets": downsample(
+            series["sets"], MAX_CHART_POINTS,
+            when=lambda s: s["x"], value=lambda s: epley(s["y"], s["reps"]),
+        ),
+        "goals": downsample(
+            series["goals"], MAX_CHART_POINTS,
+            when=lambda g: g["x"], value=lambda g: g["goal_kg"],
+        ),
+    }
+
+
+def build(conn=None, dsn: str | None = None) -> None:
+    """Build the page from cached sections, recomputing only those whose inputs changed.
+
+    The page is five kinds of section -- the overview numbers, the session timeline, the
+    key-lift PRs, the rolling load, and one progression chart per exercise -- each cached in
+    CACHE under the key
+    section_keys() gives it. A build asks for the keys, one small round trip, and queries only
+    for the sections whose key moved: after logging a session, that is the overview, the
+    timeline, and the charts of the exercises in it, not every set of every exercise. With
+    nothing cached, and NumPy, everything comes from one WorkingSets snapshot instead.
+
+    With `dsn`, the sections' queries run at once, each on its own pooled connection
+    (db/gather.py); with `conn`, one after another on it. `conn` may be the local mirror's
+    MirrorConnection (db/mirror.py), for a build with no database to connect to."""
     key_lifts = load_key_lifts()
-    prs = key_lift_prs(conn, key_lifts)
     brief_html = "<p>—</p>"
-
-    prog_exercises = get_exercises_with_sessions(conn, min_sessions=3)
-    prog_data = get_all_goal_vs_actual(conn, prog_exercises)
+    settings = {"version": CACHE_VERSION, "max_points": MAX_CHART_POINTS}
+    cached = _load_cache(settings)
+
+    with (ReadPool(dsn) if dsn else ReadPool(conn=conn)) as pool:
+        keys = pool.gather({"keys": (section_keys, key_lifts)})["keys"]
+        prog_exercises = list(keys["progression"])
+        wanted = {
+            "overview": keys["overview"],
+            "timeline": keys["timeline"],
+            "prs": keys["prs"],
+            "load": keys["load"],
+            **{f"progression:{name}": key for name, key in keys["progression"].items()},
+        }
+        stale = [name for name, key in wanted.items() if cached.get(name, {}).get("key") != key]
+        stale_lifts = [name.split(":", 1)[1] for name in stale if name.startswith("progression:")]
+
+        built: dict = {}
+        # The rolling load comes from daily_load, not the working sets, so it is its own
+        # bounded read whichever way the rest are built.
+        load = {"load": (training_load, None, None, ROLLING_LOAD_WEEKS)} if "load" in stale else {}
+        if WorkingSets is not None and stale_lifts and len(stale_lifts) == len(prog_exercises):
+            # Every chart is stale anyway -- a first build, or new settings -- and one
+            # snapshot answers all of them faster than their queries would.
+            built = pool.gather({"snapshot": (WorkingSets.load,), **load})
+            snapshot = built.pop("snapshot")
+            built.update({
+                "overview": snapshot.overview(),
+                "timeline": snapshot.session_list(),
+                "prs": snapshot.key_lift_prs(key_lifts),
+                "prog_data": snapshot.goal_vs_actual_series(stale_lifts),
+            })
+        elif stale:
+            calls = {
+                "overview": (overview_stats,),
+                "timeline": (session_list,),
+                "prs": (key_lift_prs, key_lifts),
+            }
+            calls = {name: call for name, call in calls.items() if name in stale}
+            if stale_lifts:
+                calls["prog_data"] = (get_all_goal_vs_actual, stale_lifts)
+            built = pool.gather({**calls, **load})
+
+    for name in stale:
+        if name.startswith("progression:"):
+            series = built["prog_data"][name.split(":", 1)[1]]
+            data = _progression(series)
+        else:
+            data = built[name]
+        cached[name] = {"key": wanted[name], "data": _plain(data)}
+    sections = {name: cached[name] for name in wanted}
 
     data = {
-        "overview": overview,
-        "sessions": sessions,
+        "overview": sections["overview"]["data"],
+        "sessions": sections["timeline"]["data"],
         "brief_html": brief_html,
         "key_lifts": key_lifts,
-        "prs": prs,
+        "prs": sections["prs"]["data"],
+        "rolling_load": sections["load"]["data"],
         "prog_exercises": prog_exercises,
-        "prog_data": prog_data,
+        # Each chart's data is a file of its own, fetched when it is selected
+        # (cli/dashboard_shards.py); an unchanged chart's is already there.
+        "prog_shards": {
+            name: write_shard(OUTPUT.parent, name, sections[f"progression:{name}"]["data"])
+            for name in prog_exercises
+        },
     }
-    OUTPUT.parent.mkdir(parents=True, exist_ok=True)
-    OUTPUT.write_text(render(data))
-    print(f"Dashboard written to {OUTPUT}")
+    if stale:
+        write_if_changed(CACHE, json.dumps({"settings": settings, "sections": sections}))
+    rebuilt = f"{len(stale)} of {len(wanted)} sections rebuilt"
+    if write_if_changed(OUTPUT, render(data)):
+        print(f"Dashboard written to {OUTPUT} ({rebuilt})")
+    else:
+        print(f"Dashboard unchanged ({rebuilt})")
+    # Only once the page no longer names them.
+    prune(OUTPUT.parent, set(data["prog_shards"].values()))
 
 
 def render(data: dict) -> str:
-    j = lambda d: json.dumps(d, default=serial)
     o = data["overview"] or {}
     phase = o.get("current_phase") or 0
     week = o.get("current_week") or 0
@@ -181,7 +382,8 @@ def render(data: dict) -> str:
     rep_brackets = [1, 3, 5, 8, 10]
 
     def pr_cell(rep_prs: dict, reps: int) -> str:
-        p = rep_prs.get(reps)
+        # Rep counts are keys, and so strings, once the section has been through JSON.
+        p = rep_prs.get(str(reps))
         if not p:
             return "<td>—</td>"
         return f'<td><span class="pr-w">{p["weight_kg"]} kg</span><br><span class="pr-d">{p["date"]}</span></td>'
@@ -204,6 +406,21 @@ def render(data: dict) -> str:
         for ex in data["prog_exercises"]
     )
 
+    # The latest day's figures, over the charts. Each is None until its window is full.
+    latest = data["rolling_load"][-1] if data["rolling_load"] else {}
+
+    def load_figure(label: str, key: str, fmt: str) -> str:
+        value = latest.get(key)
+        shown = format(value, fmt) if value is not None else "—"
+        return f'<span>{label} <span class="pr-w">{shown}</span></span>'
+
+    load_figures = "".join([
+        load_figure("ACWR", "acwr", ".2f"),
+        load_figure("Monotony", "monotony", ".2f"),
+        load_figure("Strain", "strain", ",.0f"),
+        f'<span class="pr-d">{latest.get("date", "—")}</span>',
+    ])
+
     return f"""<!DOCTYPE html>
 <html lang="en">
 <head>
@@ -438,6 +655,16 @@ tbody tr:hover td {{ background: var(--faint); }}
   position: relative;
   top: -1px;
 }}
+.load-figures {{
+  display: flex;
+  gap: 1.5rem;
+  align-items: baseline;
+  flex-wrap: wrap;
+  margin-bottom: 1.25rem;
+  font-family: var(--f-mono);
+  font-size: 0.8rem;
+}}
+.chart-wrap + .chart-legend + .chart-wrap {{ margin-top: 1.5rem; }}
 .no-goal-note {{
   font-family: var(--f-mono);
   font-size: 0.68rem;
@@ -533,6 +760,35 @@ footer {{
     <div class="no-goal-note" id="noGoalNote" style="display:none;">
       No goal weights recorded for this exercise.
     </div>
+    <div class="no-goal-note" id="fileNote" hidden>
+      Opened from disk, the browser will not load the chart data. Serve docs/ instead: <code>python -m http.server -d docs</code>, then open http://localhost:8000.
+    </div>
+  </section>
+
+  <!-- § 4 — Rolling load -->
+  <section>
+    <h2 class="section-title">Rolling Load</h2>
+    <div class="load-figures">{load_figures}</div>
+    <div class="chart-wrap">
+      <canvas id="loadChart"></canvas>
+    </div>
+    <div class="chart-legend">
+      <span><span class="legend-line" style="background:var(--ink);"></span>7-day tonnage</span>
+      <span><span class="legend-line" style="background:var(--muted);"></span>28-day weekly average</span>
+      <span><span class="legend-line" style="background:var(--accent);"></span>ACWR (right)</span>
+    </div>
+    <div class="chart-wrap">
+      <canvas id="strainChart"></canvas>
+    </div>
+    <div class="chart-legend">
+      <span><span class="legend-dot" style="background:var(--ink);opacity:0.45;"></span>Strain</span>
+      <span><span class="legend-line" style="background:var(--accent);"></span>Monotony (right)</span>
+    </div>
+    <p style="font-family:var(--f-mono);font-size:0.65rem;color:var(--muted);margin-top:0.5rem;">
+      By calendar day over the last {ROLLING_LOAD_WEEKS} weeks, whatever the program says.
+      ACWR is 7-day tonnage over the 28-day weekly average: well above 1 is a spike on what you are used to.
+      Monotony is the 7-day mean daily tonnage over its standard deviation; strain is 7-day tonnage &times; monotony.
+    </p>
   </section>
 
   <footer>
@@ -543,8 +799,11 @@ footer {{
 
 </div>
 
+<script id="dashboard-core" type="application/json">{inline_json({"prog_shards": data["prog_shards"], "rolling_load": data["rolling_load"]})}</script>
 <script>
-const PROG_DATA = {j(data['prog_data'])};
+const CORE = JSON.parse(document.getElementById("dashboard-core").textContent);
+const PROG_SHARDS = CORE.prog_shards;
+const ROLLING_LOAD = CORE.rolling_load;
 
 const C = {{
   ink: "#1A1410",
@@ -593,9 +852,33 @@ Chart.defaults.plugins.tooltip.borderWidth = 1;
     return weight * (1 + reps / 30);
   }}
 
-  function draw(exName) {{
-    const ex = PROG_DATA[exName];
-    if (!ex) return;
+  // Each exercise's data is fetched the first time it is selected, and kept.
+  const loaded = {{}};
+  function load(exName) {{
+    if (!loaded[exName]) {{
+      loaded[exName] = fetch(PROG_SHARDS[exName]).then(r => {{
+        if (!r.ok) throw new Error(`${{PROG_SHARDS[exName]}}: ${{r.status}}`);
+        return r.json();
+      }});
+      // A failed fetch is tried again on the next selection.
+      loaded[exName].catch(() => delete loaded[exName]);
+    }}
+    return loaded[exName];
+  }}
+
+  function show(exName) {{
+    if (!PROG_SHARDS[exName]) return;
+    // Drawn only if still selected when it arrives: a slow fetch must not replace a newer chart.
+    load(exName).then(ex => {{ if (sel.value === exName) draw(ex); }}, failed);
+  }}
+
+  // Browsers refuse fetch() of a file:// page's own files, so say how to see the charts.
+  function failed(err) {{
+    console.error(err);
+    if (location.protocol === "file:") document.getElementById("fileNote").hidden = false;
+  }}
+
+  function draw(ex) {{
 
     const hasGoals = ex.goals && ex.goals.length > 0;
     document.getElementById("noGoalNote").style.display = hasGoals ? "none" : "block";
@@ -716,19 +999,117 @@ Chart.defaults.plugins.tooltip.borderWidth = 1;
     }});
   }}
 
-  sel.addEventListener("change", e => draw(e.target.value));
-  if (sel.options.length) draw(sel.value);
+  sel.addEventListener("change", e => show(e.target.value));
+  if (sel.options.length) show(sel.value);
+}})();
+
+// Rolling load
+(function() {{
+  if (!ROLLING_LOAD.length) return;
+  const labels = ROLLING_LOAD.map(r => r.date);
+  const column = key => ROLLING_LOAD.map(r => r[key]);
+  const line = (label, data, color, axis) => ({{
+    label, data, type: "line", borderColor: color, backgroundColor: "transparent",
+    borderWidth: 1.5, pointRadius: 0, tension: 0, yAxisID: axis, spanGaps: false,
+  }});
+  const kg = v => v == null ? "—" : Math.round(v).toLocaleString("en-US") + " kg";
+  const ratio = v => v == null ? "—" : v.toFixed(2);
+  const axes = (yTitle, rightTitle) => ({{
+    x: {{ grid: {{ display: false }}, ticks: {{ maxRotation: 0, autoSkip: true, maxTicksLimit: 8 }} }},
+    y: {{
+      beginAtZero: true,
+      grid: {{ color: C.faint }},
+      title: {{ display: true, text: yTitle, color: C.muted, font: {{ family: "'JetBrains Mono'", size: 9 }} }},
+      ticks: {{ callback: v => (v / 1000).toFixed(0) + "k" }},
+    }},
+    right: {{
+      position: "right",
+      beginAtZero: true,
+      grid: {{ display: false }},
+      title: {{ display: true, text: rightTitle, color: C.muted, font: {{ family: "'JetBrains Mono'", size: 9 }} }},
+    }},
+  }});
+
+  new Chart(document.getElementById("loadChart"), {{
+    type: "line",
+    data: {{ labels, datasets: [
+      line("7-day", column("acute_tonnage_kg"), C.ink, "y"),
+      line("28-day avg", column("chronic_tonnage_kg"), C.muted, "y"),
+      line("ACWR", column("acwr"), C.accent, "right"),
+    ] }},
+    options: {{
+      responsive: true,
+      interaction: {{ mode: "index", intersect: false }},
+      plugins: {{ legend: {{ display: false }}, tooltip: {{ callbacks: {{
+        label: ctx => ctx.dataset.yAxisID === "right"
+          ? `ACWR ${{ratio(ctx.parsed.y)}}`
+          : `${{ctx.dataset.label}}: ${{kg(ctx.parsed.y)}}`,
+      }} }} }},
+      scales: axes("Tonnage (kg)", "ACWR"),
+    }},
+  }});
+
+  new Chart(document.getElementById("strainChart"), {{
+    type: "bar",
+    data: {{ labels, datasets: [
+      {{ label: "Strain", data: column("strain"), backgroundColor: "rgba(26,20,16,0.35)",
+         borderWidth: 0, yAxisID: "y", order: 2 }},
+      {{ ...line("Monotony", column("monotony"), C.accent, "right"), order: 1 }},
+    ] }},
+    options: {{
+      responsive: true,
+      interaction: {{ mode: "index", intersect: false }},
+      plugins: {{ legend: {{ display: false }}, tooltip: {{ callbacks: {{
+        label: ctx => ctx.dataset.yAxisID === "right"
+          ? `Monotony ${{ratio(ctx.parsed.y)}}`
+          : `Strain ${{ctx.parsed.y == null ? "—" : Math.round(ctx.parsed.y).toLocaleString("en-US")}}`,
+      }} }} }},
+      scales: axes("Strain", "Monotony"),
+    }},
+  }});
 }})();
 </script>
 </body>
 </html>"""
 
 
-def main() -> None:
-    conn = get_connection()
-    build(conn)
-    conn.close()
+def main(argv: list[str] | None = None) -> int:
+    import argparse
+
+    from traininglogs.cli.mirror import MIRROR_PATH
+
+    parser = argparse.ArgumentParser(description="Build docs/index.html from the database.")
+    parser.add_argument(
+        "--mirror",
+        nargs="?",
+        const=MIRROR_PATH,
+        type=Path,
+        metavar="PATH",
+        help="Build from the local mirror (`traininglogs mirror`) instead, with no connection. "
+        f"Default path: {MIRROR_PATH}",
+    )
+    parser.add_argument(
+        "--primary",
+        action="store_true",
+        help="Build from DATABASE_URL even when DATABASE_READ_URL is set. `traininglogs log` "
+        "rebuilds this way, since a lagging replica may not have the session it just wrote.",
+    )
+    args = parser.parse_args(argv)
+    if args.mirror is None:
+        build(dsn=os.environ["DATABASE_URL"] if args.primary else read_database_url())
+        return 0
+
+    from traininglogs.db.mirror import MirrorConnection, MirrorUnavailable
+
+    try:
+        mirror = MirrorConnection(args.mirror, read_only=True)
+    except (MirrorUnavailable, FileNotFoundError) as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return 1
+    with mirror:
+        build(mirror)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Dashboard data as files the page fetches when it needs them, not JSON inlined in the page.
+
+Both dashboard builders used to inline every chart's data in docs/index.html -- every set of
+every charted exercise -- so the page grew with the history, and a browser had to download
+and parse all of it before drawing anything, though only one exercise's chart shows at a time.
+Now the page carries only a small core: the overview, the PRs, and which shard holds each
+exercise. Each exercise's chart data is a shard of its own, docs/data/<exercise>.<hash>.json,
+fetched when that exercise is selected. However long the history, first paint costs the same.
+
+A shard's name ends in a hash of its content, so:
+
+  - a shard is written once and never rewritten: a build whose data for an exercise has not
+    changed finds the file already there, and the page names the same file as before;
+  - a server may cache shards forever (`Cache-Control: immutable`), since new data gets a
+    new name, and the page -- which is not immutable -- points at it.
+
+Next to each shard are .gz and, with the `brotli` package installed (the `dashboard` extra),
+.br copies, compressed once at build time at the highest level, for a server that serves
+precompressed files (nginx's gzip_static and brotli_static, Caddy's precompressed) rather
+than compressing each response on the fly.
+
+prune() removes the shards the page no longer names. Only files named like shards are
+touched; anything else in docs/data is left alone.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Any, Callable
+
+try:
+    import brotli
+except ImportError:  # Optional: without it, shards get only a .gz copy.
+    brotli = None
+
+DATA_DIRNAME = "data"
+
+# <stem>.<12 hex digits>.json, and its compressed copies.
+_SHARD = re.compile(r"^[a-z0-9-]+\.[0-9a-f]{12}\.json(\.gz|\.br)?$")
+
+
+def _stem(name: str) -> str:
+    """`name` as a file name: "Barbell Bench Press" -> "barbell-bench-press"."""
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "shard"
+
+
+def write_shard(
+    site_dir: Path, name: str, data: Any, default: Callable[[Any], Any] | None = None
+) -> str:
+    """Write `data` as a shard named after `name` under `site_dir`/data, unless it is already
+    there, and return its path relative to `site_dir` -- what the page fetches. `default`
+    serialises what JSON cannot, as for json.dumps()."""
+    body = json.dumps(data, default=default, separators=(",", ":")).encode()
+    digest = hashlib.sha256(body).hexdigest()[:12]
+    relative = f"{DATA_DIRNAME}/{_stem(name)}.{digest}.json"
+    path = site_dir / relative
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # mtime=0: the same shard compresses to the same bytes on every build.
+        (path.parent / f"{path.name}.gz").write_bytes(gzip.compress(body, 9, mtime=0))
+        if brotli is not None:
+            (path.parent / f"{path.name}.br").write_bytes(brotli.compress(body, quality=11))
+        # Last, so that a shard that exists has its compressed copies too.
+        path.write_bytes(body)
+    return relative
+
+
+def prune(site_dir: Path, keep: set[str]) -> int:
+    """Delete the shards under `site_dir`/data, and their compressed copies, that are not in
+    `keep` (paths as write_shard() returns them). Returns how many files went."""
+    directory = site_dir / DATA_DIRNAME
+    if not directory.is_dir():
+        return 0
+    kept = {Path(relative).name for relative in keep}
+    removed = 0
+    for path in directory.iterdir():
+        if not _SHARD.match(path.name):
+            continue
+        if path.name.removesuffix(".gz").removesuffix(".br") in kept:
+            continue
+        path.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+
+def inline_json(data: Any, default: Callable[[Any], Any] | None = None) -> str:
+    """`data` as JSON safe to put inside a <script type="application/json"> element, which
+    the page reads with JSON.parse() -- quicker for a browser than the same data as a
+    JavaScript literal. "</" is escaped so that no string in it can close the element."""
+    return json.dumps(data, default=default).replace("</", "<\\/")
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    import argparse
+
+    from traininglogs.db.export import EXTENSIONS, FORMATS
+
+    parser = argparse.ArgumentParser(
+        prog="traininglogs export",
+        description="Export every working set as one flat table: Parquet, Arrow IPC or NDJSON.",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="parquet",
+        help="parquet (default), arrow (IPC stream) or ndjson. The first two need pyarrow.",
+    )
+    parser.add_argument(
+        "--output", "-o",
+        help="File to write, or '-' for stdout. Default: traininglogs.<extension>.",
+    )
+    parser.add_argument("--since", type=date.fromisoformat, help="First session date, inclusive")
+    parser.add_argument("--until", type=date.fromisoformat, help="Last session date, inclusive")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    from traininglogs.db.db import get_read_connection
+    from traininglogs.db.export import ExportUnavailable, write_export
+
+    output = args.output or f"traininglogs.{EXTENSIONS[args.format]}"
+    conn = get_read_connection()
+    try:
+        if output == "-":
+            write_export(conn, args.format, sys.stdout.buffer, args.since, args.until)
+            return 0
+        # Written beside the target and moved into place, so a failed export leaves no
+        # truncated file where a good one was.
+        path = Path(output)
+        tmp = path.with_name(f".{path.name}.tmp")
+        try:
+            with tmp.open("wb") as out:
+                written = write_export(conn, args.format, out, args.since, args.until)
+            tmp.replace(path)
+        finally:
+            tmp.unlink(missing_ok=True)
+    except ExportUnavailable as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+    print(f"✓ Exported {written:,} bytes of {args.format} to {path}", file=sys.stderr)
+    return 0
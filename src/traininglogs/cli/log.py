@@ -14,7 +14,8 @@ def _rebuild_dashboard() -> None:
     print("\n[rebuilding dashboard...]")
     from traininglogs.cli.dashboard import main as dashboard_main
     try:
-        dashboard_main()
+        # The primary, not the replica: the page should show the session just logged.
+        dashboard_main(["--primary"])
         print("✓ Dashboard updated")
     except Exception as e:
         print(f"⚠  Dashboard build failed: {e}")
@@ -100,7 +101,9 @@ def _resolve_targets(
 _UNSET = object()
 
 
-def _process_ai_file(md_path: Path, conn, provider=None, orchestrator=None, output_dir=_UNSET):
+def _process_ai_file(
+    md_path: Path, conn, provider=None, orchestrator=None, output_dir=_UNSET, deadline=None
+):
     """capture -> extract -> confirm, driven straight from the ingest/ module.
 
     This is the only place the interactive confirm loop runs -- deliberately not inside
@@ -112,11 +115,12 @@ def _process_ai_file(md_path: Path, conn, provider=None, orchestrator=None, outp
     terminal, the same reason `process_md_file_with_ai`'s `orchestrator` param used to.
     `output_dir` defaults to `processor.OUTPUT_DIR`; pass `None` to skip the JSON write (tests
     do, so they do not write into the tracked `output_training_logs_json/` directory).
+    `deadline` bounds extraction only -- never the confirm loop, which waits on a person.
     """
     from traininglogs.agent.llm_orchestrator import LLMOrchestrator
     from traininglogs.agent.providers import AnthropicProvider
     from traininglogs.agent.schemas import TrainingLogLLMExtract
-    from traininglogs.db.fetch import get_extraction
+    from traininglogs.db.fetch import get_exercise_states, get_extraction
     from traininglogs.db.insert import insert_llm_calls
     from traininglogs.ingest.capture import capture
     from traininglogs.ingest.confirm import confirm
@@ -137,7 +141,9 @@ def _process_ai_file(md_path: Path, conn, provider=None, orchestrator=None, outp
     raw_input_id = capture(conn, md_text, source_kind="markdown", source_file=source_file)
 
     provider = provider or AnthropicProvider()
-    extraction_id = extract(conn, raw_input_id, provider=provider, model=provider.model)
+    extraction_id = extract(
+        conn, raw_input_id, provider=provider, model=provider.model, deadline=deadline
+    )
 
     stored = get_extraction(conn, extraction_id)
     pending_extract = TrainingLogLLMExtract.model_validate(stored["extract"])
@@ -148,7 +154,8 @@ def _process_ai_file(md_path: Path, conn, provider=None, orchestrator=None, outp
     # instance when the caller shares one) -- those happen after extract() has already
     # returned, so nothing else will ever persist them unless this does.
     calls_recorded_so_far = len(getattr(provider, "calls", []))
-    final_extract = orchestrator.confirm_loop(pending_extract)
+    history = get_exercise_states(conn, [ex.name for ex in pending_extract.exercises])
+    final_extract = orchestrator.confirm_loop(pending_extract, history)
     insert_llm_calls(conn, raw_input_id, getattr(provider, "calls", [])[calls_recorded_so_far:])
 
     session = confirm(
@@ -188,6 +195,14 @@ def main(argv: Optional[list[str]] = None) -> int:
         default="ai",
         help="Parser backend: 'ai' (default, LLM-based) or 'rules' (deterministic rule-based).",
     )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Stop extracting each file after this long and review what came back, with "
+        "placeholders for the rest. Default: no limit.",
+    )
     parser.add_argument(
         "--test",
         action="store_true",
@@ -243,7 +258,10 @@ def main(argv: Optional[list[str]] = None) -> int:
     try:
         for md_path in md_files:
             if args.parser == "ai":
-                session = _process_ai_file(md_path, conn)
+                from traininglogs.agent.deadline import Deadline
+
+                deadline = Deadline(args.deadline) if args.deadline else None
+                session = _process_ai_file(md_path, conn, deadline=deadline)
             else:
                 session = process_md_file(md_path, conn)
             if local_conn:
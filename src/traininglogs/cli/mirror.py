@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+from typing import Optional
+
+REPO_ROOT = Path(__file__).parent.parent.parent.parent
+# The local mirror `traininglogs mirror` keeps and `--mirror` builds read (db/mirror.py).
+MIRROR_PATH = Path(os.environ.get("LOCAL_MIRROR_PATH", REPO_ROOT / ".cache" / "mirror.duckdb"))
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="traininglogs mirror",
+        description="Bring the local DuckDB mirror up to date with the database, copying only "
+        "what changed since the last sync.",
+    )
+    parser.add_argument(
+        "--path",
+        type=Path,
+        default=MIRROR_PATH,
+        help=f"The mirror file (default: LOCAL_MIRROR_PATH, or {MIRROR_PATH})",
+    )
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    from traininglogs.db.db import get_read_connection
+    from traininglogs.db.mirror import MirrorConnection, MirrorUnavailable, sync_mirror
+
+    try:
+        mirror = MirrorConnection(args.path)
+    except MirrorUnavailable as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return 1
+    conn = get_read_connection()
+    try:
+        result = sync_mirror(conn, mirror)
+    finally:
+        conn.close()
+        mirror.close()
+    if not result.changed:
+        print(f"✓ Mirror {args.path} already up to date")
+    else:
+        print(
+            f"✓ Mirror {args.path} synced: {result.sessions_added} sessions added, "
+            f"{result.sessions_removed} removed"
+        )
+    return 0
@@ -0,0 +1,179 @@
+"""An in-process LRU cache in front of the read queries, kept coherent across processes by
+Postgres LISTEN/NOTIFY.
+
+Session data changes only when a session is written -- a confirm, an import -- and is read far
+more often than that: every poll of the API, every dashboard section. A read the cache has
+already answered costs a dict lookup instead of a round trip and a query plan.
+
+Every write to the session tables notifies CHANNEL in its own transaction (see
+db.insert.bump_data_version()), and Postgres delivers it on commit to every listening
+connection, on any machine. Each process with the cache on keeps one such connection and
+drops its whole cache on every notification. That is coarse, but writes are rare enough that
+finer invalidation would buy nothing. If the listening connection drops, notifications sent
+meanwhile are lost, so the cache is also dropped on every reconnect.
+
+Off unless enable_read_cache() is called: the API does (READ_CACHE_SIZE), scripts and the CLI
+read once and exit, and tests write behind its back.
+"""
+from __future__ import annotations
+
+import functools
+import select
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, TypeVar
+
+import psycopg2
+
+CHANNEL = "traininglogs_data_changed"
+
+_MISSING = object()
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class ReadCache:
+    """A bounded, thread-safe LRU map with a generation counter.
+
+    clear() bumps the generation, and put() only stores a value computed under the current
+    one. Without that, a read that started before a write committed and finished after the
+    invalidation would put the old data back, and it would stay until the next write."""
+
+    def __init__(self, maxsize: int = 512, settle_seconds: float = 0.0) -> None:
+        self.maxsize = maxsize
+        # Reads for this long after a clear are answered but not stored: with a lagging read
+        # replica, they may not see the write that caused the clear yet.
+        self.settle_seconds = settle_seconds
+        self.generation = 0
+        self._cleared_at = float("-inf")
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple, default: Any = _MISSING) -> Any:
+        """The cached value for `key`, or `default`."""
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: tuple, value: Any, generation: int) -> None:
+        with self._lock:
+            if generation != self.generation:
+                return
+            if time.monotonic() - self._cleared_at < self.settle_seconds:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._cleared_at = time.monotonic()
+            self._entries.clear()
+
+
+_cache: ReadCache | None = None
+_stop: threading.Event | None = None
+
+
+def freeze_args(value: Any) -> Any:
+    """`value` as something hashable: lists (key lifts, field lists) become tuples. Public so
+    that callers keeping their own ReadCache build keys the way @read_cached does."""
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze_args(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze_args(v)) for k, v in value.items()))
+    return value
+
+
+def read_cached(fn: F) -> F:
+    """Cache `fn(conn, *args, **kwargs)` by its name and arguments -- never by `conn`, which
+    every caller has its own of -- while the read cache is on. Off, it is a plain call.
+
+    A cached result is the same object every caller gets back: treat it as read-only."""
+    name = f"{fn.__module__}.{fn.__qualname__}"
+
+    @functools.wraps(fn)
+    def wrapper(conn, *args, **kwargs):
+        cache = _cache
+        if cache is None:
+            return fn(conn, *args, **kwargs)
+        key = (name, freeze_args(args), freeze_args(kwargs))
+        value = cache.get(key)
+        if value is _MISSING:
+            generation = cache.generation
+            value = fn(conn, *args, **kwargs)
+            cache.put(key, value, generation)
+        return value
+
+    return wrapper  # type: ignore[return-value]
+
+
+def enable_read_cache(
+    maxsize: int, dsn: str | None = None, settle_seconds: float = 0.0
+) -> ReadCache:
+    """Turn the read cache on for this process and return it. With `dsn` -- the primary, where
+    writes notify -- also listen on CHANNEL there, so writes from other processes invalidate
+    it too. See ReadCache for `settle_seconds`."""
+    global _cache, _stop
+    disable_read_cache()
+    _cache = ReadCache(maxsize, settle_seconds)
+    if dsn is not None:
+        _stop = threading.Event()
+        threading.Thread(
+            target=_listen, args=(dsn, _cache, _stop), name="read-cache-listener", daemon=True
+        ).start()
+    return _cache
+
+
+def disable_read_cache() -> None:
+    global _cache, _stop
+    if _stop is not None:
+        _stop.set()
+    _cache, _stop = None, None
+
+
+def invalidate_read_cache() -> None:
+    """Drop this process's cache now, without waiting for the notification to come round."""
+    if _cache is not None:
+        _cache.clear()
+
+
+def _listen(dsn: str, cache: ReadCache, stop: threading.Event, poll_seconds: float = 1.0,
+            reconnect_seconds: float = 5.0) -> None:
+    while not stop.is_set():
+        conn = None
+        try:
+            conn = psycopg2.connect(dsn)
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {CHANNEL}")
+            # Whatever was written while nothing was listening.
+            cache.clear()
+            while not stop.is_set():
+                if select.select([conn], [], [], poll_seconds) == ([], [], []):
+                    continue
+                conn.poll()
+                if conn.notifies:
+                    conn.notifies.clear()
+                    cache.clear()
+        except psycopg2.Error as exc:
+            print(f"[read-cache] listener lost its connection: {exc}", file=sys.stderr)
+            cache.clear()
+            stop.wait(reconnect_seconds)
+        finally:
+            if conn is not None:
+                conn.close()
@@ -1,5 +1,8 @@
 import os
+import time
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Iterator
 
 import psycopg2
 from psycopg2.extensions import connection as Connection
@@ -10,8 +13,109 @@ def get_connection(database_url: str | None = None) -> Connection:
     return psycopg2.connect(url)
 
 
+def read_database_url() -> str:
+    """DATABASE_READ_URL, a read replica, when it is set, and DATABASE_URL otherwise."""
+    return os.environ.get("DATABASE_READ_URL") or os.environ["DATABASE_URL"]
+
+
+def get_read_connection() -> Connection:
+    """A connection for reads only (read_database_url()). For dashboard builds and other heavy
+    reads that should not compete with the write path."""
+    return psycopg2.connect(read_database_url())
+
+
 def apply_schema(conn: Connection) -> None:
+    """Create whatever schema.sql adds that the database lacks, then fill any table derived
+    from the sessions that is empty while the sessions are not. On a database that predates
+    current_prs, exercise_state or daily_load, the reads built on them would otherwise come
+    back empty until someone ran scripts/rebuild_derived.py. Once filled, insert_session()
+    keeps them current, so this costs one EXISTS per table on every later call."""
     db_dir = Path(__file__).parent
     with conn.cursor() as cur:
         cur.execute((db_dir / "schema.sql").read_text())
     conn.commit()
+    _backfill_derived(conn)
+
+
+def _backfill_derived(conn: Connection) -> None:
+    from traininglogs.db.insert import (
+        rebuild_daily_load,
+        rebuild_exercise_state,
+        rebuild_personal_records,
+    )
+
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT EXISTS (SELECT 1 FROM sessions),
+                   EXISTS (SELECT 1 FROM current_prs),
+                   EXISTS (SELECT 1 FROM exercise_state),
+                   EXISTS (SELECT 1 FROM daily_load)
+            """
+        )
+        has_sessions, has_prs, has_state, has_load = cur.fetchone()
+    conn.commit()
+    if not has_sessions:
+        return
+    if not has_prs:
+        rebuild_personal_records(conn)
+    if not has_state:
+        rebuild_exercise_state(conn)
+    if not has_load:
+        rebuild_daily_load(conn)
+
+
+# First key of the two-int advisory lock form, one per purpose, so locks taken for different
+# reasons on the same string can never collide.
+EXTRACT_LOCK_NAMESPACE = 0x7C5D
+DAILY_LOAD_LOCK_NAMESPACE = 0x7C5E
+
+
+@contextmanager
+def advisory_lock(
+    conn: Connection, namespace: int, key: str, timeout_seconds: float | None = None
+) -> Iterator[None]:
+    """Hold a session-level Postgres advisory lock on `key` for the block.
+
+    Session-level, not transaction-level, on purpose: the insert_* functions commit as they go,
+    and a transaction-level lock would be released by the first of those commits. That means
+    it must be released explicitly -- always, including on error -- or it outlives the block
+    on a pooled connection.
+
+    Waits for as long as it takes by default; with `timeout_seconds`, raises TimeoutError
+    once that has passed without the lock coming free."""
+    # The lock queries open a transaction like any other statement. If none was open before,
+    # none is left open after: a connection idle-in-transaction holds back vacuum for as long
+    # as it sits there.
+    was_idle = conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+    with conn.cursor() as cur:
+        if timeout_seconds is None:
+            cur.execute("SELECT pg_advisory_lock(%s, hashtext(%s))", (namespace, key))
+        else:
+            give_up_at = time.monotonic() + timeout_seconds
+            while True:
+                cur.execute("SELECT pg_try_advisory_lock(%s, hashtext(%s))", (namespace, key))
+                if cur.fetchone()[0]:
+                    break
+                if time.monotonic() >= give_up_at:
+                    if was_idle:
+                        conn.rollback()
+                    raise TimeoutError(
+                        f"advisory lock on {key!r} still held after {timeout_seconds:g}s"
+                    )
+                time.sleep(0.1)
+    if was_idle:
+        conn.commit()
+    try:
+        yield
+    finally:
+        # A closed connection took the lock with it. An aborted transaction must be rolled
+        # back first, or the unlock itself is refused and the lock outlives the block.
+        if not conn.closed:
+            status = conn.get_transaction_status()
+            if status == psycopg2.extensions.TRANSACTION_STATUS_INERROR:
+                conn.rollback()
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_unlock(%s, hashtext(%s))", (namespace, key))
+            if status != psycopg2.extensions.TRANSACTION_STATUS_INTRANS:
+                conn.commit()
@@ -0,0 +1,227 @@
+"""
+The whole working-set history as one flat table, streamed out as Parquet, Arrow or NDJSON.
+
+Every set ever logged, one row each, with its session's and exercise's fields alongside --
+the shape pandas, Polars and DuckDB want -- for analysis that has outgrown the API's queries.
+Rows come off a named server-side cursor EXPORT_BATCH_SIZE at a time and are encoded and
+handed on batch by batch, so memory holds one batch, whether the history is a month or ten
+years. Nothing is built up front: the first bytes go out as soon as the first batch is read.
+
+  parquet  Columnar and compressed (zstd), one row group per batch. The format to keep.
+  arrow    The Arrow IPC stream format: record batches exactly as Arrow holds them in memory,
+           so a reader -- pyarrow.ipc.open_stream(), and pandas or Polars through it -- takes
+           them in without converting anything. The quickest to load.
+  ndjson   One JSON object per line. Needs nothing installed, and any tool reads it.
+
+Parquet and Arrow need pyarrow, the `export` extra; without it they raise ExportUnavailable
+before anything is read. Rows are in (date, session_id, exercise number, set number) order.
+Numeric columns are floats: a NUMERIC's exactness means nothing to a chart or a mean.
+"""
+from __future__ import annotations
+
+import json
+from datetime import date
+from typing import Any, BinaryIO, Iterator
+
+from psycopg2.extensions import connection as Connection
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: without it, only NDJSON.
+    pa = None
+    pq = None
+
+FORMATS = ("parquet", "arrow", "ndjson")
+
+MEDIA_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "ndjson": "application/x-ndjson",
+}
+
+EXTENSIONS = {"parquet": "parquet", "arrow": "arrows", "ndjson": "ndjson"}
+
+# Rows per round trip, per Parquet row group, and per Arrow record batch: the most the export
+# holds in memory at once.
+EXPORT_BATCH_SIZE = 50_000
+
+# The columns, in order, and what they are.
+COLUMNS = (
+    ("session_id", "string"),
+    ("date", "date"),
+    ("program", "string"),
+    ("phase", "int"),
+    ("week", "int"),
+    ("is_deload_week", "bool"),
+    ("focus", "string"),
+    ("exercise_number", "int"),
+    ("exercise", "string"),
+    ("goal_weight_kg", "float"),
+    ("goal_sets", "int"),
+    ("goal_rep_min", "int"),
+    ("goal_rep_max", "int"),
+    ("set_number", "int"),
+    ("weight_kg", "float"),
+    ("reps_full", "int"),
+    ("reps_partial", "int"),
+    ("rpe", "float"),
+    ("rep_quality", "string"),
+    ("rest_seconds", "int"),
+    ("notes", "string"),
+)
+
+_SQL = """
+    SELECT
+        s.session_id,
+        s.date,
+        s.program,
+        s.phase,
+        s.week,
+        s.is_deload_week,
+        s.focus,
+        e.number                 AS exercise_number,
+        e.name                   AS exercise,
+        e.goal_weight_kg::float8 AS goal_weight_kg,
+        e.goal_sets,
+        e.goal_rep_min,
+        e.goal_rep_max,
+        ws.number                AS set_number,
+        ws.weight_kg::float8     AS weight_kg,
+        ws.reps_full,
+        ws.reps_partial,
+        ws.rpe::float8           AS rpe,
+        ws.rep_quality,
+        ws.rest_seconds,
+        ws.notes
+    FROM working_sets ws
+    JOIN exercises e ON e.id = ws.exercise_id
+    JOIN sessions  s ON s.session_id = e.session_id
+    WHERE (%(since)s::date IS NULL OR s.date >= %(since)s)
+      AND (%(until)s::date IS NULL OR s.date <= %(until)s)
+    ORDER BY s.date, s.session_id, e.number, ws.number
+"""
+
+
+class ExportUnavailable(RuntimeError):
+    """The format needs a package that is not installed."""
+
+
+def iter_working_set_batches(
+    conn: Connection,
+    since: date | None = None,
+    until: date | None = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[list[tuple]]:
+    """The flattened working sets, `batch_size` rows at a time, as tuples in COLUMNS order.
+    `since`/`until` bound the session date, both inclusive. Through a named cursor, so it
+    needs a connection that is not in autocommit mode; it leaves the transaction open."""
+    with conn.cursor(name="export_working_sets") as cur:
+        cur.itersize = batch_size
+        cur.execute(_SQL, {"since": since, "until": until})
+        while rows := cur.fetchmany(batch_size):
+            yield rows
+
+
+def iter_export(
+    conn: Connection,
+    fmt: str,
+    since: date | None = None,
+    until: date | None = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[bytes]:
+    """The export in `fmt` (one of FORMATS), as chunks of bytes, one or so per batch.
+
+    Checks the format now, and raises ValueError or ExportUnavailable before any query
+    runs: a caller streaming an HTTP response has not sent a status yet."""
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown export format {fmt!r}: expected one of {FORMATS}")
+    if fmt != "ndjson" and pa is None:
+        raise ExportUnavailable(
+            f"{fmt} export needs pyarrow: pip install 'traininglogs[export]', or use ndjson"
+        )
+    batches = iter_working_set_batches(conn, since, until, batch_size)
+    if fmt == "ndjson":
+        return _ndjson(batches)
+    return _arrow(batches, fmt)
+
+
+def write_export(
+    conn: Connection,
+    fmt: str,
+    out: BinaryIO,
+    since: date | None = None,
+    until: date | None = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> int:
+    """Write the export in `fmt` to `out`, and return how many bytes that was."""
+    written = 0
+    for chunk in iter_export(conn, fmt, since, until, batch_size):
+        out.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def _ndjson(batches: Iterator[list[tuple]]) -> Iterator[bytes]:
+    names = [name for name, _ in COLUMNS]
+    for rows in batches:
+        yield "".join(
+            json.dumps(dict(zip(names, row)), default=str) + "\n" for row in rows
+        ).encode()
+
+
+def _schema() -> Any:
+    types = {
+        "string": pa.string(), "date": pa.date32(), "int": pa.int32(),
+        "float": pa.float64(), "bool": pa.bool_(),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in COLUMNS])
+
+
+class _Chunks:
+    """A write-only file that keeps what is written to it until taken: somewhere for a pyarrow
+    writer to write to that hands the bytes on instead of keeping them."""
+
+    def __init__(self) -> None:
+        self._parts: list[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _arrow(batches: Iterator[list[tuple]], fmt: str) -> Iterator[bytes]:
+    schema = _schema()
+    sink = _Chunks()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    with writer:
+        for rows in batches:
+            columns = list(zip(*rows))
+            writer.write_batch(pa.record_batch(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema,
+            ))
+            yield sink.take()
+    # The Parquet footer, or the Arrow end-of-stream marker.
+    yield sink.take()
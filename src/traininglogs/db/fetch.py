@@ -1,15 +1,59 @@
 from psycopg2.extensions import connection as Connection
 
+from traininglogs.db.cache import read_cached
 
+
+# Columns GET /sessions may be trimmed to with `fields`, and the SQL behind each. The keyset
+# columns, `date` and `session_id`, are always selected: a page's last row is the next cursor.
+SESSION_FIELDS = {
+    "session_id": "session_id",
+    "date": "date",
+    "program": "program",
+    "phase": "phase",
+    "week": "week",
+    "focus": "focus",
+    "duration_minutes": "duration_minutes",
+    "is_deload_week": "is_deload_week",
+    "weight_unit": "weight_unit",
+}
+SESSION_KEYSET = ("date", "session_id")
+
+
+def _projection(
+    available: dict[str, str], keyset: tuple[str, ...], fields: list[str] | None
+) -> list[str]:
+    """`fields` as SELECT expressions, keyset columns included; every column when None.
+    Raises ValueError naming any field that isn't one of `available`."""
+    if fields is None:
+        return [f"{sql} AS {name}" for name, sql in available.items()]
+    unknown = [f for f in fields if f not in available]
+    if unknown:
+        raise ValueError(
+            f"unknown field(s) {', '.join(unknown)}; choose from {', '.join(available)}"
+        )
+    wanted = set(fields) | set(keyset)
+    return [f"{sql} AS {name}" for name, sql in available.items() if name in wanted]
+
+
+@read_cached
 def get_sessions(
     conn: Connection,
     phase: int | None = None,
     week: int | None = None,
     from_date: str | None = None,
     to_date: str | None = None,
+    limit: int | None = None,
+    after: tuple | None = None,
+    fields: list[str] | None = None,
 ) -> list[dict]:
+    """Sessions newest first, optionally one page at a time.
+
+    `after` is the (date, session_id) of the last row of the previous page, and the page
+    starts just past it -- a keyset, not an OFFSET, so page fifty costs what page one does and
+    a session logged between two requests cannot shift rows across a page boundary. `fields`
+    trims the columns in SQL (see SESSION_FIELDS)."""
     filters = []
-    params = []
+    params: list = []
 
     if phase is not None:
         filters.append("phase = %s")
@@ -23,17 +67,25 @@ def get_sessions(
     if to_date is not None:
         filters.append("date <= %s")
         params.append(to_date)
+    if after is not None:
+        filters.append("(date, session_id) < (%s::date, %s)")
+        params.extend(after)
 
     where = ("WHERE " + " AND ".join(filters)) if filters else ""
+    page = ""
+    if limit is not None:
+        page = "LIMIT %s"
+        params.append(limit)
 
+    columns = _projection(SESSION_FIELDS, SESSION_KEYSET, fields)
     with conn.cursor() as cur:
         cur.execute(
             f"""
-            SELECT session_id, date, program, phase, week, focus, duration_minutes,
-                   is_deload_week, weight_unit
+            SELECT {', '.join(columns)}
             FROM sessions
             {where}
-            ORDER BY date DESC
+            ORDER BY date DESC, session_id DESC
+            {page}
             """,
             params,
         )
@@ -43,6 +95,7 @@ def get_sessions(
     return [dict(zip(cols, row)) for row in rows]
 
 
+@read_cached
 def get_session(conn: Connection, session_id: str) -> dict | None:
     with conn.cursor() as cur:
         cur.execute(
@@ -120,29 +173,60 @@ def get_session(conn: Connection, session_id: str) -> dict | None:
     return session
 
 
-def get_exercise_history(conn: Connection, name: str) -> list[dict]:
+# As SESSION_FIELDS, for GET /exercises/{name}/history. `exercise_number` tells apart two
+# entries of one exercise in the same session, and completes the keyset.
+EXERCISE_HISTORY_FIELDS = {
+    "date": "s.date",
+    "phase": "s.phase",
+    "week": "s.week",
+    "session_id": "s.session_id",
+    "exercise_number": "e.number",
+    "number": "ws.number",
+    "weight_kg": "ws.weight_kg",
+    "reps_full": "ws.reps_full",
+    "reps_partial": "ws.reps_partial",
+    "rpe": "ws.rpe",
+    "rep_quality": "ws.rep_quality",
+    "failure_technique": "ws.failure_technique",
+}
+EXERCISE_HISTORY_KEYSET = ("date", "session_id", "exercise_number", "number")
+
+
+@read_cached
+def get_exercise_history(
+    conn: Connection,
+    name: str,
+    limit: int | None = None,
+    after: tuple | None = None,
+    fields: list[str] | None = None,
+) -> list[dict]:
+    """Every working set of `name`, oldest first, optionally one page at a time: `after` is
+    the (date, session_id, exercise_number, number) of the previous page's last row. See
+    get_sessions()."""
+    params: list = [name]
+    keyset = ""
+    if after is not None:
+        keyset = "AND (s.date, s.session_id, e.number, ws.number) > (%s::date, %s, %s, %s)"
+        params.extend(after)
+    page = ""
+    if limit is not None:
+        page = "LIMIT %s"
+        params.append(limit)
+
+    columns = _projection(EXERCISE_HISTORY_FIELDS, EXERCISE_HISTORY_KEYSET, fields)
     with conn.cursor() as cur:
         cur.execute(
-            """
-            SELECT
-                s.date,
-                s.phase,
-                s.week,
-                s.session_id,
-                ws.number,
-                ws.weight_kg,
-                ws.reps_full,
-                ws.reps_partial,
-                ws.rpe,
-                ws.rep_quality,
-                ws.failure_technique
+            f"""
+            SELECT {', '.join(columns)}
             FROM working_sets ws
             JOIN exercises e ON e.id = ws.exercise_id
             JOIN sessions s ON s.session_id = e.session_id
             WHERE LOWER(e.name) = LOWER(%s)
-            ORDER BY s.date ASC, ws.number ASC
+            {keyset}
+            ORDER BY s.date ASC, s.session_id ASC, e.number ASC, ws.number ASC
+            {page}
             """,
-            (name,),
+            params,
         )
         rows = cur.fetchall()
         cols = [d[0] for d in cur.description]
@@ -150,6 +234,35 @@ def get_exercise_history(conn: Connection, name: str) -> list[dict]:
     return [dict(zip(cols, row)) for row in rows]
 
 
+@read_cached
+def get_exercise_states(conn: Connection, names: list[str]) -> dict[str, dict]:
+    """exercise_state for every exercise in `names`, in one query, keyed by the name as given.
+    Matched in any case. Names never done before are left out."""
+    if not names:
+        return {}
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT exercise_key, exercise, last_date, last_session_id, last_sets, last_goal,
+                   best_e1rm_kg, best_e1rm_date, session_count
+            FROM exercise_state
+            WHERE exercise_key = ANY(%s)
+            """,
+            (list({name.lower() for name in names}),),
+        )
+        cols = [d[0] for d in cur.description]
+        by_key = {row[0]: dict(zip(cols[1:], row[1:])) for row in cur.fetchall()}
+    return {name: by_key[name.lower()] for name in names if name.lower() in by_key}
+
+
+def get_data_version(conn: Connection) -> int:
+    """The session data's change counter (see db.insert.bump_data_version())."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT version FROM data_version")
+        row = cur.fetchone()
+    return row[0] if row else 0
+
+
 def get_raw_input(conn: Connection, raw_input_id: str) -> dict | None:
     with conn.cursor() as cur:
         cur.execute(
@@ -188,10 +301,16 @@ _EXTRACTION_COLUMNS = (
 )
 
 
-def get_extraction(conn: Connection, extraction_id: str) -> dict | None:
+def get_extraction(
+    conn: Connection, extraction_id: str, for_update: bool = False
+) -> dict | None:
+    """`for_update` locks the row until the caller commits -- for a read-modify-write of the
+    stored extract (see ingest/retry.py), where two writers patching different exercises of
+    the same extraction would otherwise each overwrite the other's change."""
+    lock = " FOR UPDATE" if for_update else ""
     with conn.cursor() as cur:
         cur.execute(
-            f"SELECT {', '.join(_EXTRACTION_COLUMNS)} FROM extractions WHERE id = %s",
+            f"SELECT {', '.join(_EXTRACTION_COLUMNS)} FROM extractions WHERE id = %s{lock}",
             (extraction_id,),
         )
         row = cur.fetchone()
@@ -209,3 +328,53 @@ def get_extractions_for_raw_input(conn: Connection, raw_input_id: str) -> list[d
         )
         rows = cur.fetchall()
     return [dict(zip(_EXTRACTION_COLUMNS, r)) for r in rows]
+
+
+def get_correction_draft(conn: Connection, extraction_id: str) -> dict | None:
+    """An extraction's correction draft, or None if it has none or it has expired."""
+    keys = ("extraction_id", "version", "extract", "corrections", "updated_at", "expires_at")
+    with conn.cursor() as cur:
+        cur.execute(
+            f"SELECT {', '.join(keys)} FROM correction_drafts "
+            "WHERE extraction_id = %s AND expires_at > now()",
+            (extraction_id,),
+        )
+        row = cur.fetchone()
+    return dict(zip(keys, row)) if row else None
+
+
+def get_step_latency_percentiles(
+    conn: Connection,
+    percentile: float,
+    model: str,
+    min_samples: int = 20,
+    since_days: int = 30,
+) -> dict[str, float]:
+    """`percentile` (0-1) of successful `model` call latency in ms, per step, over the last
+    `since_days`. A step with fewer than `min_samples` calls is left out rather than guessed
+    at -- a percentile of five calls is noise, and agent/hedging.py reads a missing step as
+    "don't hedge"."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT step, percentile_cont(%s) WITHIN GROUP (ORDER BY ms)
+            FROM llm_calls
+            WHERE model = %s AND failed IS NULL
+              AND created_at > now() - make_interval(days => %s)
+            GROUP BY step
+            HAVING COUNT(*) >= %s
+            """,
+            (percentile, model, since_days, min_samples),
+        )
+        return {step: float(ms) for step, ms in cur.fetchall()}
+
+
+def get_placeholder_counts(conn: Connection) -> dict[str, int]:
+    """How many times each exercise, by lower-cased name, has come back as a placeholder --
+    every one is queued in extraction_retries, whatever became of it. agent/routing.py sends
+    an exercise with any history here straight to the strong model."""
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT lower(name), COUNT(*) FROM extraction_retries GROUP BY lower(name)"
+        )
+        return {name: count for name, count in cur.fetchall()}
@@ -0,0 +1,87 @@
+"""
+Independent read queries run at once, each on its own pooled connection.
+
+A dashboard build is a handful of queries none of which needs another's result -- overview,
+session list, PRs, weekly load -- and then one or two that do. Run one after another against a
+remote database, the build takes the sum of their round trips and execution times. Run side by
+side, it takes about as long as the slowest of them. Postgres runs each connection's query in
+its own backend, so the concurrency is real, and psycopg2 releases the GIL while it waits.
+
+    with ReadPool(read_database_url()) as pool:
+        first = pool.gather({"overview": (overview_stats,), "lifts": (exercise_list, 12)})
+        second = pool.gather({"sets": (exercise_sets_trend_by_name, names)})
+
+Connections are opened as the first gather() needs them and reused by the next, so a build
+that gathers twice connects once per worker, not once per query. With a connection instead of
+a DSN -- ReadPool(conn=conn), for callers and tests that already have one -- the same calls run
+one after another on it.
+
+Each query sees the data as of its own start, as it would on one connection outside a
+transaction: a session written mid-build may show in one section and not yet in another,
+exactly as before, and the next build has it everywhere.
+"""
+from __future__ import annotations
+
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+import psycopg2
+from psycopg2.extensions import connection as Connection
+
+# Enough for every independent query a dashboard build has; more would only sit idle.
+DEFAULT_SIZE = 6
+
+
+class ReadPool:
+    def __init__(
+        self, dsn: str | None = None, size: int = DEFAULT_SIZE, conn: Connection | None = None
+    ) -> None:
+        if (dsn is None) == (conn is None):
+            raise ValueError("ReadPool takes exactly one of dsn and conn")
+        self._dsn = dsn
+        self._conn = conn
+        # Connections not in use. psycopg2's own pools close anything returned beyond their
+        # minimum, which would mean connecting afresh for every gather() -- or opening all of
+        # them up front, one after another. Never more than `size` exist: one per worker.
+        self._idle: queue.SimpleQueue[Connection] = queue.SimpleQueue()
+        self._executor: ThreadPoolExecutor | None = None
+        if dsn is not None:
+            self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="read-pool")
+
+    def gather(self, calls: dict[str, tuple]) -> dict[str, Any]:
+        """Run each `name: (query, *args)` as `query(conn, *args)`, all at once, and return
+        `name: result` once every one has finished. The first to fail raises."""
+        if self._executor is None:
+            return {name: query(self._conn, *args) for name, (query, *args) in calls.items()}
+        futures = {
+            name: self._executor.submit(self._run, query, args)
+            for name, (query, *args) in calls.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+    def _run(self, query: Callable, args: tuple) -> Any:
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = psycopg2.connect(self._dsn)
+        try:
+            return query(conn, *args)
+        finally:
+            # End the read's transaction: a pooled connection left idle in one holds back
+            # vacuum for as long as it sits there.
+            if not conn.closed:
+                conn.rollback()
+                self._idle.put(conn)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            while not self._idle.empty():
+                self._idle.get_nowait().close()
+
+    def __enter__(self) -> ReadPool:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
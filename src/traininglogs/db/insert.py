@@ -1,9 +1,12 @@
 import hashlib
 import json
 import uuid
+from datetime import date
 
 from psycopg2.extensions import connection as Connection
 
+from traininglogs.db.cache import CHANNEL, invalidate_read_cache
+from traininglogs.db.db import DAILY_LOAD_LOCK_NAMESPACE
 from traininglogs.models.models import Rest, TrainingSession, WorkingSet
 
 
@@ -94,9 +97,11 @@ def insert_llm_calls(
 ) -> None:
     """Persist the per-step call records a provider accumulated during one extract() run
     (roadmap D4). `calls` is whatever shape `AnthropicProvider.calls` produces -- a list of
-    dicts with step/model/attempts/input_tokens/output_tokens/cost_usd/ms/cached/failed/
-    raw_payload. Empty list is a normal, silent no-op: a provider stub with no `.calls`
-    attribute (most test doubles) means nothing to record, not an error.
+    dicts with step/model/attempts/transport_retries/input_tokens/output_tokens/cost_usd/ms/
+    cached/failed/raw_payload, plus hedged/hedge_won (agent/hedging.py) and route
+    (agent/routing.py) when those wrappers are in use. Empty list is a normal, silent no-op: a
+    provider stub with no `.calls` attribute (most test doubles) means nothing to record, not
+    an error.
     """
     if not calls:
         return
@@ -105,15 +110,17 @@ def insert_llm_calls(
             cur.execute(
                 """
                 INSERT INTO llm_calls (
-                    raw_input_id, step, model, attempts, input_tokens, output_tokens,
-                    cost_usd, ms, cached, failed, raw_payload
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    raw_input_id, step, model, attempts, transport_retries, input_tokens,
+                    output_tokens, cost_usd, ms, cached, failed, raw_payload, hedged, hedge_won,
+                    route
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 """,
                 (
                     raw_input_id,
                     call["step"],
                     call["model"],
                     call["attempts"],
+                    call.get("transport_retries", 0),
                     call.get("input_tokens", 0),
                     call.get("output_tokens", 0),
                     call.get("cost_usd", 0),
@@ -121,11 +128,143 @@ def insert_llm_calls(
                     call.get("cached", False),
                     call.get("failed"),
                     json.dumps(call.get("raw_payload")) if call.get("raw_payload") is not None else None,
+                    call.get("hedged", False),
+                    call.get("hedge_won"),
+                    call.get("route"),
                 ),
             )
     conn.commit()
 
 
+_RETRY_COLUMNS = (
+    "id", "extraction_id", "position", "name", "worker_text", "worker_position",
+    "attempts", "last_error",
+)
+
+
+def insert_extraction_retries(
+    conn: Connection,
+    extraction_id: str,
+    failed_workers: list[dict],
+) -> None:
+    """Queue each placeholder exercise of one extraction for a background retry.
+
+    `failed_workers` is `agent.extraction.FailedWorker` as dicts: position, name, text,
+    worker_position, error. Empty list is a silent no-op, same as insert_llm_calls -- most
+    extractions have nothing to retry. Re-queuing a position already queued keeps the
+    existing row, so a repeated call cannot reset its backoff."""
+    if not failed_workers:
+        return
+    with conn.cursor() as cur:
+        for failed in failed_workers:
+            cur.execute(
+                """
+                INSERT INTO extraction_retries (
+                    extraction_id, position, name, worker_text, worker_position, last_error
+                ) VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (extraction_id, position) DO NOTHING
+                """,
+                (
+                    extraction_id,
+                    failed["position"],
+                    failed["name"],
+                    failed["text"],
+                    failed.get("worker_position"),
+                    failed.get("error"),
+                ),
+            )
+    conn.commit()
+
+
+def claim_due_extraction_retries(
+    conn: Connection,
+    limit: int = 10,
+    lease_seconds: float = 300.0,
+) -> list[dict]:
+    """Take up to `limit` queued retries that are due, and return them.
+
+    Claiming pushes each row's `next_attempt_at` out by `lease_seconds` in the same statement
+    that selects it, with SKIP LOCKED -- so two API instances polling the same queue never pick
+    the same row, and a worker that dies mid-retry only delays that row by the lease rather
+    than losing it. Retries for an extraction that is no longer pending are never claimed:
+    once a person has confirmed or rejected it, there is nothing left to patch."""
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE extraction_retries r
+            SET next_attempt_at = now() + make_interval(secs => %s), updated_at = now()
+            WHERE r.id IN (
+                SELECT q.id FROM extraction_retries q
+                JOIN extractions x ON x.id = q.extraction_id
+                WHERE q.status = 'queued'
+                  AND q.next_attempt_at <= now()
+                  AND x.status = 'pending'
+                ORDER BY q.next_attempt_at
+                LIMIT %s
+                FOR UPDATE OF q SKIP LOCKED
+            )
+            RETURNING {', '.join('r.' + c for c in _RETRY_COLUMNS)}
+            """,
+            (lease_seconds, limit),
+        )
+        rows = cur.fetchall()
+    conn.commit()
+    return [dict(zip(_RETRY_COLUMNS, r)) for r in rows]
+
+
+def record_extraction_retry(
+    conn: Connection,
+    retry_id: int,
+    status: str,
+    error: str | None = None,
+    retry_in_seconds: float | None = None,
+) -> None:
+    """Record one retry attempt's outcome. `retry_in_seconds` only matters while the row stays
+    'queued' -- it is the backoff before the next attempt."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE extraction_retries
+            SET status = %s,
+                attempts = attempts + 1,
+                last_error = %s,
+                next_attempt_at = now() + make_interval(secs => %s),
+                updated_at = now()
+            WHERE id = %s
+            """,
+            (status, error, retry_in_seconds or 0, retry_id),
+        )
+    conn.commit()
+
+
+def update_pending_extract(
+    conn: Connection,
+    extraction_id: str,
+    extract: dict,
+    uncertain_fields: list[str],
+    warnings: list[str],
+) -> bool:
+    """Replace a pending extraction's reading in place. Returns False, and changes nothing, if
+    the extraction is no longer pending.
+
+    The one sanctioned exception to "an extraction is written once": a placeholder recovered by
+    the retry queue is the same attempt at reading the same input, finished late -- not a
+    correction, which is the person's and goes in `corrections`. Confirmed and rejected rows
+    are never touched, so nothing a person has already acted on changes under them."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE extractions
+            SET extract = %s, uncertain_fields = %s, warnings = %s
+            WHERE id = %s AND status = 'pending'
+            """,
+            (json.dumps(extract), uncertain_fields, warnings, extraction_id),
+        )
+        updated = cur.rowcount == 1
+    conn.commit()
+    return updated
+
+
 def confirm_extraction(
     conn: Connection,
     extraction_id: str,
@@ -144,6 +283,153 @@ def confirm_extraction(
             """,
             (json.dumps(corrections or []), extraction_id),
         )
+    bump_data_version(conn)
+    conn.commit()
+
+
+_IDEMPOTENCY_COLUMNS = (
+    "key", "request_hash", "status_code", "response", "locked_until", "created_at", "expires_at",
+)
+
+
+def claim_idempotency_key(
+    conn: Connection,
+    key: str,
+    request_hash: str,
+    ttl_seconds: float,
+    lease_seconds: float,
+) -> dict | None:
+    """Claim `key` for a request about to run. Returns None if this call now holds it;
+    otherwise the row of the request that already does, response included once it finished.
+
+    A key is free to claim when no row has it, when its row has expired, or when its first
+    request never finished within `lease_seconds` (the process died) -- the last only for the
+    same request body, so an abandoned key is never silently rebound to different content.
+    Expired rows are purged here too, a few at a time, rather than by a separate job."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            DELETE FROM idempotency_keys WHERE key IN (
+                SELECT key FROM idempotency_keys WHERE expires_at <= now() LIMIT 100
+            )
+            """
+        )
+        cur.execute(
+            """
+            INSERT INTO idempotency_keys (key, request_hash, locked_until, expires_at)
+            VALUES (%s, %s, now() + make_interval(secs => %s), now() + make_interval(secs => %s))
+            ON CONFLICT (key) DO UPDATE
+            SET request_hash = EXCLUDED.request_hash,
+                status_code = NULL,
+                response = NULL,
+                locked_until = EXCLUDED.locked_until,
+                created_at = now(),
+                expires_at = EXCLUDED.expires_at
+            WHERE idempotency_keys.expires_at <= now()
+               OR (idempotency_keys.response IS NULL
+                   AND idempotency_keys.locked_until <= now()
+                   AND idempotency_keys.request_hash = EXCLUDED.request_hash)
+            RETURNING key
+            """,
+            (key, request_hash, lease_seconds, ttl_seconds),
+        )
+        claimed = cur.fetchone() is not None
+        held = None
+        if not claimed:
+            cur.execute(
+                f"SELECT {', '.join(_IDEMPOTENCY_COLUMNS)} FROM idempotency_keys WHERE key = %s",
+                (key,),
+            )
+            row = cur.fetchone()
+            held = dict(zip(_IDEMPOTENCY_COLUMNS, row)) if row else None
+    conn.commit()
+    if not claimed and held is None:
+        # Released between the two statements: the key is free again.
+        return claim_idempotency_key(conn, key, request_hash, ttl_seconds, lease_seconds)
+    return held
+
+
+def complete_idempotency_key(
+    conn: Connection, key: str, status_code: int, response: dict
+) -> None:
+    """Store the response of the request holding `key`, for every later one to replay."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE idempotency_keys SET status_code = %s, response = %s
+            WHERE key = %s AND response IS NULL
+            """,
+            (status_code, json.dumps(response), key),
+        )
+    conn.commit()
+
+
+def release_idempotency_key(conn: Connection, key: str) -> None:
+    """Give up a claimed key without a response -- the request failed before it had one to
+    give. A retry then runs afresh instead of waiting out the lease."""
+    with conn.cursor() as cur:
+        cur.execute(
+            "DELETE FROM idempotency_keys WHERE key = %s AND response IS NULL", (key,)
+        )
+    conn.commit()
+
+
+def save_correction_draft(
+    conn: Connection,
+    extraction_id: str,
+    expected_version: int,
+    extract: dict,
+    corrections: list[dict],
+    ttl_seconds: float,
+) -> int | None:
+    """Store `extract` as the next version of an extraction's correction draft, and return
+    that version -- or None, and store nothing, if the draft is no longer at
+    `expected_version` (another correction got there first, or it expired).
+
+    `expected_version` 0 starts a draft afresh from the stored reading, replacing whatever
+    draft there was. Expired drafts are purged here, a few at a time."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            DELETE FROM correction_drafts WHERE extraction_id IN (
+                SELECT extraction_id FROM correction_drafts WHERE expires_at <= now() LIMIT 100
+            )
+            """
+        )
+        if expected_version == 0:
+            cur.execute(
+                """
+                INSERT INTO correction_drafts
+                    (extraction_id, version, extract, corrections, expires_at)
+                VALUES (%s, 1, %s, %s, now() + make_interval(secs => %s))
+                ON CONFLICT (extraction_id) DO UPDATE
+                SET version = 1, extract = EXCLUDED.extract,
+                    corrections = EXCLUDED.corrections, updated_at = now(),
+                    expires_at = EXCLUDED.expires_at
+                RETURNING version
+                """,
+                (extraction_id, json.dumps(extract), json.dumps(corrections), ttl_seconds),
+            )
+        else:
+            cur.execute(
+                """
+                UPDATE correction_drafts
+                SET version = version + 1, extract = %s, corrections = %s, updated_at = now(),
+                    expires_at = now() + make_interval(secs => %s)
+                WHERE extraction_id = %s AND version = %s AND expires_at > now()
+                RETURNING version
+                """,
+                (json.dumps(extract), json.dumps(corrections), ttl_seconds, extraction_id,
+                 expected_version),
+            )
+        row = cur.fetchone()
+    conn.commit()
+    return row[0] if row else None
+
+
+def delete_correction_draft(conn: Connection, extraction_id: str) -> None:
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM correction_drafts WHERE extraction_id = %s", (extraction_id,))
     conn.commit()
 
 
@@ -337,5 +623,355 @@ def insert_session(
                     ),
                 )
 
+        _record_personal_records(cur, session.session_id)
+        cur.execute(_UPDATE_EXERCISE_STATE_SQL, (session.session_id,))
+        _update_daily_load(cur, date.fromisoformat(session.date))
+
+    bump_data_version(conn)
     conn.commit()
     return True
+
+
+# Each of the session's candidate records (see current_prs in schema.sql) is upserted where it
+# beats the standing one, and every upsert that is a strict improvement -- not just a later tie
+# -- goes in the ledger with the value it beat. `previous` is read in the same statement, so it
+# is the table as it stood before the upsert.
+_RECORD_PRS_SQL = """
+    WITH sets AS (
+        SELECT e.name AS exercise, ws.id AS working_set_id, ws.weight_kg, ws.reps_full,
+               s.session_id, s.date
+        FROM working_sets ws
+        JOIN exercises e ON e.id = ws.exercise_id
+        JOIN sessions  s ON s.session_id = e.session_id
+        WHERE s.session_id = %s
+          AND ws.weight_kg IS NOT NULL
+    ),
+    candidates AS (
+        SELECT DISTINCT ON (exercise, record, reps) *
+        FROM (
+            SELECT exercise, 'weight' AS record, 0 AS reps, weight_kg AS value_kg, weight_kg,
+                   reps_full, date, session_id, working_set_id
+            FROM sets
+            UNION ALL
+            SELECT exercise, 'reps', reps_full, weight_kg, weight_kg,
+                   reps_full, date, session_id, working_set_id
+            FROM sets
+            WHERE weight_kg > 0 AND reps_full > 0
+            UNION ALL
+            SELECT exercise, 'e1rm', 0,
+                   ROUND((weight_kg * (1 + reps_full::numeric / 30))::numeric, 2), weight_kg,
+                   reps_full, date, session_id, working_set_id
+            FROM sets
+            WHERE weight_kg > 0 AND reps_full > 0
+        ) c
+        ORDER BY exercise, record, reps, value_kg DESC, working_set_id
+    ),
+    previous AS (
+        SELECT p.exercise, p.record, p.reps, p.value_kg
+        FROM current_prs p
+        JOIN candidates c USING (exercise, record, reps)
+    ),
+    updated AS (
+        INSERT INTO current_prs (
+            exercise, record, reps, value_kg, weight_kg, reps_full, date, session_id,
+            working_set_id
+        )
+        SELECT exercise, record, reps, value_kg, weight_kg, reps_full, date, session_id,
+               working_set_id
+        FROM candidates
+        ON CONFLICT (exercise, record, reps) DO UPDATE
+            SET value_kg       = EXCLUDED.value_kg,
+                weight_kg      = EXCLUDED.weight_kg,
+                reps_full      = EXCLUDED.reps_full,
+                date           = EXCLUDED.date,
+                session_id     = EXCLUDED.session_id,
+                working_set_id = EXCLUDED.working_set_id
+            WHERE EXCLUDED.value_kg > current_prs.value_kg
+               OR (EXCLUDED.value_kg = current_prs.value_kg
+                   AND EXCLUDED.date > current_prs.date)
+        RETURNING *
+    )
+    INSERT INTO pr_events (
+        exercise, record, reps, value_kg, weight_kg, reps_full, previous_kg, date, session_id,
+        working_set_id
+    )
+    SELECT u.exercise, u.record, u.reps, u.value_kg, u.weight_kg, u.reps_full, p.value_kg,
+           u.date, u.session_id, u.working_set_id
+    FROM updated u
+    LEFT JOIN previous p USING (exercise, record, reps)
+    WHERE p.value_kg IS NULL OR u.value_kg > p.value_kg
+"""
+
+
+def _record_personal_records(cur, session_id: str) -> None:
+    """Update current_prs and pr_events from one just-inserted session's sets."""
+    cur.execute(_RECORD_PRS_SQL, (session_id,))
+
+
+# One row per exercise (by LOWER(name)) per session, as exercise_state stores it. `{where}`
+# picks the sessions: one, on insert, or all of them, on a rebuild.
+_EXERCISE_SESSIONS_SQL = """
+    SELECT
+        LOWER(e.name)                                            AS exercise_key,
+        (ARRAY_AGG(e.name ORDER BY e.number))[1]                 AS exercise,
+        s.date                                                   AS last_date,
+        s.session_id                                             AS last_session_id,
+        COALESCE(
+            JSONB_AGG(
+                JSONB_BUILD_OBJECT(
+                    'number', ws.number, 'weight_kg', ws.weight_kg,
+                    'reps_full', ws.reps_full, 'reps_partial', ws.reps_partial, 'rpe', ws.rpe
+                ) ORDER BY e.number, ws.number
+            ) FILTER (WHERE ws.id IS NOT NULL),
+            '[]'
+        )                                                        AS last_sets,
+        (ARRAY_AGG(
+            JSONB_BUILD_OBJECT(
+                'weight_kg', e.goal_weight_kg, 'sets', e.goal_sets,
+                'rep_min', e.goal_rep_min, 'rep_max', e.goal_rep_max
+            ) ORDER BY e.number
+        ) FILTER (
+            WHERE COALESCE(e.goal_weight_kg, e.goal_sets, e.goal_rep_min, e.goal_rep_max)
+                IS NOT NULL
+        ))[1]                                                    AS last_goal,
+        MAX(ROUND((ws.weight_kg * (1 + ws.reps_full::numeric / 30))::numeric, 2))
+            FILTER (WHERE ws.weight_kg > 0 AND ws.reps_full > 0) AS best_e1rm_kg
+    FROM exercises e
+    JOIN sessions s           ON s.session_id = e.session_id
+    LEFT JOIN working_sets ws ON ws.exercise_id = e.id
+    {where}
+    GROUP BY LOWER(e.name), s.date, s.session_id
+"""
+
+# The `last_*` columns move only for a session later than the one they describe, so an older
+# session inserted late changes nothing but the count and, if it beat it, the best e1RM.
+_LATER = (
+    "(EXCLUDED.last_date, EXCLUDED.last_session_id)"
+    " > (exercise_state.last_date, exercise_state.last_session_id)"
+)
+_BETTER = (
+    "(EXCLUDED.best_e1rm_kg > exercise_state.best_e1rm_kg"
+    " OR (exercise_state.best_e1rm_kg IS NULL AND EXCLUDED.best_e1rm_kg IS NOT NULL)"
+    " OR (EXCLUDED.best_e1rm_kg = exercise_state.best_e1rm_kg"
+    " AND EXCLUDED.best_e1rm_date > exercise_state.best_e1rm_date))"
+)
+_UPDATE_EXERCISE_STATE_SQL = f"""
+    WITH done AS ({_EXERCISE_SESSIONS_SQL.format(where="WHERE s.session_id = %s")})
+    INSERT INTO exercise_state (
+        exercise_key, exercise, last_date, last_session_id, last_sets, last_goal,
+        best_e1rm_kg, best_e1rm_date, session_count
+    )
+    SELECT exercise_key, exercise, last_date, last_session_id, last_sets, last_goal,
+           best_e1rm_kg, CASE WHEN best_e1rm_kg IS NOT NULL THEN last_date END, 1
+    FROM done
+    ON CONFLICT (exercise_key) DO UPDATE SET
+        exercise        = CASE WHEN {_LATER} THEN EXCLUDED.exercise
+                               ELSE exercise_state.exercise END,
+        last_date       = CASE WHEN {_LATER} THEN EXCLUDED.last_date
+                               ELSE exercise_state.last_date END,
+        last_session_id = CASE WHEN {_LATER} THEN EXCLUDED.last_session_id
+                               ELSE exercise_state.last_session_id END,
+        last_sets       = CASE WHEN {_LATER} THEN EXCLUDED.last_sets
+                               ELSE exercise_state.last_sets END,
+        last_goal       = CASE WHEN {_LATER} THEN EXCLUDED.last_goal
+                               ELSE exercise_state.last_goal END,
+        best_e1rm_kg    = CASE WHEN {_BETTER} THEN EXCLUDED.best_e1rm_kg
+                               ELSE exercise_state.best_e1rm_kg END,
+        best_e1rm_date  = CASE WHEN {_BETTER} THEN EXCLUDED.best_e1rm_date
+                               ELSE exercise_state.best_e1rm_date END,
+        session_count   = exercise_state.session_count + 1,
+        updated_at      = now()
+"""
+
+_REBUILD_EXERCISE_STATE_SQL = f"""
+    WITH per_session AS ({_EXERCISE_SESSIONS_SQL.format(where="")}),
+    latest AS (
+        SELECT DISTINCT ON (exercise_key) *
+        FROM per_session
+        ORDER BY exercise_key, last_date DESC, last_session_id DESC
+    ),
+    best AS (
+        SELECT DISTINCT ON (exercise_key)
+            exercise_key, best_e1rm_kg, last_date AS best_e1rm_date
+        FROM per_session
+        WHERE best_e1rm_kg IS NOT NULL
+        ORDER BY exercise_key, best_e1rm_kg DESC, last_date DESC
+    ),
+    totals AS (
+        SELECT exercise_key, COUNT(*) AS session_count FROM per_session GROUP BY exercise_key
+    )
+    INSERT INTO exercise_state (
+        exercise_key, exercise, last_date, last_session_id, last_sets, last_goal,
+        best_e1rm_kg, best_e1rm_date, session_count
+    )
+    SELECT l.exercise_key, l.exercise, l.last_date, l.last_session_id, l.last_sets,
+           l.last_goal, b.best_e1rm_kg, b.best_e1rm_date, t.session_count
+    FROM latest l
+    JOIN totals t     USING (exercise_key)
+    LEFT JOIN best b  USING (exercise_key)
+"""
+
+
+def rebuild_exercise_state(conn: Connection) -> None:
+    """Recompute exercise_state from every session: after deleting sessions, or to fill it on
+    a database that predates it."""
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE exercise_state")
+        cur.execute(_REBUILD_EXERCISE_STATE_SQL)
+    bump_data_version(conn)
+    conn.commit()
+
+
+# Each day's totals, as daily_load stores them. `{where}` picks the days.
+_DAILY_TOTALS_SQL = """
+    SELECT
+        s.date,
+        COALESCE(SUM(ws.weight_kg * ws.reps_full), 0) AS tonnage_kg,
+        COUNT(ws.id)                                  AS working_sets,
+        COUNT(DISTINCT s.session_id)                  AS sessions
+    FROM sessions s
+    LEFT JOIN exercises e     ON e.session_id = s.session_id
+    LEFT JOIN working_sets ws ON ws.exercise_id = e.id
+    {where}
+    GROUP BY s.date
+"""
+
+# The days from the nearest one already stored up to %(day)s, on whichever side it is missing,
+# so the series stays whole. A day inside it adds nothing.
+_FILL_DAILY_LOAD_SQL = """
+    INSERT INTO daily_load (date)
+    SELECT generate_series(
+        COALESCE((SELECT MAX(date) + 1 FROM daily_load WHERE date < %(day)s), %(day)s),
+        %(day)s, INTERVAL '1 day')::date
+    UNION
+    SELECT generate_series(
+        %(day)s,
+        COALESCE((SELECT MIN(date) - 1 FROM daily_load WHERE date > %(day)s), %(day)s),
+        INTERVAL '1 day')::date
+    ON CONFLICT (date) DO NOTHING
+"""
+
+_UPDATE_DAILY_TOTALS_SQL = f"""
+    UPDATE daily_load d
+    SET tonnage_kg   = t.tonnage_kg,
+        working_sets = t.working_sets,
+        sessions     = t.sessions,
+        updated_at   = now()
+    FROM ({_DAILY_TOTALS_SQL.format(where="WHERE s.date = %(day)s")}) t
+    WHERE d.date = t.date
+"""
+
+# The rolling columns of every row whose windows include %(day)s or a row added since the last
+# run -- one whose columns were never computed: each such row, and the 27 days after it. The
+# windows reach 27 days back, so the rows read start that far before. RANGE windows count
+# days, not rows.
+_ROLL_DAILY_LOAD_SQL = """
+    WITH bounds AS (
+        SELECT
+            LEAST(%(day)s::date, MIN(date) FILTER (WHERE acute_tonnage_kg IS NULL))       AS lo,
+            GREATEST(%(day)s::date, MAX(date) FILTER (WHERE acute_tonnage_kg IS NULL)) + 27 AS hi
+        FROM daily_load
+    ),
+    rolling AS (
+        SELECT
+            date,
+            SUM(tonnage_kg)   OVER acute                    AS acute_tonnage_kg,
+            SUM(tonnage_kg)   OVER chronic / 4              AS chronic_tonnage_kg,
+            SUM(working_sets) OVER acute                    AS acute_sets,
+            SUM(working_sets) OVER chronic / 4.0            AS chronic_sets,
+            AVG(tonnage_kg)   OVER acute
+                / NULLIF(STDDEV_POP(tonnage_kg) OVER acute, 0) AS monotony,
+            COUNT(*)          OVER acute                    AS acute_days,
+            COUNT(*)          OVER chronic                  AS chronic_days
+        FROM daily_load, bounds
+        WHERE date BETWEEN bounds.lo - 27 AND bounds.hi
+        WINDOW acute   AS (ORDER BY date RANGE BETWEEN INTERVAL '6 days' PRECEDING AND CURRENT ROW),
+               chronic AS (ORDER BY date RANGE BETWEEN INTERVAL '27 days' PRECEDING AND CURRENT ROW)
+    )
+    UPDATE daily_load d
+    SET acute_tonnage_kg   = ROUND(r.acute_tonnage_kg, 1),
+        chronic_tonnage_kg = ROUND(r.chronic_tonnage_kg, 1),
+        acute_sets         = r.acute_sets,
+        chronic_sets       = ROUND(r.chronic_sets, 2),
+        acwr               = CASE WHEN r.chronic_days = 28
+                                  THEN ROUND(r.acute_tonnage_kg
+                                             / NULLIF(r.chronic_tonnage_kg, 0), 2) END,
+        monotony           = CASE WHEN r.acute_days = 7 THEN ROUND(r.monotony, 2) END,
+        strain             = CASE WHEN r.acute_days = 7
+                                  THEN ROUND(r.acute_tonnage_kg * r.monotony, 1) END,
+        updated_at         = now()
+    FROM rolling r, bounds
+    WHERE d.date = r.date
+      AND r.date >= bounds.lo
+"""
+
+
+def _update_daily_load(cur, day: date) -> None:
+    """Bring daily_load up to date with the sessions on `day`: its totals, recounted from every
+    session that day, and the rolling columns of each row whose windows include it.
+
+    Two inserts within 27 days of each other read and write overlapping rows. Under READ
+    COMMITTED each would compute its windows from totals that miss the other's uncommitted day,
+    and whichever commits last leaves its rolling columns behind. A transaction-level advisory
+    lock makes them take turns; it is released when insert_session() commits."""
+    cur.execute(
+        "SELECT pg_advisory_xact_lock(%s, hashtext('daily_load'))", (DAILY_LOAD_LOCK_NAMESPACE,)
+    )
+    params = {"day": day}
+    cur.execute(_FILL_DAILY_LOAD_SQL, params)
+    cur.execute(_UPDATE_DAILY_TOTALS_SQL, params)
+    cur.execute(_ROLL_DAILY_LOAD_SQL, params)
+
+
+def rebuild_daily_load(conn: Connection) -> None:
+    """Recompute daily_load from every session: after deleting sessions, or to fill it on a
+    database that predates it."""
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE daily_load")
+        cur.execute(
+            f"""
+            INSERT INTO daily_load (date, tonnage_kg, working_sets, sessions)
+            SELECT days.date, COALESCE(t.tonnage_kg, 0), COALESCE(t.working_sets, 0),
+                   COALESCE(t.sessions, 0)
+            FROM (
+                SELECT generate_series(MIN(date), MAX(date), INTERVAL '1 day')::date AS date
+                FROM sessions
+            ) days
+            LEFT JOIN ({_DAILY_TOTALS_SQL.format(where="")}) t USING (date)
+            """
+        )
+        cur.execute("SELECT MIN(date) FROM daily_load")
+        (first,) = cur.fetchone()
+        if first is not None:
+            # Every row is new, so this is all of them.
+            cur.execute(_ROLL_DAILY_LOAD_SQL, {"day": first})
+    bump_data_version(conn)
+    conn.commit()
+
+
+def rebuild_personal_records(conn: Connection) -> None:
+    """Recompute current_prs and pr_events from scratch, replaying every session in date order,
+    so each event is a record as it stood on its day. For after deleting sessions, or after an
+    import that did not go oldest first (see schema.sql), and to fill the tables on a database
+    that predates them."""
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE current_prs, pr_events")
+        cur.execute("SELECT session_id FROM sessions ORDER BY date ASC, session_id ASC")
+        for (session_id,) in cur.fetchall():
+            _record_personal_records(cur, session_id)
+    bump_data_version(conn)
+    conn.commit()
+
+
+def bump_data_version(conn: Connection) -> None:
+    """Mark the session data changed, in the caller's transaction, so the API's ETags change
+    with it (see data_version in schema.sql) and every process's read cache is dropped (see
+    db/cache.py) when it commits. Every write to the session tables calls this --
+    insert_session() does -- or clients polling with If-None-Match, and cached reads, keep a
+    stale copy."""
+    with conn.cursor() as cur:
+        cur.execute("UPDATE data_version SET version = version + 1")
+        # Delivered on commit, to this process's listener too; dropping the local cache now as
+        # well just means this process's next read doesn't wait for the round trip.
+        cur.execute(f"NOTIFY {CHANNEL}")
+    invalidate_read_cache()
@@ -0,0 +1,354 @@
+"""
+A local, single-file copy of the session data, for dashboard builds and analysis offline.
+
+Every dashboard build and every ad hoc query is a round trip to the primary -- across the
+internet, for a hosted one -- and impossible without a connection. The mirror is a DuckDB
+file with the same tables, columns and column names as the primary's session data:
+
+  sessions, warmups, cooldowns, exercises, working_sets, warmup_sets   (SESSION_TABLES)
+  current_prs, pr_events, exercise_state, daily_load, data_version     (DERIVED_TABLES)
+
+DuckDB because it speaks nearly the same SQL as Postgres -- `::` casts, DISTINCT ON,
+FILTER, string_agg(... ORDER BY), `= ANY(list)` -- so analytics.queries, the dashboard
+builders' helpers and WorkingSets.load() run against it as they are, through
+MirrorConnection, which takes psycopg2's `%s` parameters. No server, no port: the file is
+the database. DuckDB is optional, the `mirror` extra.
+
+sync_mirror() brings it up to date, and copies only what changed since the last sync:
+
+  - Nothing at all if data_version has not moved: every write to the session data bumps it
+    (db.insert.bump_data_version()). A sync with nothing new is one tiny query.
+  - Sessions created after the mirror's watermark -- the newest sessions.created_at it has
+    -- with their exercises, sets, warmups and cooldowns. Sessions are never updated, only
+    inserted and deleted, so new rows are all there is to copy.
+  - A session committed after a later-stamped one was already synced has a created_at
+    behind the watermark. A deleted session leaves no row to find. Both change a hash of the
+    session ids at or before the watermark, which the mirror compares with its own, and then,
+    and only then, it compares the ids themselves and copies or deletes the difference.
+  - The derived tables whole. They are bounded by exercises and days, not sets, and are
+    rewritten in place on the primary, so there is no watermark to follow.
+
+Columns are read from the primary's catalog on every sync, so a column added to schema.sql
+reaches the mirror the next time it syncs. NUMERIC columns are DOUBLE in the mirror: results
+have floats where the primary gives Decimals, which everything downstream already takes.
+JSONB columns come back as JSON text, not parsed; no analytics query or dashboard reads one.
+"""
+from __future__ import annotations
+
+import re
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+from psycopg2.extensions import connection as Connection
+
+try:
+    import duckdb
+except ImportError:  # Optional: the `mirror` extra.
+    duckdb = None
+
+# The session and everything that hangs off it, parents first. Each is (table, how to find the
+# rows of the sessions in %(ids)s).
+SESSION_TABLES = (
+    ("sessions", "session_id = ANY(%(ids)s)"),
+    ("warmups", "session_id = ANY(%(ids)s)"),
+    ("cooldowns", "session_id = ANY(%(ids)s)"),
+    ("exercises", "session_id = ANY(%(ids)s)"),
+    ("working_sets", "exercise_id IN (SELECT id FROM exercises WHERE session_id = ANY(%(ids)s))"),
+    ("warmup_sets", "exercise_id IN (SELECT id FROM exercises WHERE session_id = ANY(%(ids)s))"),
+)
+
+# Kept current by the primary on every insert (see schema.sql), and copied whole.
+DERIVED_TABLES = ("current_prs", "pr_events", "exercise_state", "daily_load", "data_version")
+
+# The session ids up to the watermark, in byte order -- COLLATE "C" on the primary, where the
+# default follows the locale; DuckDB's default already is -- as one hash. Counts alone miss a
+# deleted session and a late one that cancel out.
+_FINGERPRINT_SQL = """
+    SELECT md5(COALESCE(string_agg(session_id, ',' ORDER BY session_id %s), ''))
+    FROM sessions WHERE created_at <= %%(watermark)s
+"""
+
+# Postgres types the mirror stores as something else. Anything not here keeps its name.
+_TYPES = {
+    "numeric": "DOUBLE",
+    "text": "VARCHAR",
+    "jsonb": "JSON",
+    "timestamp with time zone": "TIMESTAMPTZ",
+}
+_ARRAY_TYPES = {"_text": "VARCHAR[]", "_int4": "INTEGER[]"}
+
+
+class MirrorUnavailable(RuntimeError):
+    """DuckDB is not installed."""
+
+
+@dataclass
+class SyncResult:
+    sessions_added: int = 0
+    sessions_removed: int = 0
+    # False when data_version had not moved and nothing was read.
+    changed: bool = False
+
+
+class MirrorCursor:
+    """A cursor on the mirror that takes the same SQL and parameters as a psycopg2 one: `%s`
+    and `%(name)s` placeholders, `%%` for a literal %, and use as a context manager.
+
+    Every cursor of a MirrorConnection runs on its one DuckDB connection, and so in its
+    transaction; executing on one replaces the result of any other, so read each result
+    before the next query -- as every read path here does."""
+
+    def __init__(self, db) -> None:
+        self._cursor = db
+        # Set by callers that page through a psycopg2 named cursor; DuckDB streams anyway.
+        self.itersize = 2000
+
+    def __enter__(self) -> MirrorCursor:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def execute(self, sql: str, params: Any = None) -> MirrorCursor:
+        if isinstance(params, dict):
+            sql = re.sub(r"%\((\w+)\)s", r"$\1", sql)
+        else:
+            sql = sql.replace("%s", "?")
+        sql = sql.replace("%%", "%")
+        self._cursor.execute(sql, params if params else None)
+        return self
+
+    def executemany(self, sql: str, seq: list) -> None:
+        self._cursor.executemany(sql.replace("%s", "?"), seq)
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self) -> list[tuple]:
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size: int | None = None) -> list[tuple]:
+        return self._cursor.fetchmany(size or self.itersize)
+
+    def __iter__(self) -> Iterator[tuple]:
+        while rows := self.fetchmany():
+            yield from rows
+
+    def close(self) -> None:
+        # The connection's, not the cursor's, to close.
+        pass
+
+
+class MirrorConnection:
+    """The mirror, with the part of psycopg2's connection interface the read paths use:
+    cursor(), commit(), rollback() and close(). Pass it wherever a query takes `conn`."""
+
+    def __init__(self, path: str | Path, read_only: bool = False) -> None:
+        if duckdb is None:
+            raise MirrorUnavailable(
+                "the local mirror needs DuckDB: pip install 'traininglogs[mirror]'"
+            )
+        self.path = Path(path)
+        if read_only and not self.path.exists():
+            raise FileNotFoundError(f"no mirror at {self.path}: `traininglogs mirror` makes one")
+        if not read_only:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = duckdb.connect(str(self.path), read_only=read_only)
+
+    @property
+    def closed(self) -> bool:
+        return self._db is None
+
+    def cursor(self, name: str | None = None) -> MirrorCursor:
+        # `name` asks psycopg2 for a server-side cursor; DuckDB streams results anyway.
+        return MirrorCursor(self._db)
+
+    def begin(self) -> None:
+        """Start a transaction. Without one, each statement commits by itself."""
+        self._db.begin()
+
+    def commit(self) -> None:
+        self._db.commit()
+
+    def rollback(self) -> None:
+        # Without begin() there is nothing to roll back; psycopg2 takes that quietly too.
+        try:
+            self._db.rollback()
+        except duckdb.TransactionException:
+            pass
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __enter__(self) -> MirrorConnection:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def _columns(pg: Connection, table: str) -> list[tuple[str, str]]:
+    """`table`'s columns on the primary, in order, each with the type the mirror gives it."""
+    with pg.cursor() as cur:
+        cur.execute(
+            """
+            SELECT column_name, data_type, udt_name
+            FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = %s
+            ORDER BY ordinal_position
+            """,
+            (table,),
+        )
+        rows = cur.fetchall()
+    if not rows:
+        raise LookupError(f"no table {table!r} on the primary: apply schema.sql first")
+    return [
+        (name, _ARRAY_TYPES.get(udt, "VARCHAR[]") if kind == "ARRAY"
+         else _TYPES.get(kind, kind.upper()))
+        for name, kind, udt in rows
+    ]
+
+
+def _ensure_table(mirror: MirrorConnection, table: str, columns: list[tuple[str, str]]) -> None:
+    """Create `table` in the mirror, or add the columns it is missing."""
+    with mirror.cursor() as cur:
+        cur.execute(
+            f'CREATE TABLE IF NOT EXISTS {table} '
+            f'({", ".join(f"{name} {kind}" for name, kind in columns)})'
+        )
+        cur.execute(
+            "SELECT column_name FROM information_schema.columns WHERE table_name = %s",
+            [table],
+        )
+        present = {row[0] for row in cur.fetchall()}
+        for name, kind in columns:
+            if name not in present:
+                cur.execute(f"ALTER TABLE {table} ADD COLUMN {name} {kind}")
+
+
+def _copy(
+    pg: Connection, mirror: MirrorConnection, table: str, columns: list[tuple[str, str]],
+    where: str = "", params: dict | None = None,
+) -> int:
+    """Copy `table`'s rows matching `where` from the primary into the mirror, and return how
+    many. Through a CSV file: COPY out of Postgres and read_csv() into DuckDB both move rows in
+    bulk, where an INSERT a row costs a millisecond each -- minutes, for a first sync of years
+    of sets. Arrays go through as JSON, the one text form both ends agree on."""
+    select = ", ".join(
+        f"array_to_json({name})" if kind.endswith("[]") else name for name, kind in columns
+    )
+    casts = ", ".join(
+        f"CAST(CAST(c{i} AS JSON) AS {kind})" if kind.endswith("[]") else f"CAST(c{i} AS {kind})"
+        for i, (_, kind) in enumerate(columns)
+    )
+    fields = ", ".join(f"'c{i}': 'VARCHAR'" for i in range(len(columns)))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / f"{table}.csv"
+        with pg.cursor() as cur, path.open("wb") as out:
+            query = cur.mogrify(
+                f"SELECT {select} FROM {table} {f'WHERE {where}' if where else ''}", params
+            ).decode()
+            cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv)", out)
+        with mirror.cursor() as cur:
+            # Quoted empty strings are empty strings; only unquoted empty fields are NULL, as
+            # COPY wrote them.
+            cur.execute(
+                f"INSERT INTO {table} ({', '.join(name for name, _ in columns)}) "
+                f"SELECT {casts} FROM read_csv(%s, auto_detect = false, header = false, "
+                f"delim = ',', quote = '\"', escape = '\"', allow_quoted_nulls = false, "
+                f"columns = {{{fields}}})",
+                [str(path)],
+            )
+            (copied,) = cur.fetchone()
+    return copied
+
+
+def _delete_sessions(mirror: MirrorConnection, ids: list[str]) -> None:
+    with mirror.cursor() as cur:
+        for table, where in reversed(SESSION_TABLES):
+            cur.execute(f"DELETE FROM {table} WHERE {where}", {"ids": ids})
+
+
+def _scalar(conn, sql: str, params: Any = None) -> Any:
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        row = cur.fetchone()
+    return row[0] if row else None
+
+
+def sync_mirror(pg: Connection, mirror: MirrorConnection) -> SyncResult:
+    """Bring `mirror` up to date with the primary `pg`, copying only what changed since the
+    last sync (see the module docstring). Reads `pg` in one repeatable-read snapshot, so the
+    mirror is always a state the primary was in. Safe to run as often as you like."""
+    result = SyncResult()
+    pg.rollback()
+    pg.set_session(isolation_level="REPEATABLE READ", readonly=True)
+    try:
+        columns = {table: _columns(pg, table) for table, _ in SESSION_TABLES}
+        columns.update({table: _columns(pg, table) for table in DERIVED_TABLES})
+        for table, cols in columns.items():
+            _ensure_table(mirror, table, cols)
+
+        version = _scalar(pg, "SELECT version FROM data_version")
+        if version == _scalar(mirror, "SELECT version FROM data_version"):
+            return result
+        result.changed = True
+
+        mirror.begin()
+        try:
+            watermark = _scalar(mirror, "SELECT MAX(created_at) FROM sessions")
+            new = [row[0] for row in _rows(
+                pg, "SELECT session_id FROM sessions WHERE %s::timestamptz IS NULL "
+                    "OR created_at > %s::timestamptz",
+                (watermark, watermark),
+            )]
+            if watermark is not None and _scalar(pg, _FINGERPRINT_SQL % 'COLLATE "C"', {
+                "watermark": watermark
+            }) != _scalar(mirror, _FINGERPRINT_SQL % "", {"watermark": watermark}):
+                primary = {row[0] for row in _rows(pg, "SELECT session_id FROM sessions")}
+                local = {row[0] for row in _rows(mirror, "SELECT session_id FROM sessions")}
+                gone = sorted(local - primary)
+                if gone:
+                    _delete_sessions(mirror, gone)
+                    result.sessions_removed = len(gone)
+                new = sorted((primary - local) | set(new))
+
+            if new:
+                # A session deleted and logged again keeps its id: out with the old copy.
+                _delete_sessions(mirror, new)
+                for table, where in SESSION_TABLES:
+                    _copy(pg, mirror, table, columns[table], where, {"ids": new})
+                result.sessions_added = len(new)
+
+            for table in DERIVED_TABLES:
+                with mirror.cursor() as cur:
+                    cur.execute(f"DELETE FROM {table}")
+                _copy(pg, mirror, table, columns[table])
+        except BaseException:
+            mirror.rollback()
+            raise
+        mirror.commit()
+        return result
+    finally:
+        pg.rollback()
+        pg.set_session(isolation_level="DEFAULT", readonly="DEFAULT")
+
+
+def _rows(conn, sql: str, params: Any = None) -> list[tuple]:
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+
+def mirror_age(mirror: MirrorConnection) -> datetime | None:
+    """The newest session the mirror has, by when it was written to the primary."""
+    return _scalar(mirror, "SELECT MAX(created_at) FROM sessions")
@@ -180,13 +180,228 @@ CREATE TABLE IF NOT EXISTS llm_calls (
     raw_payload  JSONB,
     created_at   TIMESTAMPTZ NOT NULL DEFAULT now()
 );
+-- Connection drops, timeouts, 5xx and overloads retried inside the call (agent/providers.py,
+-- _MAX_TRANSPORT_RETRIES). Separate from `attempts`, which counts answers: a call that took
+-- three network tries to get one good answer is attempts=1, transport_retries=2.
+ALTER TABLE llm_calls ADD COLUMN IF NOT EXISTS transport_retries INT NOT NULL DEFAULT 0;
+-- Hedged requests (agent/hedging.py). `hedged`: a second provider was also asked for this step.
+-- `hedge_won`: this call's answer was the one used -- NULL when nothing was hedged. Hedge rate
+-- is the share of steps with hedged rows; secondary wins are hedge_won rows off the primary's
+-- model.
+ALTER TABLE llm_calls ADD COLUMN IF NOT EXISTS hedged BOOLEAN NOT NULL DEFAULT false;
+ALTER TABLE llm_calls ADD COLUMN IF NOT EXISTS hedge_won BOOLEAN;
+-- Per-chunk model routing (agent/routing.py): 'fast', 'strong', or 'escalated' (the strong
+-- model, re-asked after the fast one's answer was rejected). NULL when no routing was used.
+ALTER TABLE llm_calls ADD COLUMN IF NOT EXISTS route TEXT;
+
+-- ---------------------------------------------------------------------------
+-- One row per placeholder exercise waiting on a retry. When a worker raises, assemble() stores
+-- a placeholder and the extraction is still saved -- this is the queue that recovers that one
+-- exercise later, instead of the person rejecting and re-extracting the whole session for the
+-- sake of one flaky call (ingest/retry.py).
+--
+-- `worker_text` is exactly what the failed worker was shown, so a retry costs one worker call
+-- and does not re-run the splitter. `next_attempt_at` moves out exponentially with `attempts`;
+-- a row leaves 'queued' either recovered ('succeeded') or out of attempts ('abandoned').
+-- ---------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS extraction_retries (
+    id              SERIAL PRIMARY KEY,
+    extraction_id   TEXT NOT NULL REFERENCES extractions(id) ON DELETE CASCADE,
+    position        INT NOT NULL,
+    name            TEXT NOT NULL,
+    worker_text     TEXT NOT NULL,
+    -- Null when `worker_text` is an isolated chunk; the split position when it is the whole
+    -- document (see agent/extraction.py's extract_exercise()).
+    worker_position INT,
+    status          TEXT NOT NULL DEFAULT 'queued',
+    attempts        INT NOT NULL DEFAULT 0,
+    last_error      TEXT,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    created_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
+    CONSTRAINT extraction_retries_status_check
+        CHECK (status IN ('queued', 'succeeded', 'abandoned')),
+    UNIQUE (extraction_id, position)
+);
+
+-- ---------------------------------------------------------------------------
+-- One row per Idempotency-Key a client has sent with POST /inputs. Clients on bad connections
+-- retry uploads whose response they never saw; without this, every retry is another capture
+-- and another extraction of the same text. The first request with a key claims the row and
+-- runs; later ones replay its stored response, or wait while it is still running.
+--
+-- `request_hash` is the sha256 of the request body: a key reused for a different body is an
+-- error, not a replay. `response` and `status_code` are NULL while the first request is in
+-- flight; `locked_until` bounds how long that may last before a retry may take the key over
+-- (a process that died mid-request never stores a response). Past `expires_at` the key is
+-- free to be used again, and the row is purged.
+-- ---------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key          TEXT PRIMARY KEY,
+    request_hash TEXT NOT NULL,
+    status_code  INT,
+    response     JSONB,
+    locked_until TIMESTAMPTZ NOT NULL,
+    created_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+    expires_at   TIMESTAMPTZ NOT NULL
+);
+
+-- ---------------------------------------------------------------------------
+-- The working extract of a correction session held on the server (POST
+-- /extractions/{id}/correct with `draft_version`), so a client sends only its instruction and
+-- gets back only the card sections that changed, not the whole extract both ways.
+--
+-- One draft per extraction. `version` goes up by one with each correction, and a correction
+-- names the version it applies to: one made from a stale copy of the card is refused, not
+-- applied to a state the person never saw. `corrections` accumulates the {at, instruction,
+-- edits} entries /confirm records. Past `expires_at` a draft is gone and the person starts
+-- again from the stored reading, which is never touched by a draft.
+-- ---------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS correction_drafts (
+    extraction_id TEXT PRIMARY KEY REFERENCES extractions(id) ON DELETE CASCADE,
+    version       INT NOT NULL,
+    extract       JSONB NOT NULL,
+    corrections   JSONB NOT NULL DEFAULT '[]',
+    updated_at    TIMESTAMPTZ NOT NULL DEFAULT now(),
+    expires_at    TIMESTAMPTZ NOT NULL
+);
+
+-- ---------------------------------------------------------------------------
+-- A single counter bumped in the same transaction as every write to the session tables
+-- (db.insert.bump_data_version()). The API's ETags are made from it, so a client polling
+-- with If-None-Match gets a 304 from one single-row read, before any of the real queries run.
+-- ---------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS data_version (
+    id      BOOLEAN PRIMARY KEY DEFAULT true CHECK (id),
+    version BIGINT NOT NULL DEFAULT 0
+);
+INSERT INTO data_version (id, version) VALUES (true, 0) ON CONFLICT (id) DO NOTHING;
+
+-- ---------------------------------------------------------------------------
+-- Personal records, kept up to date on insert rather than searched for on every read.
+--
+-- `current_prs` holds the best set so far per exercise (by exact name) and record: 'weight',
+-- the heaviest set at any reps; 'reps', the heaviest set at exactly `reps` full reps; 'e1rm',
+-- the best Epley estimate, weight * (1 + reps / 30). A tie goes to the later date. `value_kg`
+-- is the number compared: the weight, or for 'e1rm' the estimate.
+--
+-- `pr_events` is the ledger: one row each time a record was beaten (or first set), with
+-- what it beat. db.insert.insert_session() updates both, comparing only the new session's
+-- sets against current_prs. A session inserted out of date order is judged against the
+-- records as they stood at insert time. Deleting a session deletes its records and events.
+-- Its runners-up are not restored, so after deletes or an out-of-order import, run
+-- db.insert.rebuild_personal_records() (scripts/rebuild_derived.py). It replays every session in
+-- date order.
+-- ---------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS current_prs (
+    exercise       TEXT NOT NULL,
+    record         TEXT NOT NULL,
+    -- The rep count for 'reps'; 0 for the others.
+    reps           INT NOT NULL DEFAULT 0,
+    value_kg       NUMERIC NOT NULL,
+    weight_kg      NUMERIC NOT NULL,
+    reps_full      INT,
+    date           DATE NOT NULL,
+    session_id     TEXT NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+    working_set_id INT NOT NULL REFERENCES working_sets(id) ON DELETE CASCADE,
+    PRIMARY KEY (exercise, record, reps),
+    CONSTRAINT current_prs_record_check CHECK (record IN ('weight', 'reps', 'e1rm'))
+);
+
+CREATE TABLE IF NOT EXISTS pr_events (
+    id             BIGSERIAL PRIMARY KEY,
+    exercise       TEXT NOT NULL,
+    record         TEXT NOT NULL,
+    reps           INT NOT NULL DEFAULT 0,
+    value_kg       NUMERIC NOT NULL,
+    weight_kg      NUMERIC NOT NULL,
+    reps_full      INT,
+    -- The record this one beat; null the first time the exercise was done.
+    previous_kg    NUMERIC,
+    -- The session's date: when the record was set, which an import can make long before it
+    -- was recorded.
+    date           DATE NOT NULL,
+    session_id     TEXT NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+    working_set_id INT NOT NULL REFERENCES working_sets(id) ON DELETE CASCADE,
+    recorded_at    TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- ---------------------------------------------------------------------------
+-- What each exercise looked like last time, kept current on insert so that showing it next to
+-- a new session's card is one primary-key lookup per exercise, not a scan of its history.
+--
+-- Keyed by LOWER(name), as history lookups are. `last_*` is the exercise in its latest
+-- session by (date, session_id): the sets as [{number, weight_kg, reps_full, reps_partial,
+-- rpe}], and the goal as {weight_kg, sets, rep_min, rep_max}, null if that session had none.
+-- `best_e1rm_kg` is the best Epley estimate ever, rounded like current_prs. `session_count`
+-- is how many sessions the exercise appears in. An exercise done twice in one session counts
+-- once, with its sets in exercise order. db.insert.insert_session() updates the row, and gets
+-- the same result whatever order sessions arrive in. Deleting a session deletes the rows it
+-- was last for: db.insert.rebuild_exercise_state() (scripts/rebuild_derived.py) recomputes them.
+-- ---------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS exercise_state (
+    exercise_key    TEXT PRIMARY KEY,
+    -- The spelling used last time.
+    exercise        TEXT NOT NULL,
+    last_date       DATE NOT NULL,
+    last_session_id TEXT NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+    last_sets       JSONB NOT NULL DEFAULT '[]',
+    last_goal       JSONB,
+    best_e1rm_kg    NUMERIC,
+    best_e1rm_date  DATE,
+    session_count   INT NOT NULL,
+    updated_at      TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- ---------------------------------------------------------------------------
+-- Rolling training load by calendar day, so load can be followed across program changes and
+-- ad hoc sessions that phase/week labels say nothing about.
+--
+-- One row per day, with no gaps, from the first session's date to the latest's: a rest day
+-- is a day of zero load, and the windows below count it. `tonnage_kg` (weight × full reps),
+-- `working_sets` and `sessions` are that day's totals. Over the 7 days ending on the row
+-- (acute) and the 28 days ending on it (chronic, as a weekly average -- the 28-day sum / 4):
+--   acwr      acute / chronic tonnage: the acute:chronic workload ratio. Null until 28 days
+--             of history exist, when chronic would be understated.
+--   monotony  mean / population standard deviation of the 7 daily tonnages (Foster). Null
+--             until 7 days exist, and for a week with no variation.
+--   strain    acute tonnage × monotony.
+-- db.insert.insert_session() updates it: the session's day, any days added to keep the series
+-- whole, and the 27 days after, whose windows include it -- at most a few weeks of rows,
+-- however long the history. Deleting a session leaves its day's totals behind:
+-- db.insert.rebuild_daily_load() (scripts/rebuild_derived.py) recomputes the table.
+-- ---------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS daily_load (
+    date                DATE PRIMARY KEY,
+    tonnage_kg          NUMERIC NOT NULL DEFAULT 0,
+    working_sets        INT NOT NULL DEFAULT 0,
+    sessions            INT NOT NULL DEFAULT 0,
+    acute_tonnage_kg    NUMERIC,
+    chronic_tonnage_kg  NUMERIC,
+    acute_sets          INT,
+    chronic_sets        NUMERIC,
+    acwr                NUMERIC,
+    monotony            NUMERIC,
+    strain              NUMERIC,
+    updated_at          TIMESTAMPTZ NOT NULL DEFAULT now()
+);
 
 -- Finding earlier captures of the same text, and every attempt at reading one input.
 CREATE INDEX IF NOT EXISTS idx_raw_inputs_checksum      ON raw_inputs(checksum);
 CREATE INDEX IF NOT EXISTS idx_extractions_raw_input_id ON extractions(raw_input_id);
 CREATE INDEX IF NOT EXISTS idx_llm_calls_raw_input_id   ON llm_calls(raw_input_id);
+CREATE INDEX IF NOT EXISTS idx_extraction_retries_due
+    ON extraction_retries(next_attempt_at) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys(expires_at);
+CREATE INDEX IF NOT EXISTS idx_correction_drafts_expires_at ON correction_drafts(expires_at);
 
 CREATE INDEX IF NOT EXISTS idx_warmups_session_id   ON warmups(session_id);
 CREATE INDEX IF NOT EXISTS idx_cooldowns_session_id ON cooldowns(session_id);
 CREATE INDEX IF NOT EXISTS idx_exercises_session_id         ON exercises(session_id);
+-- Keyset pagination of GET /sessions and GET /exercises/{name}/history (db/fetch.py).
+CREATE INDEX IF NOT EXISTS idx_sessions_date_session_id     ON sessions(date, session_id);
+CREATE INDEX IF NOT EXISTS idx_exercises_lower_name         ON exercises(LOWER(name));
 CREATE INDEX IF NOT EXISTS idx_working_sets_exercise_id     ON working_sets(exercise_id);
+-- Key-lift lookups by name, any case, and "PRs set since ...".
+CREATE INDEX IF NOT EXISTS idx_current_prs_lower_exercise   ON current_prs(LOWER(exercise));
+CREATE INDEX IF NOT EXISTS idx_pr_events_date               ON pr_events(date);
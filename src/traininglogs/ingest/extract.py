@@ -7,13 +7,23 @@ in a terminal loop.
 """
 from __future__ import annotations
 
+from contextlib import ExitStack
+from dataclasses import asdict
+from typing import Callable
+
 from psycopg2.extensions import connection as Connection
 
-from traininglogs.agent.extraction import assemble
+from traininglogs.agent.deadline import Deadline, DeadlineExceeded
+from traininglogs.agent.extraction import FailedWorker, assemble
 from traininglogs.agent.prompts import PROMPT_VERSION
 from traininglogs.agent.providers import AnthropicProvider, ExtractionProvider
+from traininglogs.db.db import EXTRACT_LOCK_NAMESPACE, advisory_lock
 from traininglogs.db.fetch import get_extractions_for_raw_input, get_raw_input
-from traininglogs.db.insert import insert_extraction, insert_llm_calls
+from traininglogs.db.insert import (
+    insert_extraction,
+    insert_extraction_retries,
+    insert_llm_calls,
+)
 
 
 def extract(
@@ -21,6 +31,8 @@ def extract(
     raw_input_id: str,
     provider: ExtractionProvider | None = None,
     model: str | None = None,
+    deadline: Deadline | None = None,
+    save_late_calls: Callable[[list[dict]], None] | None = None,
 ) -> str:
     """Read a captured raw input and store one attempt at interpreting it.
 
@@ -28,14 +40,65 @@ def extract(
     returned and no model is called. Re-running extract on an input that already has one must
     not spend money producing a second copy (roadmap D3) -- a rejected extraction does not
     count, since rejecting one is exactly how a person asks for another attempt.
+
+    Single-flight, too: the check above cannot see an extraction still being made, so two
+    concurrent calls for one input -- a client retrying `/inputs`, a webhook delivered twice,
+    two API machines -- would both pass it and both pay. Extraction runs under an advisory lock
+    on `raw_input_id`, so a second caller waits for the first, finds its extraction on the
+    re-check, and returns that id without calling a model. If the first failed, the second
+    simply makes its own attempt.
+
+    `deadline` is handed to assemble() unchanged: past it, the extraction is saved partial,
+    with placeholders, rather than held open (see agent/deadline.py). Time spent waiting on
+    another caller counts against it.
+
+    A hedged call's losing leg can still be running when assemble() returns, and its record
+    comes after the calls are saved (agent/hedging.py). `save_late_calls` saves such records
+    for this input when they arrive, on a connection of its own, so extract() returns as soon
+    as the winner does. Without it, extract() waits for them.
     """
+    existing = _existing_extraction_id(conn, raw_input_id)
+    if existing is not None:
+        return existing
+
+    with ExitStack() as stack:
+        try:
+            stack.enter_context(advisory_lock(
+                conn, EXTRACT_LOCK_NAMESPACE, raw_input_id,
+                timeout_seconds=deadline.remaining() if deadline is not None else None,
+            ))
+        except TimeoutError as exc:
+            raise DeadlineExceeded(
+                f"raw_input_id={raw_input_id}: still being extracted by another request when "
+                f"the {deadline.seconds:g}s deadline passed."
+            ) from exc
+        # Re-checked under the lock: whoever held it may have just finished this input.
+        existing = _existing_extraction_id(conn, raw_input_id)
+        if existing is not None:
+            print(
+                f"[ingest] raw_input_id={raw_input_id} extract: "
+                f"joined a concurrent extraction, {existing}"
+            )
+            return existing
+        return _extract(conn, raw_input_id, provider, model, deadline, save_late_calls)
+
+
+def _existing_extraction_id(conn: Connection, raw_input_id: str) -> str | None:
     existing = [
         row for row in get_extractions_for_raw_input(conn, raw_input_id)
         if row["status"] in ("pending", "confirmed")
     ]
-    if existing:
-        return existing[0]["id"]
+    return existing[0]["id"] if existing else None
+
 
+def _extract(
+    conn: Connection,
+    raw_input_id: str,
+    provider: ExtractionProvider | None,
+    model: str | None,
+    deadline: Deadline | None,
+    save_late_calls: Callable[[list[dict]], None] | None = None,
+) -> str:
     raw = get_raw_input(conn, raw_input_id)
     if raw is None:
         raise ValueError(f"no raw_input with id {raw_input_id!r}")
@@ -48,19 +111,27 @@ def extract(
     # worker calls underneath are tagged by step instead (see providers.py's "[llm]" lines);
     # raw_input_id is what ties them back to this one.
     print(f"[ingest] raw_input_id={raw_input_id} extract: starting")
+    failed_workers: list[FailedWorker] = []
     try:
-        result = assemble(raw["content"], provider=provider)
+        result = assemble(
+            raw["content"], provider=provider, failed_workers=failed_workers, deadline=deadline
+        )
     finally:
         # Persisted whether assemble() succeeded or raised -- a run that fails partway through
         # still spent money on the calls it made, and that cost must not vanish with the
         # exception. D4's whole point is that cost is a SQL query, not something read out of
-        # console output after the fact.
+        # console output after the fact. A hedged call's losing leg may still be running, and
+        # its record comes when it finishes (agent/hedging.py): handed off, or waited for.
+        if save_late_calls is not None and hasattr(provider, "detach_late"):
+            provider.detach_late(save_late_calls)
+        elif hasattr(provider, "drain"):
+            provider.drain()
         calls = getattr(provider, "calls", [])
         insert_llm_calls(conn, raw_input_id, calls)
 
     print(f"[ingest] raw_input_id={raw_input_id} extract: done, {len(calls)} LLM call(s)")
 
-    return insert_extraction(
+    extraction_id = insert_extraction(
         conn,
         raw_input_id=raw_input_id,
         model=model,
@@ -70,3 +141,12 @@ def extract(
         warnings=list(result.warnings or []),
         status="pending",
     )
+    # Placeholders are queued rather than left for the person: ingest/retry.py re-asks each one
+    # in the background and patches this extraction in place when one comes back.
+    insert_extraction_retries(conn, extraction_id, [asdict(f) for f in failed_workers])
+    if failed_workers:
+        print(
+            f"[ingest] raw_input_id={raw_input_id} extract: "
+            f"{len(failed_workers)} placeholder(s) queued for retry"
+        )
+    return extraction_id
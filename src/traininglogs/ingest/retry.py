@@ -0,0 +1,172 @@
+"""retry: placeholder exercises -> patched pending extractions.
+
+A worker that raises inside assemble() leaves a placeholder exercise on the card. extract()
+queues each of those (see insert_extraction_retries); this drains the queue -- one worker call
+per placeholder, with exponential backoff between attempts -- and patches the pending
+extraction in place when one succeeds. GET /extractions/{id} builds its card from the stored
+extract, so the card updates with it. One flaky call costs one more worker call, not a rejected
+session and a full re-extraction.
+"""
+from __future__ import annotations
+
+from psycopg2.extensions import connection as Connection
+
+from traininglogs.agent.extraction import (
+    PLACEHOLDER_NOTE_PREFIX,
+    failed_worker_warning,
+    run_worker,
+)
+from traininglogs.agent.providers import AnthropicProvider, ExtractionProvider
+from traininglogs.agent.schemas import LLMParserError, TrainingLogLLMExtract
+from traininglogs.db.fetch import get_extraction
+from traininglogs.db.insert import (
+    claim_due_extraction_retries,
+    insert_llm_calls,
+    record_extraction_retry,
+    update_pending_extract,
+)
+
+# Attempts per placeholder before it is left for the person to fix by hand. The first retry
+# waits RETRY_BASE_DELAY_SECONDS, each one after that twice as long, capped at
+# RETRY_MAX_DELAY_SECONDS -- 30s, 1m, 2m, 4m, 8m. A transient failure clears in the first one
+# or two; five failures in a row over a quarter of an hour is not transient.
+MAX_RETRY_ATTEMPTS = 5
+RETRY_BASE_DELAY_SECONDS = 30.0
+RETRY_MAX_DELAY_SECONDS = 30 * 60.0
+
+
+def retry_delay_seconds(attempts: int) -> float:
+    """Backoff after the `attempts`-th failed retry (1-based)."""
+    return min(RETRY_BASE_DELAY_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_DELAY_SECONDS)
+
+
+def _patch_extract(
+    extract: TrainingLogLLMExtract,
+    position: int,
+    name: str,
+    exercise,
+    exercise_uncertain: list[str],
+    exercise_warnings: list[str],
+) -> TrainingLogLLMExtract | None:
+    """The extract with the placeholder at `position` replaced, or None if there is no
+    placeholder there any more."""
+    index = next(
+        (
+            i for i, ex in enumerate(extract.exercises)
+            if ex.number == position
+            and ex.notes is not None
+            and ex.notes.startswith(PLACEHOLDER_NOTE_PREFIX)
+        ),
+        None,
+    )
+    if index is None:
+        return None
+
+    exercises = list(extract.exercises)
+    exercises[index] = exercise
+    # Only this placeholder's own failure line goes -- every other warning on the session still
+    # describes something true.
+    failure_prefix = failed_worker_warning(position, name, "")
+    warnings = [w for w in extract.warnings if not w.startswith(failure_prefix)]
+    warnings.extend(exercise_warnings)
+    uncertain_fields = list(extract.uncertain_fields) + [
+        f"exercises.{index}.{path}" for path in exercise_uncertain
+    ]
+    return extract.model_copy(
+        update={
+            "exercises": exercises,
+            "warnings": warnings,
+            "uncertain_fields": uncertain_fields,
+        }
+    )
+
+
+def retry_failed_exercises(
+    conn: Connection,
+    provider: ExtractionProvider | None = None,
+    limit: int = 10,
+    max_attempts: int = MAX_RETRY_ATTEMPTS,
+) -> list[str]:
+    """Run one pass over the due retries. Returns the ids of the extractions patched.
+
+    `provider` can be a different model from the one that failed -- a placeholder is often a
+    payload the first model kept getting wrong, and a stronger model is a cheap second opinion
+    for one exercise. Every call is recorded in llm_calls against the extraction's raw input,
+    the same as the calls extract() made, so a retry's cost is never invisible.
+    """
+    due = claim_due_extraction_retries(conn, limit=limit)
+    if not due:
+        return []
+
+    provider = provider or AnthropicProvider()
+    patched: list[str] = []
+
+    for retry in due:
+        extraction_id = retry["extraction_id"]
+        stored = get_extraction(conn, extraction_id)
+        if stored is None:
+            continue
+        calls_before = len(getattr(provider, "calls", []))
+        print(
+            f"[retry] extraction_id={extraction_id} exercise {retry['position']} "
+            f"({retry['name']}): attempt {retry['attempts'] + 1}"
+        )
+        try:
+            exercise, exercise_uncertain, exercise_warnings = run_worker(
+                retry["worker_text"],
+                retry["worker_position"],
+                retry["position"],
+                retry["name"],
+                provider,
+            )
+        except LLMParserError as exc:
+            attempts = retry["attempts"] + 1
+            gave_up = attempts >= max_attempts
+            record_extraction_retry(
+                conn,
+                retry["id"],
+                "abandoned" if gave_up else "queued",
+                error=str(exc),
+                retry_in_seconds=None if gave_up else retry_delay_seconds(attempts),
+            )
+            print(
+                f"[retry] extraction_id={extraction_id} exercise {retry['position']}: "
+                f"{'giving up' if gave_up else 'failed again'} — {str(exc).splitlines()[0][:160]}"
+            )
+            continue
+        finally:
+            insert_llm_calls(
+                conn, stored["raw_input_id"], getattr(provider, "calls", [])[calls_before:]
+            )
+
+        # Locked from here to update_pending_extract()'s commit: two retries for different
+        # exercises of one extraction each read-modify-write the same JSON document.
+        stored = get_extraction(conn, extraction_id, for_update=True)
+        updated = None
+        if stored is not None and stored["status"] == "pending":
+            updated = _patch_extract(
+                TrainingLogLLMExtract.model_validate(stored["extract"]),
+                retry["position"],
+                retry["name"],
+                exercise,
+                exercise_uncertain,
+                exercise_warnings,
+            )
+        if updated is None or not update_pending_extract(
+            conn,
+            extraction_id,
+            updated.model_dump(mode="json"),
+            uncertain_fields=list(updated.uncertain_fields),
+            warnings=list(updated.warnings),
+        ):
+            # Confirmed, rejected or hand-fixed while this was in flight -- the person's
+            # version wins, and the answer is dropped rather than written over it.
+            conn.rollback()
+            record_extraction_retry(conn, retry["id"], "abandoned", error="nothing left to patch")
+            continue
+
+        record_extraction_retry(conn, retry["id"], "succeeded")
+        print(f"[retry] extraction_id={extraction_id} exercise {retry['position']}: recovered")
+        patched.append(extraction_id)
+
+    return patched
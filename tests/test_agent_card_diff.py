@@ -0,0 +1,81 @@
+"""card_patch(): a correction's effect on the validation card, as section-level JSON Patch
+operations, and apply_card_patch() turning the old card into the new one with them."""
+from __future__ import annotations
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from traininglogs.agent.card_diff import apply_card_patch, card_patch
+from traininglogs.agent.schemas import TrainingLogLLMExtract
+from traininglogs.agent.validation_card_builder import ValidationCardBuilder
+
+
+def _exercise(number: int, name: str, weight: float = 100.0) -> dict:
+    return {
+        "number": number,
+        "name": name,
+        "sets": [{"number": 1, "weight_kg": weight, "rep_count": {"full": 8, "partial": 0}}],
+    }
+
+
+def _card(**overrides) -> dict:
+    extract = {
+        "date": "2026-06-01",
+        "focus": "Legs",
+        "exercises": [_exercise(1, "Leg Press"), _exercise(2, "Leg Curl")],
+        **overrides,
+    }
+    return jsonable_encoder(
+        ValidationCardBuilder().build(TrainingLogLLMExtract.model_validate(extract))
+    )
+
+
+class TestCardPatch:
+    def test_identical_cards_need_no_operations(self) -> None:
+        assert card_patch(_card(), _card()) == []
+
+    def test_a_header_change_replaces_only_the_header(self) -> None:
+        before, after = _card(), _card(focus="Legs Hypertrophy")
+
+        ops = card_patch(before, after)
+
+        assert [(op["op"], op["path"]) for op in ops] == [("replace", "/session_header")]
+        assert apply_card_patch(before, ops) == after
+
+    def test_a_set_change_replaces_only_its_exercise(self) -> None:
+        before = _card()
+        after = _card(exercises=[_exercise(1, "Leg Press"), _exercise(2, "Leg Curl", 45.0)])
+
+        ops = card_patch(before, after)
+
+        assert [(op["op"], op["path"]) for op in ops] == [("replace", "/exercises/1")]
+        assert apply_card_patch(before, ops) == after
+
+    def test_added_and_removed_exercises(self) -> None:
+        two = _card()
+        three = _card(exercises=[
+            _exercise(1, "Leg Press"), _exercise(2, "Leg Curl"), _exercise(3, "Calf Raise"),
+        ])
+        one = _card(exercises=[_exercise(1, "Leg Press")])
+
+        grow = card_patch(two, three)
+        assert [(op["op"], op["path"]) for op in grow] == [("add", "/exercises/2")]
+        assert apply_card_patch(two, grow) == three
+
+        shrink = card_patch(three, one)
+        assert [(op["op"], op["path"]) for op in shrink] == [
+            ("remove", "/exercises/2"), ("remove", "/exercises/1"),
+        ]
+        assert apply_card_patch(three, shrink) == one
+
+    def test_applying_leaves_the_original_untouched(self) -> None:
+        before, after = _card(), _card(focus="Other")
+        snapshot = jsonable_encoder(before)
+
+        apply_card_patch(before, card_patch(before, after))
+
+        assert before == snapshot
+
+    def test_unknown_operations_are_refused(self) -> None:
+        with pytest.raises(ValueError):
+            apply_card_patch(_card(), [{"op": "move", "path": "/exercises/0", "from": "/x"}])
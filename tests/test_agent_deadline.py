@@ -0,0 +1,212 @@
+"""One deadline for a whole extraction: providers never start an attempt or a wait that cannot
+finish before it, and assemble() returns a partial extract -- placeholders for the workers it
+never started, and one warning saying so -- instead of holding the request open.
+
+Mocked clients and fake providers only, no real API calls."""
+from __future__ import annotations
+
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+
+from traininglogs.agent.deadline import Deadline, DeadlineExceeded
+from traininglogs.agent.extraction import (
+    PLACEHOLDER_NOTE_PREFIX,
+    SEGMENT_TOOL_NAME,
+    SHELL_TOOL_NAME,
+    WORKER_TOOL_NAME,
+    FailedWorker,
+    assemble,
+)
+from traininglogs.agent.schemas import LLMParserError
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _rate_limit_error(exc_cls, retry_after: str):
+    response = httpx.Response(
+        status_code=429,
+        headers={"retry-after": retry_after},
+        request=httpx.Request("POST", "https://example.com"),
+    )
+    return exc_cls("rate limited", response=response, body=None)
+
+
+def _tool_response(payload: dict):
+    block = MagicMock()
+    block.type, block.input, block.id = "tool_use", payload, "toolu_1"
+    return MagicMock(content=[block])
+
+
+class TestDeadline:
+    def test_remaining_counts_down_and_never_goes_negative(self) -> None:
+        clock = FakeClock()
+        deadline = Deadline(10, clock=clock)
+        clock.now = 4
+        assert deadline.remaining() == 6
+        clock.now = 12
+        assert deadline.remaining() == 0
+        assert deadline.expired()
+
+    def test_check_raises_an_llm_parser_error_once_expired(self) -> None:
+        clock = FakeClock()
+        deadline = Deadline(1, clock=clock)
+        deadline.check("fine")
+        clock.now = 2
+        with pytest.raises(LLMParserError, match="deadline passed"):
+            deadline.check("too late")
+
+
+class TestProvidersRespectTheDeadline:
+    def test_an_expired_deadline_makes_no_call(self) -> None:
+        from traininglogs.agent.providers import AnthropicProvider
+
+        clock = FakeClock()
+        deadline = Deadline(1, clock=clock)
+        clock.now = 5
+        with patch("traininglogs.agent.providers.anthropic.Anthropic") as mock_cls:
+            mock_client = MagicMock()
+            mock_cls.return_value = mock_client
+
+            provider = AnthropicProvider()
+            with pytest.raises(DeadlineExceeded):
+                provider.extract("t", {}, "s", "worker", "d", deadline=deadline)
+
+            assert mock_client.messages.create.call_count == 0
+            assert provider.calls[0]["failed"]
+
+    def test_the_request_timeout_is_the_time_left(self) -> None:
+        from traininglogs.agent.providers import AnthropicProvider
+
+        clock = FakeClock()
+        deadline = Deadline(30, clock=clock)
+        clock.now = 10
+        with patch("traininglogs.agent.providers.anthropic.Anthropic") as mock_cls:
+            mock_client = MagicMock()
+            mock_client.messages.create.return_value = _tool_response({"a": 1})
+            mock_cls.return_value = mock_client
+
+            AnthropicProvider().extract("t", {}, "s", "worker", "d", deadline=deadline)
+
+            assert mock_client.messages.create.call_args.kwargs["timeout"] == 20
+
+    def test_no_deadline_sends_no_timeout(self) -> None:
+        from traininglogs.agent.providers import AnthropicProvider
+
+        with patch("traininglogs.agent.providers.anthropic.Anthropic") as mock_cls:
+            mock_client = MagicMock()
+            mock_client.messages.create.return_value = _tool_response({"a": 1})
+            mock_cls.return_value = mock_client
+
+            AnthropicProvider().extract("t", {}, "s", "worker", "d")
+
+            assert "timeout" not in mock_client.messages.create.call_args.kwargs
+
+    def test_a_rate_limit_wait_longer_than_the_time_left_is_not_slept(self) -> None:
+        import anthropic
+
+        from traininglogs.agent.providers import AnthropicProvider
+
+        with patch("traininglogs.agent.providers.anthropic.Anthropic") as mock_cls, \
+             patch("traininglogs.agent.providers.time.sleep") as sleep:
+            mock_client = MagicMock()
+            mock_client.messages.create.side_effect = _rate_limit_error(
+                anthropic.RateLimitError, "60"
+            )
+            mock_cls.return_value = mock_client
+
+            with pytest.raises(DeadlineExceeded, match="window reopens"):
+                AnthropicProvider().extract(
+                    "t", {}, "s", "worker", "d", deadline=Deadline(10)
+                )
+
+            sleep.assert_not_called()
+
+    def test_groq_caps_rate_limit_waits_the_same_way(self) -> None:
+        import groq
+
+        from traininglogs.agent.providers import GroqProvider
+
+        with patch.object(groq, "Groq") as mock_cls, \
+             patch("traininglogs.agent.providers.time.sleep") as sleep:
+            mock_client = MagicMock()
+            mock_client.chat.completions.create.side_effect = _rate_limit_error(
+                groq.RateLimitError, "60"
+            )
+            mock_cls.return_value = mock_client
+
+            with pytest.raises(DeadlineExceeded):
+                GroqProvider().extract("t", {}, "s", "worker", "d", deadline=Deadline(10))
+
+            sleep.assert_not_called()
+
+
+SPLIT = {
+    "exercises": [
+        {"position": 1, "name": "Bench Press", "anchor": "Bench Press"},
+        {"position": 2, "name": "Overhead Press", "anchor": "Overhead Press"},
+    ]
+}
+TEXT = "Bench Press\n1. 80kg x 8\n\nOverhead Press\n1. 40kg x 8\n"
+
+
+class SlowProvider:
+    """Each worker call advances the fake clock by `worker_seconds`."""
+
+    def __init__(self, clock: FakeClock, worker_seconds: float) -> None:
+        self.clock = clock
+        self.worker_seconds = worker_seconds
+        self.deadlines: list = []
+
+    def extract(self, text, tool_schema, system_prompt, tool_name, tool_description,
+                validate=None, deadline=None):
+        self.deadlines.append(deadline)
+        if tool_name == SEGMENT_TOOL_NAME:
+            return SPLIT
+        if tool_name == SHELL_TOOL_NAME:
+            return {"date": "2026-05-12"}
+        assert tool_name == WORKER_TOOL_NAME
+        self.clock.now += self.worker_seconds
+        return {
+            "number": 1,
+            "name": "Bench Press",
+            "sets": [{"number": 1, "source_line": "1. 80kg x 8", "weight_kg": 80.0, "reps": "8"}],
+        }
+
+
+class TestAssembleUnderADeadline:
+    def test_every_call_is_handed_the_same_deadline(self) -> None:
+        clock = FakeClock()
+        deadline = Deadline(100, clock=clock)
+        provider = SlowProvider(clock, worker_seconds=1)
+
+        assemble(TEXT, provider=provider, deadline=deadline)
+
+        assert provider.deadlines == [deadline] * 4
+
+    def test_workers_not_started_in_time_become_placeholders_with_one_warning(self) -> None:
+        clock = FakeClock()
+        deadline = Deadline(5, clock=clock)
+        provider = SlowProvider(clock, worker_seconds=10)
+        failed: list[FailedWorker] = []
+
+        result = assemble(TEXT, provider=provider, deadline=deadline, failed_workers=failed)
+
+        assert result.exercises[0].notes is None
+        assert result.exercises[1].notes.startswith(PLACEHOLDER_NOTE_PREFIX)
+        assert result.warnings[0].startswith("Partial extract")
+        assert "1 of 2" in result.warnings[0]
+        assert [f.position for f in failed] == [2]
+
+    def test_no_deadline_means_no_partial_warning(self) -> None:
+        clock = FakeClock()
+        result = assemble(TEXT, provider=SlowProvider(clock, worker_seconds=1000))
+
+        assert not any(w.startswith("Partial extract") for w in result.warnings)
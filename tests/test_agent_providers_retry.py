@@ -402,3 +402,149 @@ class TestRateLimitWaitSeconds:
         from traininglogs.agent.providers import _describe_wait
 
         assert _describe_wait(self._exc({"x-ratelimit-reset-tokens": header})) == phrase
+
+
+class TestTransportFailuresAreRetriedWithJitter:
+    """A dropped connection, a timeout, a 5xx or an overload says nothing about the answer --
+    there isn't one. These used to fail the worker outright; now they are retried on their own
+    budget, so a network blip costs seconds instead of a placeholder."""
+
+    @staticmethod
+    def _status_error(exc_cls, status: int):
+        response = httpx.Response(
+            status_code=status, request=httpx.Request("POST", "https://example.com")
+        )
+        return exc_cls("server said no", response=response, body=None)
+
+    @staticmethod
+    def _connection_error(exc_cls):
+        return exc_cls(request=httpx.Request("POST", "https://example.com"))
+
+    @staticmethod
+    def _ok(payload):
+        block = MagicMock()
+        block.type, block.input, block.id = "tool_use", payload, "toolu_1"
+        return MagicMock(content=[block])
+
+    def test_connection_errors_and_5xx_are_retried_without_spending_the_reask_budget(self) -> None:
+        import anthropic
+
+        from traininglogs.agent.providers import AnthropicProvider
+
+        with patch("traininglogs.agent.providers.anthropic.Anthropic") as mock_cls, \
+             patch("traininglogs.agent.providers.time.sleep") as sleep:
+            mock_client = MagicMock()
+            mock_client.messages.create.side_effect = [
+                self._connection_error(anthropic.APIConnectionError),
+                self._status_error(anthropic.InternalServerError, 500),
+                self._status_error(anthropic.APIStatusError, 529),
+                self._connection_error(anthropic.APITimeoutError),
+                self._ok({"name": "Leg Press"}),
+            ]
+            mock_cls.return_value = mock_client
+
+            provider = AnthropicProvider()
+            result = provider.extract("chunk", {}, "sys", "extract_exercise", "desc")
+
+            assert result == {"name": "Leg Press"}
+            assert sleep.call_count == 4
+            assert provider.calls[0]["attempts"] == 1
+            assert provider.calls[0]["transport_retries"] == 4
+            assert provider.calls[0]["failed"] is None
+
+    def test_the_transport_budget_runs_out(self) -> None:
+        import anthropic
+
+        from traininglogs.agent.providers import AnthropicProvider, _MAX_TRANSPORT_RETRIES
+
+        with patch("traininglogs.agent.providers.anthropic.Anthropic") as mock_cls, \
+             patch("traininglogs.agent.providers.time.sleep"):
+            mock_client = MagicMock()
+            mock_client.messages.create.side_effect = self._status_error(
+                anthropic.InternalServerError, 503
+            )
+            mock_cls.return_value = mock_client
+
+            provider = AnthropicProvider()
+            with pytest.raises(LLMParserError, match="transport retries"):
+                provider.extract("chunk", {}, "sys", "tool", "desc")
+
+            assert mock_client.messages.create.call_count == _MAX_TRANSPORT_RETRIES + 1
+            assert "server error (503)" in provider.calls[0]["failed"]
+
+    def test_a_non_transient_4xx_is_not_retried(self) -> None:
+        import anthropic
+
+        from traininglogs.agent.providers import AnthropicProvider
+
+        with patch("traininglogs.agent.providers.anthropic.Anthropic") as mock_cls, \
+             patch("traininglogs.agent.providers.time.sleep") as sleep:
+            mock_client = MagicMock()
+            mock_client.messages.create.side_effect = self._status_error(
+                anthropic.AuthenticationError, 401
+            )
+            mock_cls.return_value = mock_client
+
+            with pytest.raises(anthropic.AuthenticationError):
+                AnthropicProvider().extract("chunk", {}, "sys", "tool", "desc")
+
+            assert mock_client.messages.create.call_count == 1
+            sleep.assert_not_called()
+
+    def test_groq_retries_transport_failures_too(self) -> None:
+        import groq
+
+        from traininglogs.agent.providers import GroqProvider
+
+        call = MagicMock()
+        call.id, call.function.name = "call_1", "extract_exercise"
+        call.function.arguments = '{"name": "Leg Press"}'
+        ok = MagicMock(choices=[MagicMock(message=MagicMock(tool_calls=[call]))])
+
+        with patch("groq.Groq") as mock_cls, \
+             patch("traininglogs.agent.providers.time.sleep") as sleep:
+            mock_client = MagicMock()
+            mock_client.chat.completions.create.side_effect = [
+                self._status_error(groq.InternalServerError, 502),
+                self._connection_error(groq.APIConnectionError),
+                ok,
+            ]
+            mock_cls.return_value = mock_client
+
+            provider = GroqProvider()
+            result = provider.extract("chunk", {}, "sys", "extract_exercise", "desc")
+
+            assert result == {"name": "Leg Press"}
+            assert sleep.call_count == 2
+            assert provider.calls[0]["transport_retries"] == 2
+
+    def test_the_sdk_clients_do_not_retry_behind_our_back(self) -> None:
+        from traininglogs.agent.providers import AnthropicProvider
+
+        with patch("traininglogs.agent.providers.anthropic.Anthropic") as mock_cls:
+            AnthropicProvider()
+
+            assert mock_cls.call_args.kwargs["max_retries"] == 0
+
+
+class TestTransportWaitSeconds:
+    def test_full_jitter_spans_zero_to_the_doubling_cap(self) -> None:
+        from traininglogs.agent.providers import _TRANSPORT_MAX_DELAY, _transport_wait_seconds
+
+        assert _transport_wait_seconds(1, rand=lambda: 0.0) == 0.0
+        assert _transport_wait_seconds(1, rand=lambda: 1.0) == 1.0
+        assert _transport_wait_seconds(3, rand=lambda: 1.0) == 4.0
+        assert _transport_wait_seconds(30, rand=lambda: 1.0) == _TRANSPORT_MAX_DELAY
+        assert _transport_wait_seconds(3, rand=lambda: 0.5) == 2.0
+
+    @pytest.mark.parametrize(
+        "status,expected",
+        [(500, "server error (500)"), (503, "server error (503)"), (529, "overloaded (529)"),
+         (408, "server error (408)"), (401, None), (404, None), (413, None)],
+    )
+    def test_classification(self, status, expected) -> None:
+        from traininglogs.agent.providers import _transient_failure
+
+        exc = Exception("status")
+        exc.status_code = status   # type: ignore[attr-defined]
+        assert _transient_failure(exc, timed_out=False) == expected
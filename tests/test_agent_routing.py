@@ -0,0 +1,168 @@
+"""Per-chunk model routing: the policy's choice from cheap chunk features, the escalation to the
+strong model when a fast answer is rejected, and the route recorded on every call. Fake
+providers only, no real LLM calls."""
+from __future__ import annotations
+
+import pytest
+
+from traininglogs.agent.deadline import DeadlineExceeded
+from traininglogs.agent.extraction import WORKER_TOOL_NAME, run_worker
+from traininglogs.agent.providers import _record_call
+from traininglogs.agent.routing import (
+    ESCALATED,
+    FAST,
+    STRONG,
+    RoutedProvider,
+    RoutingPolicy,
+    chunk_features,
+)
+from traininglogs.agent.schemas import LLMParserError
+
+PROGRAMMED = """## Exercise 1
+**Name:** Leg Press
+**Goal:** 280 kg x 3 sets x 10-12 reps
+### Working Sets
+1. 280 x 12 RPE 9.5
+2. 280 x 11 RPE 10
+3. 280 x 10 RPE 10
+"""
+
+FREE_WRITTEN = """## Exercise 2
+**Name:** Seated DB Shoulder Press
+### Working Sets
+1. 17.5 x 13 RPE 9.5 perfect
+### Notes
+Went up to twenty on the second set and got eleven clean plus one partial, then the left
+shoulder started talking so I stopped there instead of forcing a third set. Next time start at
+twenty and see if the warmup around the world drill keeps the shoulder happy all the way.
+"""
+
+
+def _worker_payload(line: str) -> dict:
+    return {
+        "number": 1,
+        "name": "Leg Press",
+        "sets": [{"number": 1, "source_line": line, "weight_kg": 280.0, "reps": "12"}],
+    }
+
+
+class ScriptedProvider:
+    """Answers every worker call with `payload`, or raises `error`; records each call."""
+
+    def __init__(self, model: str, payload: dict | None = None,
+                 error: Exception | None = None) -> None:
+        self.model = model
+        self.payload = payload
+        self.error = error
+        self.calls: list[dict] = []
+
+    def extract(self, text, tool_schema, system_prompt, tool_name, tool_description,
+                validate=None, deadline=None):
+        _record_call(
+            self.calls, step=tool_name, model=self.model, attempts=1, input_tokens=0,
+            output_tokens=0, elapsed_ms=1, failed=str(self.error) if self.error else None,
+            raw_payload=None,
+        )
+        if self.error is not None:
+            raise self.error
+        return self.payload
+
+
+class TestChunkFeatures:
+    def test_headings_and_field_lines_are_not_content(self) -> None:
+        features = chunk_features(PROGRAMMED)
+        assert features.lines == 3
+        assert features.set_lines == 3
+        assert features.set_density == 1.0
+
+    def test_prose_lowers_the_density(self) -> None:
+        assert chunk_features(FREE_WRITTEN).set_density < 0.5
+
+
+class TestRoutingPolicy:
+    def test_a_short_programmed_chunk_goes_fast(self) -> None:
+        assert RoutingPolicy().choose(PROGRAMMED, "Leg Press") == FAST
+
+    def test_a_free_written_chunk_goes_strong(self) -> None:
+        assert RoutingPolicy().choose(FREE_WRITTEN, "Seated DB Shoulder Press") == STRONG
+
+    def test_a_long_chunk_goes_strong_however_formatted(self) -> None:
+        assert RoutingPolicy(max_fast_chars=50).choose(PROGRAMMED, "Leg Press") == STRONG
+
+    def test_placeholder_history_sends_an_exercise_strong(self) -> None:
+        policy = RoutingPolicy(placeholder_history={"leg press": 1})
+        assert policy.choose(PROGRAMMED, "Leg Press") == STRONG
+
+    def test_a_chunk_with_no_set_lines_goes_strong(self) -> None:
+        assert RoutingPolicy().choose("## Exercise 1\n**Name:** Plank\n", "Plank") == STRONG
+
+
+class TestRunWorkerRoutes:
+    def test_a_fast_answer_that_checks_out_is_kept(self) -> None:
+        fast = ScriptedProvider("fast-model", _worker_payload("1. 280 x 12 RPE 9.5"))
+        strong = ScriptedProvider("strong-model", _worker_payload("1. 280 x 12 RPE 9.5"))
+        routed = RoutedProvider(fast, strong)
+
+        run_worker(PROGRAMMED, None, 1, "Leg Press", routed)
+
+        assert [(c["model"], c["route"]) for c in routed.calls] == [("fast-model", FAST)]
+
+    def test_an_invented_source_line_escalates(self) -> None:
+        fast = ScriptedProvider("fast-model", _worker_payload("1. 300 x 12"))
+        strong = ScriptedProvider("strong-model", _worker_payload("1. 280 x 12 RPE 9.5"))
+        routed = RoutedProvider(fast, strong)
+
+        exercise, _, warnings = run_worker(PROGRAMMED, None, 1, "Leg Press", routed)
+
+        assert [c["route"] for c in routed.calls] == [FAST, ESCALATED]
+        assert routed.calls[1]["model"] == "strong-model"
+        assert exercise.sets[0].weight_kg == 280.0
+        assert not any("invented" in w for w in warnings)
+
+    def test_a_failed_fast_call_escalates(self) -> None:
+        fast = ScriptedProvider("fast-model", error=LLMParserError("validation failed"))
+        strong = ScriptedProvider("strong-model", _worker_payload("1. 280 x 12 RPE 9.5"))
+        routed = RoutedProvider(fast, strong)
+
+        run_worker(PROGRAMMED, None, 1, "Leg Press", routed)
+
+        assert [c["route"] for c in routed.calls] == [FAST, ESCALATED]
+        assert routed.calls[0]["failed"] == "validation failed"
+
+    def test_running_out_of_time_is_not_escalated(self) -> None:
+        fast = ScriptedProvider("fast-model", error=DeadlineExceeded("out of time"))
+        strong = ScriptedProvider("strong-model", _worker_payload("1. 280 x 12 RPE 9.5"))
+        routed = RoutedProvider(fast, strong)
+
+        with pytest.raises(DeadlineExceeded):
+            run_worker(PROGRAMMED, None, 1, "Leg Press", routed)
+        assert strong.calls == []
+
+    def test_a_strong_route_is_not_escalated_again(self) -> None:
+        fast = ScriptedProvider("fast-model", _worker_payload("1. 17.5 x 13 RPE 9.5 perfect"))
+        strong = ScriptedProvider("strong-model", error=LLMParserError("gave up"))
+        routed = RoutedProvider(fast, strong)
+
+        with pytest.raises(LLMParserError, match="gave up"):
+            run_worker(FREE_WRITTEN, None, 2, "Seated DB Shoulder Press", routed)
+        assert [c["route"] for c in routed.calls] == [STRONG]
+
+    def test_non_worker_steps_always_go_strong(self) -> None:
+        fast = ScriptedProvider("fast-model", {})
+        strong = ScriptedProvider("strong-model", {})
+        routed = RoutedProvider(fast, strong)
+
+        routed.extract("whole session", {}, "sys", "split_exercises", "desc")
+
+        assert fast.calls == []
+        assert routed.calls[0]["route"] == STRONG
+        assert routed.model == "strong-model"
+
+
+def test_a_plain_provider_is_not_routed() -> None:
+    provider = ScriptedProvider("only-model", _worker_payload("1. 280 x 12 RPE 9.5"))
+
+    run_worker(PROGRAMMED, None, 1, "Leg Press", provider)
+
+    assert provider.calls[0]["step"] == WORKER_TOOL_NAME
+    assert "route" not in provider.calls[0]
@@ -7,7 +7,7 @@ import pytest
 
 
 from traininglogs.agent.schemas import TrainingLogLLMExtract
-from traininglogs.agent.validation_card_builder import ValidationCardBuilder
+from traininglogs.agent.validation_card_builder import ValidationCardBuilder, _sets_summary
 from traininglogs.agent.validation_card_data import UserValidationCard
 
 
@@ -412,3 +412,37 @@ class TestWarningsAndFailedExercise:
         assert card.exercises[0].header.failed is False
         assert card.exercises[0].failure_reason is None
         assert card.exercises[0].note_preview is not None
+
+
+class TestLastTime:
+    STATE = {
+        "exercise": "squat",
+        "last_date": "2026-05-05",
+        "last_sets": [
+            {"number": 1, "weight_kg": 100.0, "reps_full": 6, "reps_partial": 0, "rpe": 8.0},
+            {"number": 2, "weight_kg": 100.0, "reps_full": 5, "reps_partial": 0, "rpe": 9.0},
+            {"number": 3, "weight_kg": 92.5, "reps_full": 7, "reps_partial": 1, "rpe": 9.0},
+        ],
+        "best_e1rm_kg": 120.0,
+        "session_count": 4,
+    }
+
+    def test_sets_summary_repeats_the_weight_only_when_it_changes(self) -> None:
+        assert _sets_summary(self.STATE["last_sets"]) == "100 × 6, 5, 92.5 × 7+1"
+
+    def test_sets_summary_of_unweighted_sets_is_reps_alone(self) -> None:
+        sets = [{"weight_kg": None, "reps_full": 12}, {"weight_kg": None, "reps_full": None}]
+        assert _sets_summary(sets) == "12, ?"
+
+    def test_history_adds_last_time(self) -> None:
+        card = builder.build(_make_extract(), {"Squat": self.STATE})
+        last = card.exercises[0].last_time
+        assert last is not None
+        assert last.date == "2026-05-05"
+        assert last.summary == "100 × 6, 5, 92.5 × 7+1"
+        assert last.best_e1rm_kg == 120.0
+        assert last.session_count == 4
+
+    def test_no_last_time_without_history(self) -> None:
+        assert builder.build(_make_extract()).exercises[0].last_time is None
+        assert builder.build(_make_extract(), {"Bench": self.STATE}).exercises[0].last_time is None
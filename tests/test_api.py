@@ -1,4 +1,7 @@
+import json
 import os
+import time
+
 import pytest
 
 
@@ -158,6 +161,388 @@ def test_exercise_history_returns_sets_in_order(client):
     assert dates == sorted(dates)
 
 
+def _dip_session(session_id: str, day: str, weight: float) -> dict:
+    """SESSION_A with one exercise no other test uses, so exercise_state is ours alone."""
+    exercise = SESSION_A["exercises"][0]
+    return {
+        **SESSION_A,
+        "session_id": session_id,
+        "date": day,
+        "exercises": [{
+            **exercise,
+            "name": "API State Dip",
+            "sets": [{**s, "weight_kg": weight} for s in exercise["sets"]],
+        }],
+    }
+
+
+def test_exercise_states_are_last_time_per_name(client, db_conn):
+    insert_session(db_conn, TrainingSession.model_validate(
+        _dip_session("api-test-state-2", "2026-02-08", 20.0)))
+    insert_session(db_conn, TrainingSession.model_validate(
+        _dip_session("api-test-state-1", "2026-02-01", 25.0)))
+    r = client.get(
+        "/exercises/state?name=api state dip&name=Never Done",
+        headers={"x-api-key": "testkey"},
+    )
+    assert r.status_code == 200
+    body = r.json()
+    assert list(body) == ["api state dip"]
+    state = body["api state dip"]
+    assert state["exercise"] == "API State Dip"
+    assert state["last_date"] == "2026-02-08"
+    assert state["last_session_id"] == "api-test-state-2"
+    assert {s["weight_kg"] for s in state["last_sets"]} == {20.0}
+    assert state["best_e1rm_date"] == "2026-02-01"
+    assert state["session_count"] == 2
+
+
+def test_exercise_states_need_a_name(client):
+    assert client.get("/exercises/state", headers={"x-api-key": "testkey"}).status_code == 422
+
+
+def _all_pages(client, url: str) -> list[list[dict]]:
+    """Follow rel="next" Link headers from `url` to the last page."""
+    pages = []
+    while url:
+        r = client.get(url, headers={"x-api-key": "testkey"})
+        assert r.status_code == 200
+        pages.append(r.json())
+        link = r.headers.get("Link")
+        url = link[link.index("<") + 1:link.index(">")] if link else None
+    return pages
+
+
+class TestPagination:
+    """Keyset pages of GET /sessions and GET /exercises/{name}/history, and `fields=`."""
+
+    def test_sessions_page_through_every_row_once(self, client):
+        query = "from_date=2026-02-01&to_date=2026-03-01"
+        everything = client.get(f"/sessions?{query}", headers={"x-api-key": "testkey"}).json()
+
+        pages = _all_pages(client, f"/sessions?{query}&limit=1")
+
+        assert all(len(page) == 1 for page in pages)
+        assert [row for page in pages for row in page] == everything
+        ids = [row["session_id"] for page in pages for row in page]
+        assert ids.index("api-test-session-002") < ids.index("api-test-session-001")
+
+    def test_history_pages_through_every_row_once(self, client):
+        everything = client.get(
+            "/exercises/Bench Press/history", headers={"x-api-key": "testkey"}
+        ).json()
+
+        pages = _all_pages(client, "/exercises/Bench Press/history?limit=1")
+
+        assert [row for page in pages for row in page] == everything
+
+    def test_a_last_page_has_no_next_link(self, client):
+        r = client.get("/sessions?limit=1000", headers={"x-api-key": "testkey"})
+        assert "Link" not in r.headers
+
+    def test_fields_trim_the_columns_but_keep_the_keyset(self, client):
+        r = client.get("/sessions?fields=focus&limit=5", headers={"x-api-key": "testkey"})
+        assert r.status_code == 200
+        assert all(set(row) == {"session_id", "date", "focus"} for row in r.json())
+
+        r = client.get(
+            "/exercises/Bench Press/history?fields=weight_kg,rpe",
+            headers={"x-api-key": "testkey"},
+        )
+        assert set(r.json()[0]) == {
+            "date", "session_id", "exercise_number", "number", "weight_kg", "rpe",
+        }
+
+    def test_an_unknown_field_is_a_422(self, client):
+        r = client.get("/sessions?fields=focus,password", headers={"x-api-key": "testkey"})
+        assert r.status_code == 422
+        assert "password" in r.json()["detail"]
+
+    def test_a_malformed_cursor_is_a_400(self, client):
+        for cursor in ("not-a-cursor", "WyJ4IiwgInkiXQ"):  # the second is ["x", "y"]
+            r = client.get(f"/sessions?cursor={cursor}", headers={"x-api-key": "testkey"})
+            assert r.status_code == 400
+
+    def test_history_past_the_last_page_is_empty_not_missing(self, client):
+        from traininglogs.api.app import EXERCISE_HISTORY_KEYSET, _encode_cursor
+
+        pages = _all_pages(client, "/exercises/Bench Press/history?limit=1000")
+        # The row as JSON already carries its date as the ISO string a cursor holds.
+        cursor = _encode_cursor(pages[-1][-1], EXERCISE_HISTORY_KEYSET)
+        r = client.get(
+            f"/exercises/Bench Press/history?cursor={cursor}", headers={"x-api-key": "testkey"}
+        )
+        assert r.status_code == 200
+        assert r.json() == []
+
+
+class TestConditionalGet:
+    """ETags from the data_version counter: an unchanged poll is a 304 with no body, decided
+    before the list queries run; any session write changes the tag."""
+
+    def test_an_unchanged_poll_is_a_304_without_querying(self, client, monkeypatch):
+        first = client.get("/sessions", headers={"x-api-key": "testkey"})
+        etag = first.headers["ETag"]
+        assert etag.startswith('W/"')
+
+        def boom(*args, **kwargs):
+            raise AssertionError("the list query ran")
+
+        monkeypatch.setattr("traininglogs.api.app.get_sessions", boom)
+        r = client.get("/sessions", headers={"x-api-key": "testkey", "If-None-Match": etag})
+
+        assert r.status_code == 304
+        assert r.content == b""
+        assert r.headers["ETag"] == etag
+
+    def test_a_session_write_changes_the_tag(self, client, db_conn):
+        etag = client.get(
+            "/sessions/api-test-session-001", headers={"x-api-key": "testkey"}
+        ).headers["ETag"]
+        insert_session(
+            db_conn,
+            TrainingSession.model_validate(
+                {**SESSION_A, "session_id": "api-test-session-etag", "exercises": []}
+            ),
+        )
+
+        r = client.get(
+            "/sessions/api-test-session-001",
+            headers={"x-api-key": "testkey", "If-None-Match": etag},
+        )
+
+        assert r.status_code == 200
+        assert r.headers["ETag"] != etag
+        assert r.json()["session_id"] == "api-test-session-001"
+
+    def test_a_non_matching_tag_gets_the_body(self, client):
+        r = client.get(
+            "/exercises/Bench Press/history",
+            headers={"x-api-key": "testkey", "If-None-Match": 'W/"0-stale", "other"'},
+        )
+        assert r.status_code == 200
+        assert r.json()
+
+    def test_large_responses_are_gzipped(self, client):
+        r = client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+        assert r.headers["content-encoding"] == "gzip"
+
+
+class TestReadReplica:
+    """DATABASE_READ_URL: session reads go to its pool, except within READ_YOUR_WRITES_SECONDS
+    of the client's own confirm. The "replica" is the test database under another
+    application_name, so the connection a read was given says which pool it came from."""
+
+    @pytest.fixture
+    def replica(self, client, monkeypatch):
+        import traininglogs.api.app as app_module
+
+        monkeypatch.setenv("DATABASE_READ_URL", f"{TEST_DB_URL}?application_name=replica")
+        monkeypatch.setattr(app_module, "_read_pool", None)
+        monkeypatch.setattr(app_module, "_last_write_at", float("-inf"))
+        client.cookies.clear()
+        used: list[str] = []
+
+        def spy(conn, session_id):
+            used.append("replica" if "application_name=replica" in conn.dsn else "primary")
+            return None
+
+        monkeypatch.setattr(app_module, "get_session", spy)
+        yield used
+        if app_module._read_pool is not None:
+            app_module._read_pool.closeall()
+        client.cookies.clear()
+
+    def _read(self, client) -> None:
+        client.get("/sessions/anything", headers={"x-api-key": "testkey"})
+
+    def test_reads_go_to_the_replica(self, client, replica):
+        self._read(client)
+        assert replica == ["replica"]
+
+    def test_reads_after_a_confirm_go_to_the_primary(self, client, db_conn, replica):
+        extraction_id = TestConfirmExtraction()._insert_extraction(
+            db_conn, "2026-05-21", "replica test content 1"
+        )
+        try:
+            r = client.post(
+                f"/extractions/{extraction_id}/confirm", headers={"x-api-key": "testkey"}
+            )
+            assert r.status_code == 201
+            assert "tl_wrote" in r.cookies
+
+            self._read(client)
+            assert replica == ["primary"]
+        finally:
+            with db_conn.cursor() as cur:
+                cur.execute("DELETE FROM sessions WHERE session_id LIKE '2026-05-21%'")
+            db_conn.commit()
+
+    def test_the_cookie_alone_is_enough(self, client, replica):
+        client.cookies.set("tl_wrote", "1")
+        self._read(client)
+        assert replica == ["primary"]
+
+    def test_without_a_replica_reads_use_the_primary(self, client, replica, monkeypatch):
+        monkeypatch.delenv("DATABASE_READ_URL")
+        self._read(client)
+        assert replica == ["primary"]
+
+
+class TestAnalytics:
+    """/analytics/*: typed results of the analytics queries, cached per data version, ETag'd,
+    and cut off with a 504 past ANALYTICS_TIMEOUT_MS."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self):
+        import traininglogs.api.app as app_module
+
+        app_module._analytics_cache.clear()
+
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "/analytics/overview",
+            "/analytics/personal-records",
+            "/analytics/key-lift-prs?lift=Bench Press&lift=Squat",
+            "/analytics/volume-by-session?phase=1",
+            "/analytics/rpe-trend",
+            "/analytics/rpe-distribution",
+            "/analytics/top-rpe-sets?n=5",
+            "/analytics/sessions-per-week",
+            "/analytics/failure-techniques",
+            "/analytics/exercises?min_sets=1",
+            "/analytics/exercises/Bench Press/progression",
+            "/analytics/exercises/Bench Press/sets-trend",
+            "/analytics/exercises/Bench Press/goal-vs-actual",
+            "/analytics/exercises/Bench Press/sets-trend?downsample=top_set",
+            "/analytics/exercises/Bench Press/goal-vs-actual?downsample=lttb&max_points=3",
+            "/analytics/muscle-group-volume",
+            "/analytics/phases/1/fatigue",
+            "/analytics/deload-effect",
+            "/analytics/stimulus-fatigue?min_sets=1",
+            "/analytics/weekly-tonnage",
+            "/analytics/training-load?since=2026-01-01",
+        ],
+    )
+    def test_every_endpoint_answers_with_its_schema(self, client, url):
+        r = client.get(url, headers={"x-api-key": "testkey"})
+        assert r.status_code == 200, r.text
+        assert r.headers["ETag"].startswith('W/"')
+
+    def test_typed_fields_come_through(self, client):
+        overview = client.get("/analytics/overview", headers={"x-api-key": "testkey"}).json()
+        assert overview["total_sessions"] >= 2
+
+        prs = client.get(
+            "/analytics/key-lift-prs?lift=Bench Press", headers={"x-api-key": "testkey"}
+        ).json()
+        assert set(prs) == {"Bench Press"}
+
+        progression = client.get(
+            "/analytics/exercises/Bench Press/progression", headers={"x-api-key": "testkey"}
+        ).json()
+        assert any(row["weight_kg"] == 80.0 for row in progression)
+
+    def test_key_lift_prs_needs_a_lift(self, client):
+        r = client.get("/analytics/key-lift-prs", headers={"x-api-key": "testkey"})
+        assert r.status_code == 422
+
+    def test_a_repeated_query_is_answered_from_the_cache(self, client, monkeypatch):
+        from traininglogs.analytics import queries
+
+        real, calls = queries.sessions_per_week, []
+
+        def sessions_per_week(conn):
+            calls.append(conn)
+            return real(conn)
+
+        monkeypatch.setattr(queries, "sessions_per_week", sessions_per_week)
+        first = client.get("/analytics/sessions-per-week", headers={"x-api-key": "testkey"})
+        second = client.get("/analytics/sessions-per-week", headers={"x-api-key": "testkey"})
+
+        assert first.json() == second.json()
+        assert len(calls) == 1
+
+    def test_a_write_is_never_hidden_by_the_cache(self, client, db_conn):
+        before = client.get("/analytics/overview", headers={"x-api-key": "testkey"}).json()
+        insert_session(
+            db_conn,
+            TrainingSession.model_validate(
+                {**SESSION_A, "session_id": "api-test-session-analytics", "exercises": []}
+            ),
+        )
+        after = client.get("/analytics/overview", headers={"x-api-key": "testkey"}).json()
+        assert after["total_sessions"] == before["total_sessions"] + 1
+
+    def test_training_load_counts_each_session_on_its_day(self, client):
+        r = client.get(
+            "/analytics/training-load?since=2026-02-01&until=2026-03-01",
+            headers={"x-api-key": "testkey"},
+        )
+        assert r.status_code == 200
+        days = {row["date"]: row for row in r.json()}
+        # The series has no gaps: every day in the range is a row.
+        assert len(days) == 29
+        assert days["2026-02-01"]["sessions"] >= 1
+        assert days["2026-02-01"]["tonnage_kg"] > 0
+        assert days["2026-02-01"]["acute_tonnage_kg"] >= days["2026-02-01"]["tonnage_kg"]
+
+    def test_downsampling_keeps_the_top_set_of_each_day(self, client):
+        url = "/analytics/exercises/Bench Press/sets-trend"
+        every = client.get(url, headers={"x-api-key": "testkey"}).json()
+        top = client.get(
+            f"{url}?downsample=top_set", headers={"x-api-key": "testkey"}
+        ).json()
+        assert len(top) == len({r["date"] for r in every})
+        for row in top:
+            assert row["weight_kg"] == max(
+                r["weight_kg"] for r in every if r["date"] == row["date"]
+            )
+        capped = client.get(
+            f"{url}?downsample=lttb&max_points=3", headers={"x-api-key": "testkey"}
+        ).json()
+        assert len(capped) == min(3, len(every))
+
+    def test_an_unknown_downsampling_mode_is_a_422(self, client):
+        r = client.get(
+            "/analytics/exercises/Bench Press/sets-trend?downsample=median",
+            headers={"x-api-key": "testkey"},
+        )
+        assert r.status_code == 422
+
+    def test_an_unchanged_poll_is_a_304(self, client):
+        etag = client.get(
+            "/analytics/weekly-tonnage", headers={"x-api-key": "testkey"}
+        ).headers["ETag"]
+        r = client.get(
+            "/analytics/weekly-tonnage",
+            headers={"x-api-key": "testkey", "If-None-Match": etag},
+        )
+        assert r.status_code == 304
+
+    def test_a_slow_query_is_a_504(self, client, monkeypatch):
+        import traininglogs.api.app as app_module
+        from traininglogs.analytics import queries
+
+        def deload_effect(conn):
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_sleep(2)")
+            return []
+
+        monkeypatch.setattr(app_module, "ANALYTICS_TIMEOUT_MS", 50)
+        monkeypatch.setattr(queries, "deload_effect", deload_effect)
+        r = client.get("/analytics/deload-effect", headers={"x-api-key": "testkey"})
+
+        assert r.status_code == 504
+        assert "deload_effect" in r.json()["detail"]
+        # The timeout was local to that request's transaction.
+        monkeypatch.undo()
+        assert client.get(
+            "/analytics/overview", headers={"x-api-key": "testkey"}
+        ).status_code == 200
+
+
 def test_exercise_history_case_insensitive(client):
     r = client.get("/exercises/bench press/history", headers={"x-api-key": "testkey"})
     assert r.status_code == 200
@@ -205,7 +590,7 @@ class TestCreateInput:
     def test_captures_and_extracts(self, client, db_conn, monkeypatch) -> None:
         monkeypatch.setattr(
             "traininglogs.ingest.extract.assemble",
-            lambda text, provider=None: self._fake_extract(),
+            lambda text, provider=None, **_: self._fake_extract(),
         )
         r = client.post(
             "/inputs",
@@ -233,7 +618,7 @@ class TestCreateInput:
         lose the text, and the caller needs raw_input_id back to retry (extract() is
         idempotent) rather than resubmitting."""
 
-        def failing_assemble(text, provider=None):
+        def failing_assemble(text, provider=None, **_):
             raise RuntimeError("LLM unavailable")
 
         monkeypatch.setattr("traininglogs.ingest.extract.assemble", failing_assemble)
@@ -264,6 +649,155 @@ class TestCreateInput:
         assert r.status_code == 401
 
 
+class TestIdempotencyKey:
+    """POST /inputs with an Idempotency-Key: the first request runs, retries replay its stored
+    response. assemble() is monkeypatched and counted, as in TestCreateInput."""
+
+    BODY = {"content": "# Leg day\n1. 280 x 12 RPE 9.5 (idempotency)"}
+
+    @pytest.fixture
+    def assembled(self, monkeypatch) -> list[str]:
+        seen: list[str] = []
+
+        def fake_assemble(text, provider=None, **_):
+            seen.append(text)
+            return TestCreateInput()._fake_extract()
+
+        monkeypatch.setattr("traininglogs.ingest.extract.assemble", fake_assemble)
+        return seen
+
+    @pytest.fixture
+    def key(self, db_conn) -> str:
+        import uuid
+
+        key = f"test-{uuid.uuid4().hex}"
+        yield key
+        with db_conn.cursor() as cur:
+            cur.execute("DELETE FROM idempotency_keys WHERE key = %s", (key,))
+        db_conn.commit()
+
+    def _post(self, client, key: str, body: dict | None = None):
+        return client.post(
+            "/inputs", json=body or self.BODY,
+            headers={"x-api-key": "testkey", "Idempotency-Key": key},
+        )
+
+    def _captures(self, db_conn) -> int:
+        with db_conn.cursor() as cur:
+            cur.execute(
+                "SELECT count(*) FROM raw_inputs WHERE content = %s", (self.BODY["content"],)
+            )
+            count = cur.fetchone()[0]
+        db_conn.rollback()
+        return count
+
+    def test_a_retry_replays_the_first_response(self, client, db_conn, assembled, key) -> None:
+        before = self._captures(db_conn)
+        first = self._post(client, key)
+        second = self._post(client, key)
+
+        assert first.status_code == second.status_code == 201
+        assert second.json() == first.json()
+        assert second.headers["Idempotent-Replayed"] == "true"
+        assert "Idempotent-Replayed" not in first.headers
+        assert len(assembled) == 1
+        assert self._captures(db_conn) == before + 1
+
+    def test_a_failed_extraction_is_replayed_too(self, client, monkeypatch, key) -> None:
+        def failing_assemble(text, provider=None, **_):
+            raise RuntimeError("LLM unavailable")
+
+        monkeypatch.setattr("traininglogs.ingest.extract.assemble", failing_assemble)
+        first = self._post(client, key)
+        second = self._post(client, key)
+
+        assert first.status_code == second.status_code == 502
+        assert second.json() == first.json()
+
+    def test_the_same_key_with_a_different_body_is_rejected(self, client, assembled, key) -> None:
+        assert self._post(client, key).status_code == 201
+        r = self._post(client, key, {"content": "something else entirely"})
+        assert r.status_code == 422
+        assert len(assembled) == 1
+
+    def test_a_retry_during_the_first_request_gets_a_409(
+        self, client, db_conn, assembled, key, monkeypatch
+    ) -> None:
+        from traininglogs.db.insert import claim_idempotency_key, content_checksum
+        from traininglogs.api.schemas import CaptureIn
+
+        request_hash = content_checksum(CaptureIn(**self.BODY).model_dump_json())
+        assert claim_idempotency_key(db_conn, key, request_hash, 3600, 600) is None
+        monkeypatch.setattr("traininglogs.api.app.IDEMPOTENCY_WAIT_SECONDS", 0.0)
+
+        r = self._post(client, key)
+
+        assert r.status_code == 409
+        assert r.headers["Retry-After"]
+        assert assembled == []
+
+    def test_a_retry_waits_for_the_first_request_to_finish(
+        self, client, db_conn, assembled, key
+    ) -> None:
+        import threading
+
+        from traininglogs.api.schemas import CaptureIn
+        from traininglogs.db.db import get_connection
+        from traininglogs.db.insert import (
+            claim_idempotency_key,
+            complete_idempotency_key,
+            content_checksum,
+        )
+
+        request_hash = content_checksum(CaptureIn(**self.BODY).model_dump_json())
+        assert claim_idempotency_key(db_conn, key, request_hash, 3600, 600) is None
+        stored = {"raw_input_id": "r-1", "extraction_id": "x-1", "error": None}
+
+        def finish() -> None:
+            time.sleep(0.3)
+            other = get_connection(TEST_DB_URL)
+            try:
+                complete_idempotency_key(other, key, 201, stored)
+            finally:
+                other.close()
+
+        thread = threading.Thread(target=finish)
+        thread.start()
+        r = self._post(client, key)
+        thread.join()
+
+        assert r.status_code == 201
+        assert r.json() == stored
+        assert assembled == []
+
+    def test_an_expired_key_runs_again(self, client, db_conn, assembled, key) -> None:
+        assert self._post(client, key).status_code == 201
+        with db_conn.cursor() as cur:
+            cur.execute(
+                "UPDATE idempotency_keys SET expires_at = now() - interval '1 second' "
+                "WHERE key = %s", (key,),
+            )
+        db_conn.commit()
+
+        r = self._post(client, key)
+
+        assert r.status_code == 201
+        assert "Idempotent-Replayed" not in r.headers
+        assert len(assembled) == 2
+
+    def test_an_abandoned_claim_is_taken_over(self, client, db_conn, assembled, key) -> None:
+        from traininglogs.api.schemas import CaptureIn
+        from traininglogs.db.insert import claim_idempotency_key, content_checksum
+
+        request_hash = content_checksum(CaptureIn(**self.BODY).model_dump_json())
+        assert claim_idempotency_key(db_conn, key, request_hash, 3600, 0) is None
+
+        r = self._post(client, key)
+
+        assert r.status_code == 201
+        assert len(assembled) == 1
+
+
 class TestGetExtractionCard:
     """GET /extractions/{id} -- the same card the CLI's confirm loop renders to a terminal,
     as JSON. ValidationCardBuilder is DB-free and already shared; this just adds a serializer
@@ -302,6 +836,29 @@ class TestGetExtractionCard:
         assert body["exercises"][0]["header"]["name"] == "Leg Press"
         assert body["exercises"][0]["working_set_rows"][0]["weight_kg"] == 280.0
 
+    def test_exercises_done_before_show_last_time(self, client, db_conn) -> None:
+        from traininglogs.db.insert import insert_extraction, insert_raw_input
+
+        insert_session(db_conn, TrainingSession.model_validate(
+            _dip_session("api-test-state-card", "2026-02-15", 22.5)))
+        raw_input_id = insert_raw_input(db_conn, "# card test\n1. dips 22.5 x 8")
+        extraction_id = insert_extraction(
+            db_conn, raw_input_id=raw_input_id, model="m", prompt_version="v1",
+            extract={
+                "date": "2026-03-02",
+                "exercises": [
+                    {"number": 1, "name": "api state dip", "sets": []},
+                    {"number": 2, "name": "Never Done", "sets": []},
+                ],
+                "uncertain_fields": [],
+            },
+        )
+        r = client.get(f"/extractions/{extraction_id}", headers={"x-api-key": "testkey"})
+        dip, new = r.json()["exercises"]
+        assert dip["last_time"]["date"] == "2026-02-15"
+        assert dip["last_time"]["summary"].startswith("22.5 × ")
+        assert new["last_time"] is None
+
     def test_not_found(self, client) -> None:
         r = client.get("/extractions/does-not-exist", headers={"x-api-key": "testkey"})
         assert r.status_code == 404
@@ -541,3 +1098,171 @@ class TestCorrectExtraction:
             f"/extractions/{extraction_id}/correct", json={"instruction": "fix it"}
         )
         assert r.status_code == 401
+
+
+class TestCorrectionDrafts:
+    """POST /extractions/{id}/correct with `draft_version`: the working extract stays on the
+    server and only card patches come back. apply_correction is stubbed as in
+    TestCorrectExtraction. Dates are "2026-05-1X" so teardown can find the sessions the
+    confirm test writes."""
+
+    _insert_extraction = TestCorrectExtraction._insert_extraction
+    _stub_correction = TestCorrectExtraction._stub_correction
+
+    @pytest.fixture(autouse=True)
+    def _cleanup(self, db_conn):
+        yield
+        with db_conn.cursor() as cur:
+            cur.execute("DELETE FROM sessions WHERE session_id LIKE '2026-05-1%'")
+        db_conn.commit()
+
+    def _correct(self, client, extraction_id: str, version: int, instruction: str = "fix"):
+        return client.post(
+            f"/extractions/{extraction_id}/correct",
+            json={"instruction": instruction, "draft_version": version},
+            headers={"x-api-key": "testkey"},
+        )
+
+    def test_corrections_come_back_as_card_patches(self, client, db_conn, monkeypatch) -> None:
+        from traininglogs.agent.card_diff import apply_card_patch
+
+        extraction_id = self._insert_extraction(db_conn, "2026-05-11", "draft test content 1")
+        card = client.get(
+            f"/extractions/{extraction_id}", headers={"x-api-key": "testkey"}
+        ).json()
+
+        self._stub_correction(monkeypatch, "First Correction")
+        r1 = self._correct(client, extraction_id, 0, "fix 1")
+        assert r1.status_code == 200
+        assert r1.json()["draft_version"] == 1
+        assert "extract" not in r1.json() and "card" not in r1.json()
+        card = apply_card_patch(card, r1.json()["patch"])
+        assert card["session_header"]["focus"] == "First Correction"
+
+        self._stub_correction(monkeypatch, "Second Correction")
+        r2 = self._correct(client, extraction_id, 1, "fix 2")
+        assert r2.json()["draft_version"] == 2
+        card = apply_card_patch(card, r2.json()["patch"])
+
+        draft = client.get(
+            f"/extractions/{extraction_id}/draft", headers={"x-api-key": "testkey"}
+        ).json()
+        assert draft["draft_version"] == 2
+        assert draft["card"] == card
+        assert draft["extract"]["focus"] == "Second Correction"
+        assert [c["instruction"] for c in draft["corrections"]] == ["fix 1", "fix 2"]
+
+        from traininglogs.db.fetch import get_extraction
+        assert get_extraction(db_conn, extraction_id)["extract"]["focus"] == "Legs Hypertrophy"
+
+    def test_a_stale_version_is_refused(self, client, db_conn, monkeypatch) -> None:
+        extraction_id = self._insert_extraction(db_conn, "2026-05-12", "draft test content 2")
+        self._stub_correction(monkeypatch, "Corrected")
+        assert self._correct(client, extraction_id, 0).status_code == 200
+        assert self._correct(client, extraction_id, 1).status_code == 200
+
+        r = self._correct(client, extraction_id, 1)
+
+        assert r.status_code == 409
+        assert "version 2" in r.json()["detail"]
+
+    def test_a_missing_draft_is_refused(self, client, db_conn, monkeypatch) -> None:
+        extraction_id = self._insert_extraction(db_conn, "2026-05-13", "draft test content 3")
+        self._stub_correction(monkeypatch, "Corrected")
+
+        assert self._correct(client, extraction_id, 3).status_code == 409
+        assert client.get(
+            f"/extractions/{extraction_id}/draft", headers={"x-api-key": "testkey"}
+        ).status_code == 404
+
+    def test_draft_and_extract_together_are_rejected(self, client, db_conn) -> None:
+        extraction_id = self._insert_extraction(db_conn, "2026-05-14", "draft test content 4")
+        r = client.post(
+            f"/extractions/{extraction_id}/correct",
+            json={"instruction": "fix", "draft_version": 0, "extract": {"date": "2026-05-14"}},
+            headers={"x-api-key": "testkey"},
+        )
+        assert r.status_code == 422
+
+    def test_confirming_a_draft_writes_it_with_its_corrections(
+        self, client, db_conn, monkeypatch
+    ) -> None:
+        from traininglogs.db.fetch import get_correction_draft, get_extraction
+
+        extraction_id = self._insert_extraction(db_conn, "2026-05-15", "draft test content 5")
+        self._stub_correction(monkeypatch, "Draft Focus")
+        self._correct(client, extraction_id, 0, "the focus is wrong")
+
+        stale = client.post(
+            f"/extractions/{extraction_id}/confirm", json={"draft_version": 7},
+            headers={"x-api-key": "testkey"},
+        )
+        assert stale.status_code == 409
+
+        r = client.post(
+            f"/extractions/{extraction_id}/confirm", json={"draft_version": 1},
+            headers={"x-api-key": "testkey"},
+        )
+        assert r.status_code == 201
+        with db_conn.cursor() as cur:
+            cur.execute(
+                "SELECT focus FROM sessions WHERE session_id = %s", (r.json()["session_id"],)
+            )
+            assert cur.fetchone()[0] == "Draft Focus"
+        db_conn.rollback()
+        corrections = get_extraction(db_conn, extraction_id)["corrections"]
+        assert [c["instruction"] for c in corrections] == ["the focus is wrong"]
+        assert get_correction_draft(db_conn, extraction_id) is None
+
+
+class TestExport:
+    def test_ndjson_streams_every_set(self, client):
+        r = client.get(
+            "/export?format=ndjson&since=2026-02-01&until=2026-03-01",
+            headers={"x-api-key": "testkey"},
+        )
+        assert r.status_code == 200
+        assert r.headers["content-type"] == "application/x-ndjson"
+        assert r.headers["content-disposition"] == 'attachment; filename="traininglogs.ndjson"'
+        rows = [json.loads(line) for line in r.text.splitlines()]
+        assert all("2026-02-01" <= row["date"] <= "2026-03-01" for row in rows)
+        assert [row["date"] for row in rows] == sorted(row["date"] for row in rows)
+        first = next(row for row in rows if row["session_id"] == "api-test-session-001")
+        assert first["exercise"] == "Bench Press"
+        assert first["weight_kg"] == 80.0
+        assert first["goal_rep_min"] == 5
+        assert any(row["session_id"] == "api-test-session-002" for row in rows)
+
+    def test_parquet_loads_as_a_table(self, client):
+        pq = pytest.importorskip("pyarrow.parquet")
+        import io
+
+        r = client.get("/export?format=parquet", headers={"x-api-key": "testkey"})
+        assert r.status_code == 200
+        table = pq.read_table(io.BytesIO(r.content))
+        assert "api-test-session-001" in table.column("session_id").to_pylist()
+
+    def test_only_ndjson_is_gzipped(self, client):
+        pytest.importorskip("pyarrow")
+        headers = {"x-api-key": "testkey", "accept-encoding": "gzip"}
+        assert client.get("/export?format=ndjson", headers=headers).headers[
+            "content-encoding"
+        ] == "gzip"
+        for fmt in ("parquet", "arrow"):
+            r = client.get(f"/export?format={fmt}", headers=headers)
+            assert r.status_code == 200
+            assert "content-encoding" not in r.headers
+            assert not r.content.startswith(b"\x1f\x8b")
+
+    def test_the_uncompressed_media_types_are_the_exports(self):
+        from traininglogs.api.app import UNCOMPRESSED_MEDIA_TYPES
+        from traininglogs.db.export import MEDIA_TYPES
+
+        assert set(UNCOMPRESSED_MEDIA_TYPES) == {MEDIA_TYPES["parquet"], MEDIA_TYPES["arrow"]}
+
+    def test_an_unknown_format_is_rejected(self, client):
+        r = client.get("/export?format=csv", headers={"x-api-key": "testkey"})
+        assert r.status_code == 422
+
+    def test_export_needs_the_key(self, client):
+        assert client.get("/export").status_code == 401
@@ -74,7 +74,7 @@ def _confirm_immediately() -> LLMOrchestrator:
 
 def _stub_assemble(monkeypatch, extract: TrainingLogLLMExtract) -> None:
     monkeypatch.setattr(
-        "traininglogs.ingest.extract.assemble", lambda text, provider=None: extract
+        "traininglogs.ingest.extract.assemble", lambda text, provider=None, **_: extract
     )
 
 
@@ -173,7 +173,7 @@ class TestTheThreeLayersAreWritten:
         layer. capture() commits before extract() is ever called, so this is a property of the
         ordering in _process_ai_file, not just of capture() in isolation."""
 
-        def failing_assemble(text, provider=None):
+        def failing_assemble(text, provider=None, **_):
             raise RuntimeError("extraction blew up")
 
         monkeypatch.setattr("traininglogs.ingest.extract.assemble", failing_assemble)
@@ -0,0 +1,117 @@
+"""Chart downsampling: each mode keeps the rows it should, the cap always holds, and LTTB keeps
+the peaks and troughs that give a series its shape."""
+from __future__ import annotations
+
+import math
+from datetime import date, timedelta
+
+import pytest
+
+from traininglogs.analytics.downsample import (
+    downsample,
+    epley,
+    lift_value,
+    lttb,
+    top_set_per_session,
+    weekly,
+)
+
+START = date(2024, 1, 1)  # A Monday.
+
+
+def _sets(days: int, per_day: int = 3) -> list[dict]:
+    """`per_day` sets a day, the middle one heaviest, on a weight that rises by day."""
+    return [
+        {"date": START + timedelta(days=d), "set": n,
+         "weight_kg": 100.0 + d + (5 if n == 1 else 0), "reps_full": 5}
+        for d in range(days) for n in range(per_day)
+    ]
+
+
+def _by(row: dict):
+    return row["weight_kg"]
+
+
+def _when(row: dict):
+    return row["date"]
+
+
+def test_top_set_keeps_each_days_heaviest_set():
+    top = top_set_per_session(_sets(4), when=_when, value=_by)
+    assert [(r["date"].day, r["set"]) for r in top] == [(1, 1), (2, 1), (3, 1), (4, 1)]
+
+
+def test_top_set_accepts_iso_strings_and_epoch_milliseconds():
+    rows = [
+        {"x": 1704067200000, "y": 1.0}, {"x": 1704067200000, "y": 3.0},
+        {"x": 1704153600000, "y": 2.0},
+    ]
+    assert top_set_per_session(rows, when=lambda r: r["x"], value=lambda r: r["y"]) == [
+        rows[1], rows[2]
+    ]
+    rows = [{"d": "2024-01-01", "y": 1.0}, {"d": "2024-01-01", "y": 0.5}]
+    assert top_set_per_session(rows, when=lambda r: r["d"], value=lambda r: r["y"]) == [rows[0]]
+
+
+def test_weekly_keeps_each_weeks_heaviest_set():
+    top = weekly(_sets(15), when=_when, value=_by)
+    # Weeks start 1, 8 and 15 January; each week's last day is its heaviest.
+    assert [r["date"] for r in top] == [date(2024, 1, 7), date(2024, 1, 14), date(2024, 1, 15)]
+
+
+def test_rows_without_a_value_are_left_out():
+    rows = [{"date": START, "weight_kg": None}, {"date": START, "weight_kg": 50.0}]
+    assert downsample(rows, 10, mode="top_set", when=_when, value=_by) == [rows[1]]
+    assert lttb(rows, 10, when=_when, value=_by) == [rows[1]]
+
+
+def test_a_short_series_is_returned_whole():
+    rows = _sets(3)
+    assert downsample(rows, 100, when=_when, value=_by) == rows
+
+
+@pytest.mark.parametrize("mode", ["top_set", "weekly", "lttb"])
+def test_the_cap_always_holds(mode):
+    rows = _sets(1000)
+    result = downsample(rows, 50, mode=mode, when=_when, value=_by)
+    assert len(result) <= 50
+    assert all(any(r is row for row in rows) for r in result)
+    assert [r["date"] for r in result] == sorted(r["date"] for r in result)
+
+
+def test_lttb_keeps_the_ends_and_the_extremes():
+    # A sine wave with one spike: LTTB keeps the spike, where every-nth sampling would not.
+    rows = [
+        {"date": START + timedelta(days=i),
+         "weight_kg": 100 + 10 * math.sin(i / 20) + (50 if i == 503 else 0)}
+        for i in range(1000)
+    ]
+    kept = lttb(rows, 60, when=_when, value=_by)
+    assert len(kept) == 60
+    assert kept[0] is rows[0] and kept[-1] is rows[-1]
+    assert rows[503] in kept
+    assert max(r["weight_kg"] for r in kept) == max(r["weight_kg"] for r in rows)
+
+
+def test_lttb_with_two_or_fewer_points():
+    rows = _sets(10, per_day=1)
+    assert lttb(rows, 2, when=_when, value=_by) == [rows[0], rows[-1]]
+    assert lttb(rows, 0, when=_when, value=_by) == []
+
+
+def test_an_unknown_mode_is_an_error():
+    with pytest.raises(ValueError, match="unknown downsampling mode"):
+        downsample(_sets(2), 10, mode="median", when=_when, value=_by)
+
+
+def test_lift_value_ranks_bodyweight_exercises_by_reps():
+    weighted = [{"weight_kg": None, "reps_full": 20}, {"weight_kg": 10.0, "reps_full": 5}]
+    bodyweight = [{"weight_kg": None, "reps_full": 20}, {"weight_kg": None, "reps_full": 12}]
+    assert [lift_value(weighted)(s) for s in weighted] == [None, 10.0]
+    assert [lift_value(bodyweight)(s) for s in bodyweight] == [20, 12]
+
+
+def test_epley():
+    assert epley(100, 5) == pytest.approx(116.67, abs=0.01)
+    assert epley(100, None) == 100.0
+    assert epley(None, 5) is None
@@ -82,7 +82,7 @@ class TestExtract:
     def test_calls_assemble_and_saves_a_pending_extraction(self, conn, monkeypatch) -> None:
         seen = []
 
-        def fake_assemble(text, provider=None):
+        def fake_assemble(text, provider=None, **_):
             seen.append((text, provider))
             return make_extract()
 
@@ -103,7 +103,7 @@ class TestExtract:
     def test_is_idempotent_for_a_pending_extraction(self, conn, monkeypatch) -> None:
         calls = {"n": 0}
 
-        def fake_assemble(text, provider=None):
+        def fake_assemble(text, provider=None, **_):
             calls["n"] += 1
             return make_extract()
 
@@ -119,7 +119,7 @@ class TestExtract:
     def test_a_rejected_extraction_does_not_block_a_new_attempt(self, conn, monkeypatch) -> None:
         calls = {"n": 0}
 
-        def fake_assemble(text, provider=None):
+        def fake_assemble(text, provider=None, **_):
             calls["n"] += 1
             return make_extract()
 
@@ -141,6 +141,81 @@ class TestExtract:
             extract(conn, "does-not-exist")
 
 
+class TestSingleFlight:
+    """Two concurrent extract() calls for one raw input pay for one extraction. Each caller has
+    its own connection -- two requests, two pooled connections -- so the advisory lock is what
+    actually coordinates them."""
+
+    def test_a_concurrent_caller_waits_and_gets_the_first_extraction(self, conn, monkeypatch) -> None:
+        import threading
+
+        calls = {"n": 0}
+        started, release = threading.Event(), threading.Event()
+
+        def slow_assemble(text, provider=None, **_):
+            calls["n"] += 1
+            started.set()
+            release.wait(5)
+            return make_extract()
+
+        monkeypatch.setattr("traininglogs.ingest.extract.assemble", slow_assemble)
+        raw_input_id = capture(conn, MARKDOWN)
+        results: dict[str, str] = {}
+
+        def run(label: str) -> None:
+            own = get_connection(TEST_DB_URL)
+            try:
+                results[label] = extract(own, raw_input_id, provider=FakeProvider())
+            finally:
+                own.close()
+
+        first = threading.Thread(target=run, args=("first",))
+        first.start()
+        assert started.wait(5)
+        second = threading.Thread(target=run, args=("second",))
+        second.start()
+        second.join(0.3)
+        assert second.is_alive(), "the second caller must wait, not extract"
+
+        release.set()
+        first.join(5)
+        second.join(5)
+
+        assert calls["n"] == 1
+        assert results["first"] == results["second"]
+
+    def test_the_lock_is_released_when_extraction_fails(self, conn, monkeypatch) -> None:
+        def failing_assemble(text, provider=None, **_):
+            raise RuntimeError("worker blew up")
+
+        monkeypatch.setattr("traininglogs.ingest.extract.assemble", failing_assemble)
+        raw_input_id = capture(conn, MARKDOWN)
+        with pytest.raises(RuntimeError):
+            extract(conn, raw_input_id, provider=FakeProvider())
+
+        monkeypatch.setattr(
+            "traininglogs.ingest.extract.assemble", lambda text, provider=None, **_: make_extract()
+        )
+        other = get_connection(TEST_DB_URL)
+        try:
+            assert extract(other, raw_input_id, provider=FakeProvider()) is not None
+        finally:
+            other.close()
+
+    def test_waiting_past_the_deadline_raises(self, conn) -> None:
+        from traininglogs.agent.deadline import Deadline, DeadlineExceeded
+        from traininglogs.db.db import EXTRACT_LOCK_NAMESPACE, advisory_lock
+
+        raw_input_id = capture(conn, MARKDOWN)
+        other = get_connection(TEST_DB_URL)
+        try:
+            with advisory_lock(other, EXTRACT_LOCK_NAMESPACE, raw_input_id):
+                with pytest.raises(DeadlineExceeded, match="another request"):
+                    extract(conn, raw_input_id, provider=FakeProvider(), deadline=Deadline(0.2))
+        finally:
+            other.close()
+
+
 class FakeProviderWithCalls:
     """A provider whose `.calls` is already populated, standing in for what
     AnthropicProvider looks like after assemble() has driven it through a few steps."""
@@ -165,7 +240,7 @@ class TestLLMCallsArePersisted:
 
     def test_each_call_the_provider_made_becomes_a_row(self, conn, monkeypatch) -> None:
         monkeypatch.setattr(
-            "traininglogs.ingest.extract.assemble", lambda text, provider=None: make_extract()
+            "traininglogs.ingest.extract.assemble", lambda text, provider=None, **_: make_extract()
         )
         provider = FakeProviderWithCalls(
             [_call_record("segment"), _call_record("shell"), _call_record("worker")]
@@ -183,7 +258,7 @@ class TestLLMCallsArePersisted:
 
     def test_tokens_and_cost_are_stored(self, conn, monkeypatch) -> None:
         monkeypatch.setattr(
-            "traininglogs.ingest.extract.assemble", lambda text, provider=None: make_extract()
+            "traininglogs.ingest.extract.assemble", lambda text, provider=None, **_: make_extract()
         )
         provider = FakeProviderWithCalls(
             [_call_record("worker", input_tokens=1234, output_tokens=567, cost_usd=0.004532)]
@@ -208,7 +283,7 @@ class TestLLMCallsArePersisted:
         cost must not vanish with the exception (roadmap D4's whole point)."""
         provider = FakeProviderWithCalls([_call_record("segment"), _call_record("shell")])
 
-        def failing_assemble(text, provider=None):
+        def failing_assemble(text, provider=None, **_):
             raise RuntimeError("worker blew up")
 
         monkeypatch.setattr("traininglogs.ingest.extract.assemble", failing_assemble)
@@ -225,7 +300,7 @@ class TestLLMCallsArePersisted:
         """Most test doubles (FakeProvider above, StubProvider elsewhere) have no `.calls` --
         extract() must not require it."""
         monkeypatch.setattr(
-            "traininglogs.ingest.extract.assemble", lambda text, provider=None: make_extract()
+            "traininglogs.ingest.extract.assemble", lambda text, provider=None, **_: make_extract()
         )
         raw_input_id = capture(conn, MARKDOWN)
 
@@ -238,7 +313,7 @@ class TestLLMCallsArePersisted:
 
     def test_a_failed_call_is_stored_with_its_error_and_raw_payload(self, conn, monkeypatch) -> None:
         monkeypatch.setattr(
-            "traininglogs.ingest.extract.assemble", lambda text, provider=None: make_extract()
+            "traininglogs.ingest.extract.assemble", lambda text, provider=None, **_: make_extract()
         )
         provider = FakeProviderWithCalls(
             [_call_record("worker", failed="LLMParserError: bad payload", raw_payload={"bad": 1})]
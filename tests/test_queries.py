@@ -1,9 +1,19 @@
 import os
+from datetime import date, timedelta
+from decimal import Decimal
+
+import psycopg2.errors
 import pytest
 
 
 from traininglogs.db.db import get_connection, apply_schema
-from traininglogs.db.insert import insert_session
+from traininglogs.db.fetch import get_exercise_states
+from traininglogs.db.insert import (
+    insert_session,
+    rebuild_daily_load,
+    rebuild_exercise_state,
+    rebuild_personal_records,
+)
 from traininglogs.models.models import TrainingSession
 from traininglogs.analytics.queries import (
     exercise_progression,
@@ -14,6 +24,15 @@ from traininglogs.analytics.queries import (
     sessions_per_week,
     failure_technique_usage,
     custom_query,
+    key_lift_prs,
+    pr_events_since,
+    training_load,
+    exercise_sets_trend,
+    exercise_sets_trend_by_name,
+    goal_vs_actual,
+    goal_vs_actual_by_name,
+    iter_custom_query,
+    RowLimitExceeded,
     overview_stats,
     exercise_list,
     weekly_muscle_group_volume,
@@ -293,3 +312,255 @@ def test_custom_query_returns_results(conn):
     assert rows[0]["session_id"] == "q-test-session-001"
     assert rows[1]["session_id"] == "q-test-session-002"
     assert rows[2]["session_id"] == "q-test-session-003"
+
+
+def test_custom_query_is_cancelled_after_its_timeout(conn):
+    with pytest.raises(psycopg2.errors.QueryCanceled):
+        custom_query(conn, "SELECT pg_sleep(2)", timeout_ms=50)
+
+
+def test_custom_query_stops_past_max_rows(conn):
+    with pytest.raises(RowLimitExceeded):
+        custom_query(conn, "SELECT generate_series(1, 100) AS n", max_rows=10)
+    assert len(custom_query(conn, "SELECT generate_series(1, 10) AS n", max_rows=10)) == 10
+
+
+def test_custom_query_cannot_write(conn):
+    with pytest.raises(psycopg2.errors.ReadOnlySqlTransaction):
+        custom_query(conn, "SELECT nextval('exercises_id_seq')")
+
+
+def test_custom_query_streams_in_batches(conn):
+    rows = iter_custom_query(conn, "SELECT generate_series(1, 1000) AS n", batch_size=7)
+    assert next(rows) == {"n": 1}
+    rows.close()
+
+
+def test_custom_queries_can_be_read_one_inside_another(conn):
+    outer = iter_custom_query(conn, "SELECT generate_series(1, 3) AS n", batch_size=1)
+    pairs = [
+        (row["n"], [r["m"] for r in iter_custom_query(conn, "SELECT %s * 10 AS m", [row["n"]])])
+        for row in outer
+    ]
+    assert pairs == [(1, [10]), (2, [20]), (3, [30])]
+
+
+def test_custom_query_leaves_the_callers_transaction_as_it_was(conn):
+    with pytest.raises(psycopg2.errors.QueryCanceled):
+        custom_query(conn, "SELECT pg_sleep(2)", timeout_ms=50)
+    with conn.cursor() as cur:
+        cur.execute("SHOW statement_timeout")
+        assert cur.fetchone()[0] == "0"
+        cur.execute("SHOW transaction_read_only")
+        assert cur.fetchone()[0] == "off"
+    assert custom_query(conn, "SELECT 1 AS one") == [{"one": 1}]
+
+
+def test_key_lift_prs_come_from_the_ledger(conn):
+    prs = key_lift_prs(conn, ["bench press"])["bench press"]
+    assert prs["rep_prs"][5] == {"weight_kg": 82.5, "date": "2026-01-08"}
+    assert prs["e1rm_kg"] == 96.25
+    assert prs["e1rm_date"] == "2026-01-08"
+
+
+def test_pr_events_record_each_improvement(conn):
+    events = [
+        e for e in pr_events_since(conn, date(2026, 1, 1))
+        if e["session_id"].startswith("q-test-") and e["record"] == "weight"
+    ]
+    assert [(str(e["date"]), float(e["value_kg"])) for e in events] == [
+        ("2026-01-01", 80.0), ("2026-01-08", 82.5),
+    ]
+    assert events[0]["previous_kg"] is None
+    assert float(events[1]["previous_kg"]) == 80.0
+    # The deload week set nothing.
+    assert not [e for e in pr_events_since(conn, date(2026, 1, 15))
+                if e["session_id"] == "q-test-session-003"]
+
+
+def _ledger_session(session_id: str, day: str, weight: float) -> TrainingSession:
+    return TrainingSession.model_validate({
+        **SESSION_1,
+        "session_id": session_id,
+        "date": day,
+        "exercises": [{
+            **SESSION_1["exercises"][0],
+            "name": "Ledger Curl",
+            "sets": [{**SESSION_1["exercises"][0]["sets"][0], "weight_kg": weight}],
+        }],
+    })
+
+
+def test_rebuild_replays_an_out_of_order_import(conn):
+    try:
+        insert_session(conn, _ledger_session("q-test-ledger-late", "2025-03-10", 30.0))
+        insert_session(conn, _ledger_session("q-test-ledger-early", "2025-03-03", 25.0))
+
+        def curl_events():
+            return [
+                (str(e["date"]), float(e["value_kg"]))
+                for e in pr_events_since(conn, date(2025, 3, 1))
+                if e["exercise"] == "Ledger Curl" and e["record"] == "weight"
+            ]
+
+        # Judged at insert time, the earlier 25 kg beat nothing.
+        assert curl_events() == [("2025-03-10", 30.0)]
+        rebuild_personal_records(conn)
+        assert curl_events() == [("2025-03-03", 25.0), ("2025-03-10", 30.0)]
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM sessions WHERE session_id LIKE 'q-test-ledger-%'")
+        conn.commit()
+    assert all(r["exercise"] != "Ledger Curl" for r in personal_records(conn))
+
+
+def test_exercise_state_keeps_the_latest_session_whatever_the_insert_order(conn):
+    try:
+        insert_session(conn, _ledger_session("q-test-ledger-late", "2025-03-10", 30.0))
+        insert_session(conn, _ledger_session("q-test-ledger-early", "2025-03-03", 35.0))
+
+        state = get_exercise_states(conn, ["LEDGER CURL", "Nothing Like It"])
+        assert list(state) == ["LEDGER CURL"]
+        curl = state["LEDGER CURL"]
+        assert curl["exercise"] == "Ledger Curl"
+        assert str(curl["last_date"]) == "2025-03-10"
+        assert curl["last_session_id"] == "q-test-ledger-late"
+        assert [s["weight_kg"] for s in curl["last_sets"]] == [30.0]
+        # The earlier, heavier session still holds the best e1RM.
+        assert str(curl["best_e1rm_date"]) == "2025-03-03"
+        assert curl["session_count"] == 2
+
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM sessions WHERE session_id = 'q-test-ledger-late'")
+        conn.commit()
+        # The cascade took the row with the session it pointed at; a rebuild restores it.
+        assert get_exercise_states(conn, ["Ledger Curl"]) == {}
+        rebuild_exercise_state(conn)
+        curl = get_exercise_states(conn, ["Ledger Curl"])["Ledger Curl"]
+        assert str(curl["last_date"]) == "2025-03-03"
+        assert curl["session_count"] == 1
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM sessions WHERE session_id LIKE 'q-test-ledger-%'")
+        conn.commit()
+
+
+def test_apply_schema_fills_derived_tables_a_database_predates(conn):
+    # As a database upgraded from before the derived tables would have them: empty.
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE current_prs, pr_events, exercise_state, daily_load")
+    conn.commit()
+    assert personal_records(conn) == []
+
+    apply_schema(conn)
+    assert any(r["exercise"] == "Bench Press" for r in personal_records(conn))
+    assert "Bench Press" in get_exercise_states(conn, ["Bench Press"])
+    assert training_load(conn, date(2026, 1, 1), date(2026, 1, 15))
+
+
+def _load_session(session_id: str, day: str) -> TrainingSession:
+    """One 100 kg x 10 set: 1000 kg of tonnage."""
+    session = _ledger_session(session_id, day, 100.0)
+    session.exercises[0].sets[0].rep_count.full = 10
+    return session
+
+
+def test_training_load_is_kept_current_whatever_the_insert_order(conn):
+    # Weekly sessions, 1000 kg each, years before anything else in the database.
+    days = ["2019-01-28", "2019-01-01", "2019-01-15", "2019-01-08", "2019-01-22"]
+    window = (date(2019, 1, 1), date(2019, 2, 28))
+    rebuild_daily_load(conn)
+    try:
+        for n, day in enumerate(days):
+            insert_session(conn, _load_session(f"q-test-load-{n}", day))
+        load = {row["date"]: row for row in training_load(conn, *window)}
+
+        # A rest day is a row of zero load.
+        assert load[date(2019, 1, 2)]["tonnage_kg"] == 0
+        first_week = load[date(2019, 1, 7)]
+        assert first_week["acute_tonnage_kg"] == 1000
+        assert first_week["acwr"] is None
+        assert first_week["monotony"] == Decimal("0.41")
+
+        day_27 = load[date(2019, 1, 28)]
+        assert day_27["tonnage_kg"] == 1000 and day_27["sessions"] == 1
+        assert day_27["acute_tonnage_kg"] == 2000
+        assert day_27["chronic_tonnage_kg"] == 1250
+        assert day_27["acute_sets"] == 2
+        assert day_27["acwr"] == Decimal("1.60")
+        # Mean 2000/7 over a population SD of 451.75.
+        assert day_27["monotony"] == Decimal("0.63")
+        assert day_27["strain"] == Decimal("1264.9")
+
+        # Appended one at a time, out of order, it matches a recount from scratch.
+        rebuild_daily_load(conn)
+        assert training_load(conn, *window) == list(load.values())
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM sessions WHERE session_id LIKE 'q-test-load-%'")
+        conn.commit()
+        rebuild_daily_load(conn)
+    assert training_load(conn, *window) == []
+
+
+def test_concurrent_inserts_update_training_load_in_turn(conn):
+    import threading
+
+    from traininglogs.db.db import DAILY_LOAD_LOCK_NAMESPACE
+
+    # Another insert, part way through its daily_load update, holds the lock.
+    other = get_connection(TEST_DB_URL)
+    with other.cursor() as cur:
+        cur.execute(
+            "SELECT pg_advisory_xact_lock(%s, hashtext('daily_load'))", (DAILY_LOAD_LOCK_NAMESPACE,)
+        )
+    second = get_connection(TEST_DB_URL)
+    window = (date(2019, 1, 1), date(2019, 2, 28))
+    try:
+        insert = threading.Thread(
+            target=insert_session, args=(second, _load_session("q-test-load-turn", "2019-01-10"))
+        )
+        insert.start()
+        insert.join(0.3)
+        assert insert.is_alive()
+        other.commit()
+        insert.join(5)
+        assert not insert.is_alive()
+
+        load = training_load(conn, *window)
+        rebuild_daily_load(conn)
+        assert training_load(conn, *window) == load
+    finally:
+        other.close()
+        second.close()
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM sessions WHERE session_id LIKE 'q-test-load-%'")
+        conn.commit()
+        rebuild_daily_load(conn)
+
+
+def test_training_load_last_weeks_ends_at_the_latest_day(conn):
+    insert_session(conn, _load_session("q-test-load-last", "2019-03-04"))
+    try:
+        full = training_load(conn)
+        latest = full[-1]["date"]
+        last = training_load(conn, last_weeks=2)
+        assert last == [row for row in full if row["date"] >= latest - timedelta(weeks=2)]
+        assert (last[0]["date"], last[-1]["date"]) == (latest - timedelta(weeks=2), latest)
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM sessions WHERE session_id LIKE 'q-test-load-%'")
+        conn.commit()
+        rebuild_daily_load(conn)
+
+
+def test_by_name_queries_match_one_query_per_exercise(conn):
+    names = ["Bench Press", "BENCH PRESS", "Nothing Like It"]
+    sets = exercise_sets_trend_by_name(conn, names)
+    goals = goal_vs_actual_by_name(conn, names)
+    assert list(sets) == list(goals) == ["Bench Press", "BENCH PRESS"]
+    for name in ("Bench Press", "BENCH PRESS"):
+        assert sets[name] == exercise_sets_trend(conn, name)
+        assert goals[name] == goal_vs_actual(conn, name)
+    assert len(sets["Bench Press"]) >= 2
+    assert exercise_sets_trend(conn, "Nothing Like It") == []